@@ -1,12 +1,29 @@
+import os
 import tkinter as tk
-from tkinter import scrolledtext
+from tkinter import scrolledtext, messagebox, filedialog
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.dialogs import Messagebox
 from datetime import datetime
 from dato import Dato
 from db_manager import DatabaseManager
+from db_worker import DBWorker, entregar_en_ui
+from exportar import COLUMNAS, linea_tsv, exportar_datos_archivo
+from importar import es_linea_tsv, resumir
 from data_manager import DataManager
+from tabla_virtual import TablaVirtual, VentanaDatos, CargaEnSegundoPlano
+from consulta import ConsultaDatos
+
+# Errores que se listan en un diálogo; el resto solo se cuenta
+MAX_ERRORES_DIALOGO = 15
+
+
+def lista_de_errores(errores, maximo=MAX_ERRORES_DIALOGO):
+    """Texto con los primeros `maximo` errores y una línea "…y N más" si hay otros"""
+    texto = "\n".join(errores[:maximo])
+    if len(errores) > maximo:
+        texto += f"\n…y {len(errores) - maximo} más"
+    return texto
 
 
 class TkinterApp:
@@ -21,15 +38,21 @@ class TkinterApp:
         except:
             pass  # Si no hay ícono, continuar sin él
         
-        # Inicializar componentes
-        self.db_manager = DatabaseManager()
+        # Inicializar componentes (métricas solo con AUTO_DATA_METRICAS=1)
+        self.db_manager = DatabaseManager(instrumentar=os.environ.get("AUTO_DATA_METRICAS") == "1")
         self.data_manager = DataManager(self.db_manager)
+        # Hilo escritor: las escrituras no bloquean el mainloop de Tk
+        self.db_worker = DBWorker(self.db_manager)
+        # Hilo lector: conteos e índice de la tabla, sin esperar a las escrituras
+        self.db_lector = DBWorker(self.db_manager, nombre="db-lector")
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar_aplicacion)
         
         # Variables
         self.modo_codigo = tk.StringVar(value='random')
         self.dato_seleccionado = None
         
         self.setup_ui()
+        # La ventana aparece enseguida; la tabla se carga en segundo plano
         self.cargar_datos()
     
     def setup_ui(self):
@@ -110,9 +133,17 @@ class TkinterApp:
             width=20
         ).grid(row=2, column=0, pady=(10, 5))
         
+        ttk.Button(
+            dir_frame, 
+            text="📂 Importar Archivo", 
+            command=self.importar_direcciones_archivo,
+            bootstyle="success-outline",
+            width=20
+        ).grid(row=3, column=0, pady=(0, 5))
+        
         # Contador de direcciones
         self.contador_label = ttk.Label(dir_frame, text="Direcciones disponibles: 0")
-        self.contador_label.grid(row=3, column=0, pady=5)
+        self.contador_label.grid(row=4, column=0, pady=5)
         
         # Frame inferior - Tabla de datos con estilo
         table_frame = ttk.LabelFrame(
@@ -123,6 +154,48 @@ class TkinterApp:
         )
         table_frame.grid(row=2, column=0, columnspan=2, sticky="nsew")
         
+        # Buscador: filtra por nombre, código, dirección o ZIP mientras se escribe
+        busqueda_frame = ttk.Frame(table_frame)
+        busqueda_frame.grid(row=0, column=0, columnspan=2, sticky="we", pady=(0, 10))
+        ttk.Label(busqueda_frame, text="🔍 Buscar:").pack(side=tk.LEFT, padx=(0, 10))
+        self.busqueda_var = tk.StringVar()
+        busqueda_entry = ttk.Entry(busqueda_frame, textvariable=self.busqueda_var, bootstyle="primary")
+        busqueda_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        busqueda_entry.bind('<KeyRelease>', lambda e: self.programar_busqueda())
+        busqueda_entry.bind('<Escape>', lambda e: self.limpiar_busqueda())
+        self._busqueda_pendiente = None
+        
+        # Filtros por ZIP y por rango de un monto (los resuelve SQLite con índices)
+        ttk.Label(busqueda_frame, text="ZIP:").pack(side=tk.LEFT, padx=(15, 5))
+        self.filtro_zip_var = tk.StringVar()
+        ttk.Entry(busqueda_frame, textvariable=self.filtro_zip_var, width=8).pack(side=tk.LEFT)
+        montos = ('Amount Current Any', 'Amount Current Regular', 'Amount PAS Any', 'Amount PAS Regular')
+        self.filtro_monto_var = tk.StringVar(value=montos[0])
+        ttk.Combobox(
+            busqueda_frame, 
+            textvariable=self.filtro_monto_var, 
+            values=montos, 
+            state="readonly", 
+            width=22
+        ).pack(side=tk.LEFT, padx=(15, 5))
+        self.filtro_min_var = tk.StringVar()
+        self.filtro_max_var = tk.StringVar()
+        ttk.Entry(busqueda_frame, textvariable=self.filtro_min_var, width=8).pack(side=tk.LEFT)
+        ttk.Label(busqueda_frame, text="a").pack(side=tk.LEFT, padx=5)
+        ttk.Entry(busqueda_frame, textvariable=self.filtro_max_var, width=8).pack(side=tk.LEFT)
+        ttk.Button(
+            busqueda_frame, 
+            text="Filtrar", 
+            command=self.aplicar_filtros,
+            bootstyle="primary-outline"
+        ).pack(side=tk.LEFT, padx=(10, 5))
+        ttk.Button(
+            busqueda_frame, 
+            text="Quitar filtros", 
+            command=self.quitar_filtros,
+            bootstyle="secondary-outline"
+        ).pack(side=tk.LEFT)
+        
         # Crear Treeview para la tabla con estilo
         style = ttk.Style()
         style.configure("Treeview", 
@@ -162,34 +235,56 @@ class TkinterApp:
             'Amount PAS Regular': 100
         }
         
-        for col in columns:
-            self.tree.heading(col, text=col, anchor=tk.CENTER)
+        # Clic en el encabezado: ordenar por esa columna (otro clic invierte el orden)
+        for col, campo in zip(columns, COLUMNAS):
+            self.tree.heading(col, text=col, anchor=tk.CENTER, command=lambda c=campo: self.ordenar_por(c))
             self.tree.column(col, width=column_widths.get(col, 100), minwidth=50, anchor=tk.CENTER)
             
         # Ajustar el ancho de las columnas automáticamente
         for col in columns:
             self.tree.column(col, stretch=tk.YES if col in ['Nombre', 'Dirección'] else tk.NO)
         
-        # Scrollbar para la tabla con estilo
+        # Scrollbar para la tabla con estilo; representa el total de filas de la
+        # base, no los ítems del Treeview (ver TablaVirtual)
         scrollbar = ttk.Scrollbar(
             table_frame, 
             orient=tk.VERTICAL, 
-            command=self.tree.yview,
             bootstyle="round"
         )
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tabla = TablaVirtual(self.tree, scrollbar, VentanaDatos(self.db_manager))
+        self.carga = CargaEnSegundoPlano(
+            self.root, self.db_lector, self.tabla,
+            al_progresar=self.mostrar_progreso_carga,
+            al_terminar=self.terminar_carga,
+            al_fallar=self.fallo_carga
+        )
         
         # Configurar grid para la tabla y scrollbar
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        scrollbar.grid(row=0, column=1, sticky="ns")
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        scrollbar.grid(row=1, column=1, sticky="ns")
         
         # Configurar el peso de la fila de la tabla para que ocupe el espacio disponible
-        table_frame.grid_rowconfigure(0, weight=1)
+        table_frame.grid_rowconfigure(1, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
         
         # Botones de la tabla con estilos
         table_button_frame = ttk.Frame(table_frame)
-        table_button_frame.grid(row=1, column=0, columnspan=2, pady=(15, 5))
+        table_button_frame.grid(row=2, column=0, columnspan=2, pady=(15, 5))
+        
+        # Progreso de la carga en segundo plano (oculto cuando no hay carga)
+        self.carga_frame = ttk.Frame(table_frame)
+        self.carga_frame.grid(row=3, column=0, columnspan=2, sticky="we")
+        self.carga_label = ttk.Label(self.carga_frame, text="⏳ Cargando datos...")
+        self.carga_label.pack(side=tk.LEFT, padx=(0, 10))
+        self.carga_progreso = ttk.Progressbar(self.carga_frame, mode='determinate', bootstyle="info-striped")
+        self.carga_progreso.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
+        ttk.Button(
+            self.carga_frame, 
+            text="✖ Cancelar", 
+            command=lambda: self.carga.cancelar(),
+            bootstyle="secondary-outline",
+            width=12
+        ).pack(side=tk.LEFT)
         
         ttk.Button(
             table_button_frame, 
@@ -229,6 +324,30 @@ class TkinterApp:
             command=self.resetear_ids_y_datos,
             bootstyle="danger-outline",
             width=18
+        ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Button(
+            table_button_frame, 
+            text="💾 Exportar", 
+            command=self.exportar_datos,
+            bootstyle="secondary-outline",
+            width=14
+        ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Button(
+            table_button_frame, 
+            text="📥 Importar", 
+            command=self.importar_datos_tsv,
+            bootstyle="secondary-outline",
+            width=14
+        ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Button(
+            table_button_frame, 
+            text="📊 Estadísticas", 
+            command=self.mostrar_estadisticas,
+            bootstyle="secondary-outline",
+            width=18
         ).pack(side=tk.LEFT)
         
         # Configurar grid weights para un diseño responsivo
@@ -272,48 +391,26 @@ class TkinterApp:
             if not nombres_text:
                 messagebox.showerror("Error", "Debe ingresar al menos un nombre")
                 return
-            nombres = [n.strip().upper() for n in nombres_text.split('\n') if n.strip()]
-            if len(nombres) > len(self.data_manager.direcciones_disponibles):
-                messagebox.showerror("Error", 
-                                   f"No hay suficientes direcciones disponibles. "
-                                   f"Necesitas {len(nombres)} pero solo tienes {len(self.data_manager.direcciones_disponibles)}")
-                return
-            # Crear datos
-            datos_creados = 0
-            for nombre in nombres:
-                try:
-                    # Generar datos
-                    codigo = self.data_manager.generar_codigo_aleatorio(self.modo_codigo.get())
-                    amount_current_any = self.data_manager.generar_numero_decimal()
-                    amount_current_regular = int(float(amount_current_any))
-                    amount_pas_any = self.data_manager.generar_numero_decimal()
-                    amount_pas_regular = int(float(amount_pas_any))
-                    # Obtener dirección
-                    dir_obj = self.data_manager.obtener_direccion_unica()
-                    # Crear objeto Dato
-                    dato = Dato(
-                        codigo=codigo,
-                        nombre=nombre,
-                        drireccion=dir_obj["direccion"],
-                        zip4=dir_obj["zip4"],
-                        amount_current_any=float(amount_current_any),
-                        amount_current_regular=amount_current_regular,
-                        amount_pas_any=float(amount_pas_any),
-                        amount_pas_regular=amount_pas_regular
-                    )
-                    # Guardar en base de datos
-                    self.db_manager.crear_dato(dato)
-                    datos_creados += 1
-                    
-                except Exception as e:
-                    messagebox.showerror("Error", f"Error al crear dato para {nombre}: {str(e)}")
-                    continue
+            # El DataManager normaliza los nombres (acentos, símbolos, mayúsculas)
+            nombres = [n.strip() for n in nombres_text.split('\n') if n.strip()]
             
-            if datos_creados > 0:
-                messagebox.showinfo("Éxito", f"Se crearon {datos_creados} registros exitosamente")
-                self.limpiar_formulario()
-                self.cargar_datos()
-                self.actualizar_contador_direcciones()
+            # Generar y guardar todo el lote en una sola transacción, en el hilo escritor;
+            # las direcciones se reservan en la base de datos
+            def terminado(reporte):
+                datos_creados = sum(1 for r in reporte if r["id"] is not None)
+                errores = [f"{r['nombre']}: {r['error']}" for r in reporte if r["error"]]
+                if errores:
+                    messagebox.showerror("Error", "No se pudieron crear algunos datos:\n\n" + lista_de_errores(errores))
+                
+                if datos_creados > 0:
+                    messagebox.showinfo("Éxito", f"Se crearon {datos_creados} registros exitosamente")
+                    self.limpiar_formulario()
+                    self.tabla.agregar_ids(r["id"] for r in reporte if r["id"] is not None)
+                    self.actualizar_contador_direcciones()
+            
+            future = self.db_worker.enviar(self.data_manager.crear_lote, nombres, self.modo_codigo.get())
+            entregar_en_ui(self.root, future, terminado,
+                           lambda e: messagebox.showerror("Error", f"Error al guardar datos: {str(e)}"))
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al guardar datos: {str(e)}")
@@ -324,31 +421,83 @@ class TkinterApp:
         self.dato_seleccionado = None
     
     def cargar_datos(self):
-        """Cargar datos en la tabla"""
+        """Recargar la tabla en segundo plano (solo se leen y dibujan las filas visibles)"""
         try:
-            # Limpiar tabla
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Cargar datos de la base de datos
-            datos = self.db_manager.leer_datos()
-            
-            # Insertar en la tabla
-            for dato in datos:
-                def fmt(val):
-                    try:
-                        return f"{float(val):.2f}"
-                    except Exception:
-                        return val
-                self.tree.insert('', 'end', values=(
-                    dato.id, dato.codigo, dato.nombre, dato.drireccion,
-                    dato.zip4, fmt(dato.amount_current_any), dato.amount_current_regular,
-                    fmt(dato.amount_pas_any), dato.amount_pas_regular
-                ))
-            
+            self.carga_frame.grid()
+            self.carga.recargar()
         except Exception as e:
             messagebox.showerror("Error", f"Error al cargar datos: {str(e)}")
     
+    def programar_busqueda(self, espera_ms=250):
+        """Buscar cuando se deja de escribir, no en cada tecla"""
+        if self._busqueda_pendiente is not None:
+            self.root.after_cancel(self._busqueda_pendiente)
+        self._busqueda_pendiente = self.root.after(espera_ms, self.buscar_datos)
+    
+    def limpiar_busqueda(self):
+        self.busqueda_var.set("")
+        self.programar_busqueda(0)
+    
+    def buscar_datos(self):
+        """Mostrar solo los datos que coinciden con el buscador (índice FTS5 de la base)"""
+        self._busqueda_pendiente = None
+        busqueda = self.busqueda_var.get().strip()
+        consulta = self.tabla.ventana.consulta
+        if busqueda == consulta.busqueda:
+            return
+        self.cambiar_consulta(consulta.copiar(busqueda=busqueda))
+    
+    def cambiar_consulta(self, consulta):
+        """Mostrar la tabla con otra búsqueda, orden o filtros desde la primera fila"""
+        self.tabla.cambiar_consulta(consulta)
+        self.actualizar_encabezados()
+        self.cargar_datos()
+    
+    def ordenar_por(self, campo):
+        """Ordenar la tabla por una columna; el orden lo hace SQLite con índices"""
+        self.cambiar_consulta(self.tabla.ventana.consulta.ordenada_por(campo))
+    
+    def actualizar_encabezados(self):
+        """Marcar con una flecha la columna de orden"""
+        consulta = self.tabla.ventana.consulta
+        for col, campo in zip(self.tree['columns'], COLUMNAS):
+            flecha = (" ▼" if consulta.descendente else " ▲") if campo == consulta.orden and not consulta.por_id else ""
+            self.tree.heading(col, text=col + flecha)
+    
+    def aplicar_filtros(self):
+        """Filtrar por prefijo de ZIP y por rango del monto elegido"""
+        try:
+            minimo = float(self.filtro_min_var.get()) if self.filtro_min_var.get().strip() else None
+            maximo = float(self.filtro_max_var.get()) if self.filtro_max_var.get().strip() else None
+        except ValueError:
+            messagebox.showwarning("Advertencia", "El rango del monto debe ser numérico")
+            return
+        campo = COLUMNAS[self.tree['columns'].index(self.filtro_monto_var.get())]
+        rangos = {campo: (minimo, maximo)} if minimo is not None or maximo is not None else {}
+        self.cambiar_consulta(self.tabla.ventana.consulta.copiar(
+            zip_prefijo=self.filtro_zip_var.get().strip(), rangos=rangos
+        ))
+    
+    def quitar_filtros(self):
+        """Quitar búsqueda, filtros y orden"""
+        for var in (self.busqueda_var, self.filtro_zip_var, self.filtro_min_var, self.filtro_max_var):
+            var.set("")
+        self.cambiar_consulta(ConsultaDatos(self.tabla.ventana.consulta.excluir_q))
+    
+    def mostrar_progreso_carga(self, cargadas, total):
+        """Avance de la carga del índice de la tabla"""
+        self.carga_frame.grid()
+        self.carga_progreso.configure(maximum=max(total, 1), value=cargadas)
+        self.carga_label.config(text=f"⏳ Cargando {cargadas:,} de {total:,} registros")
+    
+    def terminar_carga(self, completa):
+        """Ocultar el progreso al terminar o cancelar la carga"""
+        self.carga_frame.grid_remove()
+    
+    def fallo_carga(self, error):
+        self.terminar_carga(False)
+        messagebox.showerror("Error", f"Error al cargar datos: {str(error)}")
+    
     def editar_dato(self):
         """Editar el dato seleccionado"""
         selection = self.tree.selection()
@@ -374,7 +523,7 @@ class TkinterApp:
         values = item['values']
         
         # Unir los valores en una sola línea, separados por tabulaciones
-        texto = '\t'.join(str(v) for v in values)
+        texto = linea_tsv(values)
         
         # Copiar al portapapeles sin mensajes
         self.root.clipboard_clear()
@@ -382,15 +531,19 @@ class TkinterApp:
         self.root.update()
     
     def pegar_datos(self):
-        """Pegar datos desde el portapapeles"""
+        """Pegar datos desde el portapapeles (varias filas de la tabla se importan en bloque)"""
         try:
             # Obtener datos del portapapeles
             datos_pegados = self.root.clipboard_get()
             
             # Si hay datos en el portapapeles, intentar procesarlos
             if datos_pegados and datos_pegados.strip():
+                lineas = [l for l in datos_pegados.splitlines() if l.strip()]
+                # Filas copiadas de la tabla (o de un export TSV): importarlas todas
+                if any(es_linea_tsv(l) for l in lineas):
+                    self.importar_datos_tsv(lineas)
                 # Dividir por tabulaciones si es una línea con datos
-                if '\t' in datos_pegados:
+                elif '\t' in datos_pegados:
                     valores = datos_pegados.strip().split('\t')
                     if len(valores) >= 4:  # Mínimo ID, código, nombre
                         # Intentar insertar en el formularioes[1] if len(valores) > 1 else "")
@@ -407,6 +560,50 @@ class TkinterApp:
             print(f"Error al pegar datos: {e}")
             pass
     
+    def importar_datos_tsv(self, lineas=None):
+        """Importar filas TSV (pegadas o de un archivo) actualizando por ID o por código"""
+        ruta = None
+        if lineas is None:
+            ruta = filedialog.askopenfilename(
+                title="Importar datos",
+                filetypes=[("TSV", "*.tsv *.txt"), ("Todos los archivos", "*.*")]
+            )
+            if not ruta:
+                return
+        
+        # El archivo se lee en el hilo escritor: aquí todavía no se sabe cuántas filas tiene
+        origen = f"el archivo {os.path.basename(ruta)}" if ruta else f"{len(lineas)} filas"
+        respuesta = messagebox.askyesnocancel(
+            "Importar datos",
+            f"Se va a importar {origen}.\n\n"
+            "Sí: actualizar las existentes por ID\n"
+            "No: actualizar las existentes por código"
+        )
+        if respuesta is None:
+            return
+        clave = 'id' if respuesta else 'codigo'
+        
+        def terminado(reporte):
+            resumen = resumir(reporte)
+            errores = [f"Línea {r['linea']}: {r['error']}" for r in reporte if r["error"]]
+            mensaje = (f"Insertados: {resumen['insertados']}\n"
+                       f"Actualizados: {resumen['actualizados']}\n"
+                       f"Con error: {resumen['errores']}")
+            if errores:
+                mensaje += "\n\n" + lista_de_errores(errores)
+            messagebox.showinfo("Importación terminada", mensaje)
+            if resumen["insertados"] or resumen["actualizados"]:
+                self.cargar_datos()
+                self.actualizar_contador_direcciones()
+        
+        # Lectura, parseo y todas las filas en una sola transacción, en el hilo escritor
+        if ruta:
+            future = self.db_worker.enviar(self.data_manager.importar_archivo_tsv, ruta, clave)
+        else:
+            future = self.db_worker.enviar(self.data_manager.importar_datos_tsv, lineas, clave)
+        entregar_en_ui(self.root, future, terminado,
+                       lambda e: messagebox.showerror("Error", f"Error al importar datos: {str(e)}"))
+    
     def pegar_en_texto(self, event):
         """Pegar texto en el widget de texto que tiene el foco"""
         try:
@@ -458,18 +655,13 @@ class TkinterApp:
     
     def copiar_datos_multiples(self):
         """Copiar múltiples datos seleccionados al portapapeles"""
-        selection = self.tree.selection()
-        if not selection:
+        # Incluye las filas seleccionadas que ya no están a la vista
+        filas = self.tabla.filas_seleccionadas()
+        if not filas:
             return  # No mostrar mensaje, simplemente no hacer nada
         
-        # Obtener todos los datos seleccionados
-        datos_copiados = []
-        for item_id in selection:
-            item = self.tree.item(item_id)
-            values = item['values']
-            # Unir los valores en una sola línea, separados por tabulaciones
-            linea = '\t'.join(str(v) for v in values)
-            datos_copiados.append(linea)
+        # Una línea por dato, separada por tabulaciones
+        datos_copiados = [linea_tsv(fila) for fila in filas]
         
         # Unir todas las líneas con saltos de línea
         texto_completo = '\n'.join(datos_copiados)
@@ -588,20 +780,25 @@ class TkinterApp:
             ]
             # Actualizar en la base de datos
             try:
-                conn = self.db_manager.get_connection()
-                conn.execute(
-                    "UPDATE datos SET codigo=?, nombre=?, drireccion=?, zip4=?, amount_current_any=?, amount_current_regular=?, amount_pas_any=?, amount_pas_regular=? WHERE id=?",
-                    (
-                        valores[1], valores[2], valores[3], valores[4],
-                        float(valores[5]), int(valores[6]), float(valores[7]), int(valores[8]), int(valores[0])
-                    )
-                )
-                conn.commit()
+                anterior = Dato(id=int(values[0]), nombre=str(values[2]), drireccion=str(values[3]))
+                future = self.db_worker.enviar(self.data_manager.actualizar_dato, Dato(
+                    id=int(valores[0]), codigo=valores[1], nombre=valores[2],
+                    drireccion=valores[3], zip4=valores[4],
+                    amount_current_any=float(valores[5]), amount_current_regular=int(valores[6]),
+                    amount_pas_any=float(valores[7]), amount_pas_regular=int(valores[8])
+                ), anterior)
+                def terminado(_):
+                    # Los triggers de usada liberan la dirección anterior y ocupan la nueva
+                    if values[3] != valores[3]:
+                        self.actualizar_contador_direcciones()
+                    self.tabla.actualizar_ids([int(valores[0])])
+                
+                entregar_en_ui(self.root, future, terminado,
+                               lambda e: print(f"Error al guardar edición: {e}"))
             except Exception as e:
                 print(f"Error al guardar edición: {e}")
-            # Cerrar ventana y refrescar tabla
+            # Cerrar ventana; la tabla se refresca cuando termine la escritura
             edit_window.destroy()
-            self.cargar_datos()
 
         def copiar_dato():
             # Obtener los valores actuales de los campos
@@ -642,11 +839,16 @@ class TkinterApp:
             id_dato = values[0]
             
             # Eliminar de la base de datos
-            if self.db_manager.eliminar_dato(id_dato):
-                messagebox.showinfo("Éxito", "Dato eliminado correctamente")
-                self.cargar_datos()
-            else:
-                messagebox.showerror("Error", "No se pudo eliminar el dato")
+            def terminado(eliminado):
+                if eliminado:
+                    messagebox.showinfo("Éxito", "Dato eliminado correctamente")
+                    self.tabla.quitar_ids([int(id_dato)])
+                    self.actualizar_contador_direcciones()
+                else:
+                    messagebox.showerror("Error", "No se pudo eliminar el dato")
+            
+            entregar_en_ui(self.root, self.db_worker.enviar(self.data_manager.eliminar_dato, id_dato), terminado,
+                           lambda e: messagebox.showerror("Error", f"Error al eliminar dato: {str(e)}"))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error al eliminar dato: {str(e)}")
@@ -655,13 +857,16 @@ class TkinterApp:
         """Eliminar todos los datos de la tabla"""
         try:
             # Eliminar todos los datos
-            eliminados = self.db_manager.eliminar_todos_datos()
+            def terminado(eliminados):
+                if eliminados > 0:
+                    messagebox.showinfo("Éxito", f"Se eliminaron {eliminados} registros correctamente")
+                    self.cargar_datos()
+                    self.actualizar_contador_direcciones()
+                else:
+                    messagebox.showinfo("Información", "No había datos para eliminar")
             
-            if eliminados > 0:
-                messagebox.showinfo("Éxito", f"Se eliminaron {eliminados} registros correctamente")
-                self.cargar_datos()
-            else:
-                messagebox.showinfo("Información", "No había datos para eliminar")
+            entregar_en_ui(self.root, self.db_worker.enviar(self.data_manager.eliminar_todos_datos), terminado,
+                           lambda e: messagebox.showerror("Error", f"Error al eliminar todos los datos: {str(e)}"))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error al eliminar todos los datos: {str(e)}")
@@ -670,13 +875,16 @@ class TkinterApp:
         """Eliminar el primer dato de la lista"""
         try:
             # Eliminar el primer dato
-            eliminado = self.db_manager.eliminar_primer_dato()
+            def terminado(eliminado):
+                if eliminado is not None:
+                    messagebox.showinfo("Éxito", "El primer dato fue eliminado correctamente")
+                    self.tabla.quitar_ids([eliminado])
+                    self.actualizar_contador_direcciones()
+                else:
+                    messagebox.showinfo("Información", "No hay datos para eliminar")
             
-            if eliminado:
-                messagebox.showinfo("Éxito", "El primer dato fue eliminado correctamente")
-                self.cargar_datos()
-            else:
-                messagebox.showinfo("Información", "No hay datos para eliminar")
+            entregar_en_ui(self.root, self.db_worker.enviar(self.data_manager.eliminar_primer_dato), terminado,
+                           lambda e: messagebox.showerror("Error", f"Error al eliminar el primer dato: {str(e)}"))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error al eliminar el primer dato: {str(e)}")
@@ -692,22 +900,58 @@ class TkinterApp:
             direcciones = [d.strip() for d in direcciones_text.split('\n') if d.strip()]
             
             # Agregar a la base de datos
-            agregadas = self.db_manager.agregar_direcciones(direcciones)
+            def terminado(agregadas):
+                if agregadas > 0:
+                    messagebox.showinfo("Éxito", f"Se agregaron {agregadas} direcciones")
+                    self.direcciones_text.delete("1.0", tk.END)
+                    self.actualizar_contador_direcciones()
+                else:
+                    messagebox.showinfo("Información", "No se agregaron nuevas direcciones")
             
-            if agregadas > 0:
-                messagebox.showinfo("Éxito", f"Se agregaron {agregadas} direcciones")
-                self.direcciones_text.delete("1.0", tk.END)
-                self.data_manager.cargar_direcciones()
-                self.actualizar_contador_direcciones()
-            else:
-                messagebox.showinfo("Información", "No se agregaron nuevas direcciones")
+            entregar_en_ui(self.root, self.db_worker.enviar(self.db_manager.agregar_direcciones, direcciones), terminado,
+                           lambda e: messagebox.showerror("Error", f"Error al agregar direcciones: {str(e)}"))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error al agregar direcciones: {str(e)}")
     
+    def importar_direcciones_archivo(self):
+        """Importar direcciones desde un archivo de texto (una por línea)"""
+        ruta = filedialog.askopenfilename(
+            title="Importar direcciones",
+            filetypes=[("Texto", "*.txt *.csv *.tsv"), ("Todos los archivos", "*.*")]
+        )
+        if not ruta:
+            return
+        def terminado(stats):
+            messagebox.showinfo(
+                "Importación terminada",
+                f"Insertadas: {stats['insertadas']}\n"
+                f"Duplicadas: {stats['duplicadas']}\n"
+                f"Inválidas: {stats['invalidas']}"
+            )
+            if stats["insertadas"] > 0:
+                self.actualizar_contador_direcciones()
+        
+        entregar_en_ui(self.root, self.db_worker.enviar(self.db_manager.importar_direcciones_archivo, ruta), terminado,
+                       lambda e: messagebox.showerror("Error", f"Error al importar direcciones: {str(e)}"))
+    
+    def exportar_datos(self):
+        """Exportar toda la tabla datos a un archivo TSV, CSV o JSON Lines"""
+        ruta = filedialog.asksaveasfilename(
+            title="Exportar datos",
+            defaultextension=".tsv",
+            filetypes=[("TSV", "*.tsv"), ("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Todos los archivos", "*.*")]
+        )
+        if not ruta:
+            return
+        # Se escribe por páginas en el hilo de la base, sin pasar por el portapapeles
+        entregar_en_ui(self.root, self.db_worker.enviar(exportar_datos_archivo, self.db_manager, ruta),
+                       lambda escritas: messagebox.showinfo("Exportación terminada", f"Se exportaron {escritas} registros"),
+                       lambda e: messagebox.showerror("Error", f"Error al exportar datos: {str(e)}"))
+    
     def actualizar_contador_direcciones(self):
         """Actualizar el contador de direcciones disponibles"""
-        count = len(self.data_manager.direcciones_disponibles)
+        count = self.db_manager.contar_direcciones_libres()
         self.contador_label.config(text=f"Direcciones disponibles: {count}")
 
     def resetear_ids_y_datos(self):
@@ -721,10 +965,57 @@ class TkinterApp:
                 )
                 if id_inicial is None:
                     return
-                self.db_manager.resetear_ids_datos(id_inicial)
-                messagebox.showinfo("Éxito", f"Todos los datos fueron borrados y el próximo ID será {id_inicial}.")
-                self.cargar_datos()
-                self.actualizar_contador_direcciones()
+                def terminado(_):
+                    messagebox.showinfo("Éxito", f"Todos los datos fueron borrados y el próximo ID será {id_inicial}.")
+                    self.cargar_datos()
+                    self.actualizar_contador_direcciones()
+                
+                entregar_en_ui(self.root, self.db_worker.enviar(self.data_manager.resetear_ids_datos, id_inicial), terminado,
+                               lambda e: messagebox.showerror("Error", f"Error al resetear IDs: {str(e)}"))
             except Exception as e:
                 messagebox.showerror("Error", f"Error al resetear IDs: {str(e)}")
 
+    def mostrar_estadisticas(self):
+        """Mostrar las métricas de la base de datos, con opción de copiarlas o guardarlas"""
+        reporte = self.db_manager.reporte_stats()
+        
+        stats_window = tk.Toplevel(self.root)
+        stats_window.title("Estadísticas de la base de datos")
+        stats_window.geometry("900x450")
+        stats_window.transient(self.root)
+        
+        frame = ttk.Frame(stats_window, padding="15")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        texto = scrolledtext.ScrolledText(frame, font=('Courier', 9), wrap=tk.NONE)
+        texto.pack(fill=tk.BOTH, expand=True)
+        texto.insert("1.0", reporte)
+        texto.configure(state='disabled')
+        
+        def copiar():
+            stats_window.clipboard_clear()
+            stats_window.clipboard_append(reporte)
+            stats_window.update()
+        
+        def guardar():
+            ruta = filedialog.asksaveasfilename(
+                title="Guardar estadísticas", defaultextension=".txt",
+                filetypes=[("Texto", "*.txt")]
+            )
+            if ruta:
+                with open(ruta, 'w', encoding='utf-8') as f:
+                    f.write(reporte)
+        
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(pady=(10, 0))
+        ttk.Button(button_frame, text="Copiar", command=copiar).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Guardar", command=guardar).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Cerrar", command=stats_window.destroy).pack(side=tk.LEFT)
+
+    def cerrar_aplicacion(self):
+        """Terminar las escrituras pendientes, cerrar la base de datos y la ventana"""
+        self.carga.cancelar()
+        self.db_lector.detener()
+        self.db_worker.detener()
+        self.db_manager.cerrar()
+        self.root.destroy()
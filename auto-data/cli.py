@@ -0,0 +1,125 @@
+"""
+Generación de datos sin interfaz gráfica.
+
+Lee un archivo de nombres (uno por línea) sin cargarlo entero en memoria y
+crea un dato por nombre con código, montos y dirección, haciendo commit por
+lotes. Ejemplo, desde la carpeta auto-data:
+
+    python -m cli nombres.txt --db datosex.db --lote 2000 --modo 5
+"""
+import argparse
+import sys
+import time
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+from db_manager import DatabaseManager
+from data_manager import DataManager
+
+
+def leer_nombres(archivo: TextIO) -> Iterator[str]:
+    """Nombres no vacíos del archivo, línea por línea"""
+    for linea in archivo:
+        nombre = linea.strip()
+        if nombre:
+            yield nombre
+
+
+def en_lotes(nombres: Iterable[str], tamano: int) -> Iterator[List[str]]:
+    """Agrupar los nombres en listas de hasta `tamano` elementos"""
+    iterador = iter(nombres)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def generar(data_manager: DataManager, nombres: Iterable[str], tamano_lote: int = 1000,
+            modo: str = 'random', errores: Optional[TextIO] = None,
+            progreso: Optional[TextIO] = None) -> dict:
+    """
+    Crear los datos de `nombres` en transacciones de `tamano_lote` nombres.
+    Las filas rechazadas se escriben en `errores` como 'nombre<TAB>error' y el
+    avance se muestra en `progreso`. Se detiene si no quedan direcciones libres.
+    Devuelve {"leidos", "creados", "rechazados", "segundos", "detenido"}.
+    """
+    resumen = {"leidos": 0, "creados": 0, "rechazados": 0, "segundos": 0.0, "detenido": None}
+    inicio = time.perf_counter()
+    for lote in en_lotes(nombres, tamano_lote):
+        try:
+            reporte = data_manager.crear_lote(lote, modo)
+        except ValueError as e:
+            # Falta de direcciones: el lote completo se deshizo
+            resumen["detenido"] = str(e)
+            break
+        resumen["leidos"] += len(lote)
+        for fila in reporte:
+            if fila["id"] is not None:
+                resumen["creados"] += 1
+            else:
+                resumen["rechazados"] += 1
+                if errores is not None:
+                    errores.write(f"{fila['nombre']}\t{fila['error']}\n")
+        resumen["segundos"] = time.perf_counter() - inicio
+        if progreso is not None:
+            progreso.write(f"\r{resumen['leidos']:,} leídos | {resumen['creados']:,} creados | "
+                           f"{resumen['rechazados']:,} rechazados | "
+                           f"{resumen['leidos'] / max(resumen['segundos'], 1e-9):,.0f} nombres/s")
+            progreso.flush()
+    resumen["segundos"] = time.perf_counter() - inicio
+    if progreso is not None and resumen["leidos"]:
+        progreso.write("\n")
+    return resumen
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="Generar datos en bloque desde un archivo de nombres (uno por línea)."
+    )
+    parser.add_argument("archivo", help="archivo de nombres; '-' para leer de la entrada estándar")
+    parser.add_argument("--db", default="datos.db",
+                        help="base de datos destino, p. ej. datos.db o datosex.db (por defecto: datos.db)")
+    parser.add_argument("--lote", type=int, default=1000, help="nombres por transacción (por defecto: 1000)")
+    parser.add_argument("--modo", default="random", choices=["random"] + [str(d) for d in range(10)],
+                        help="último dígito del código: 'random' o un dígito fijo")
+    parser.add_argument("--encoding", default="utf-8", help="codificación del archivo de nombres")
+    parser.add_argument("--semilla", type=int, default=None, help="semilla para resultados reproducibles")
+    parser.add_argument("--errores", default=None, help="archivo donde guardar los nombres rechazados")
+    parser.add_argument("--silencioso", action="store_true", help="no mostrar el progreso")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = crear_parser().parse_args(argv)
+    if args.lote < 1:
+        print("❌ --lote debe ser mayor que 0", file=sys.stderr)
+        return 2
+
+    db = DatabaseManager(args.db)
+    data_manager = DataManager(db, semilla=args.semilla)
+    archivo = sys.stdin if args.archivo == "-" else open(args.archivo, encoding=args.encoding)
+    errores = open(args.errores, "w", encoding="utf-8") if args.errores else None
+    try:
+        print(f"📂 {args.db}: {db.contar_direcciones_libres():,} direcciones libres", file=sys.stderr)
+        resumen = generar(data_manager, leer_nombres(archivo), args.lote, args.modo, errores,
+                          None if args.silencioso else sys.stderr)
+    finally:
+        if archivo is not sys.stdin:
+            archivo.close()
+        if errores is not None:
+            errores.close()
+        db.cerrar()
+
+    velocidad = resumen["leidos"] / resumen["segundos"] if resumen["segundos"] else 0.0
+    print(f"✅ {resumen['creados']:,} creados, {resumen['rechazados']:,} rechazados en "
+          f"{resumen['segundos']:.1f}s ({velocidad:,.0f} nombres/s)", file=sys.stderr)
+    if resumen["detenido"]:
+        print(f"❌ Detenido: {resumen['detenido']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
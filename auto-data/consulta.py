@@ -0,0 +1,134 @@
+"""
+Qué filas de la tabla datos muestra la interfaz y en qué orden: el filtro de
+nombres con 'q', la búsqueda de texto, los filtros por ZIP y por rango de
+montos y la columna de orden. DatabaseManager convierte una ConsultaDatos en
+las condiciones WHERE y el ORDER BY de sus lecturas por ventanas.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Palabras del buscador: letras y dígitos (el resto separa palabras, como en FTS5)
+PATRON_PALABRAS = re.compile(r"[^\W_]+")
+
+# Expresión SQL de cada columna ordenable. Son las mismas de los índices
+# (migraciones 2, 3, 6 y 8) para que SQLite ordene y filtre con ellos.
+EXPRESIONES_ORDEN = {
+    'id': "id",
+    'codigo': "codigo",
+    'nombre': "nombre COLLATE NOCASE",
+    'drireccion': "drireccion",
+    'zip4': "IFNULL(zip4, '')",
+    'amount_current_any': "IFNULL(amount_current_any, 0)",
+    'amount_current_regular': "IFNULL(amount_current_regular, 0)",
+    'amount_pas_any': "IFNULL(amount_pas_any, 0)",
+    'amount_pas_regular': "IFNULL(amount_pas_regular, 0)",
+}
+# Columnas que se pueden filtrar por rango
+COLUMNAS_MONTOS = ('amount_current_any', 'amount_current_regular', 'amount_pas_any', 'amount_pas_regular')
+
+
+def palabras_busqueda(texto: str) -> List[str]:
+    return PATRON_PALABRAS.findall(texto or "")
+
+
+def consulta_fts(texto: str) -> str:
+    """Consulta FTS5 para lo escrito en el buscador: cada palabra como prefijo y todas obligatorias"""
+    return " ".join(f'"{palabra}"*' for palabra in palabras_busqueda(texto))
+
+
+class ConsultaDatos:
+    def __init__(self, excluir_q: bool = True, busqueda: str = "", orden: str = 'id',
+                 descendente: bool = False, zip_prefijo: str = "",
+                 rangos: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None):
+        if orden not in EXPRESIONES_ORDEN:
+            raise ValueError(f"Columna de orden no válida: {orden}")
+        no_validas = sorted(set(rangos or {}) - set(COLUMNAS_MONTOS))
+        if no_validas:
+            raise ValueError(f"Columnas de rango no válidas: {', '.join(no_validas)}")
+        self.excluir_q = excluir_q
+        self.busqueda = busqueda
+        self.orden = orden
+        self.descendente = descendente
+        self.zip_prefijo = zip_prefijo
+        # {columna: (mínimo, máximo)}; None deja ese extremo abierto
+        self.rangos = dict(rangos or {})
+
+    def copiar(self, **cambios) -> 'ConsultaDatos':
+        """Otra consulta igual salvo los campos indicados"""
+        campos = dict(excluir_q=self.excluir_q, busqueda=self.busqueda, orden=self.orden,
+                      descendente=self.descendente, zip_prefijo=self.zip_prefijo, rangos=self.rangos)
+        campos.update(cambios)
+        return ConsultaDatos(**campos)
+
+    def ordenada_por(self, columna: str) -> 'ConsultaDatos':
+        """Ordenar por `columna`; si ya lo estaba, invertir el sentido"""
+        if columna == self.orden:
+            return self.copiar(descendente=not self.descendente)
+        return self.copiar(orden=columna, descendente=False)
+
+    def mismo_filtro(self, otra: 'ConsultaDatos') -> bool:
+        """Si las dos consultas muestran las mismas filas (aunque en otro orden)"""
+        return (self.excluir_q, self.busqueda, self.zip_prefijo.strip(), self.rangos) == \
+            (otra.excluir_q, otra.busqueda, otra.zip_prefijo.strip(), otra.rangos)
+
+    @property
+    def por_id(self) -> bool:
+        """Si las filas van en orden de ID ascendente (el de inserción)"""
+        return self.orden == 'id' and not self.descendente
+
+    @property
+    def expresion_orden(self) -> str:
+        return EXPRESIONES_ORDEN[self.orden]
+
+    def orden_sql(self, invertido: bool = False) -> str:
+        """ORDER BY de la consulta, desempatando por ID; invertido para leer hacia atrás"""
+        sentido = "DESC" if self.descendente != invertido else "ASC"
+        if self.orden == 'id':
+            return f"ORDER BY id {sentido}"
+        return f"ORDER BY {self.expresion_orden} {sentido}, id {sentido}"
+
+    def condiciones(self, fts: bool = True) -> Tuple[List[str], List[Any]]:
+        """
+        Condiciones SQL (para unir con AND) y sus parámetros. Sin FTS5 la
+        búsqueda se hace con LIKE sobre las mismas columnas, más lento.
+        """
+        condiciones: List[str] = []
+        parametros: List[Any] = []
+        if self.excluir_q:
+            condiciones.append("nombre NOT LIKE '%q%'")  # Filtrar nombres con 'q'
+        palabras = palabras_busqueda(self.busqueda)
+        if palabras and fts:
+            condiciones.append("id IN (SELECT rowid FROM datos_fts WHERE datos_fts MATCH ?)")
+            parametros.append(consulta_fts(self.busqueda))
+        elif palabras:
+            for palabra in palabras:
+                condiciones.append("(nombre LIKE ? OR codigo LIKE ? OR drireccion LIKE ? OR zip4 LIKE ?)")
+                parametros.extend([f"%{palabra}%"] * 4)
+        prefijo = self.zip_prefijo.strip()
+        if prefijo:
+            # Rango [prefijo, siguiente) en vez de LIKE para usar el índice de zip4
+            condiciones.append(f"{EXPRESIONES_ORDEN['zip4']} >= ? AND {EXPRESIONES_ORDEN['zip4']} < ?")
+            parametros.extend([prefijo, prefijo[:-1] + chr(ord(prefijo[-1]) + 1)])
+        for columna, (minimo, maximo) in self.rangos.items():
+            if minimo is not None:
+                condiciones.append(f"{EXPRESIONES_ORDEN[columna]} >= ?")
+                parametros.append(minimo)
+            if maximo is not None:
+                condiciones.append(f"{EXPRESIONES_ORDEN[columna]} <= ?")
+                parametros.append(maximo)
+        return condiciones, parametros
+
+    def clave_sql(self, id: int, hacia_atras: bool = False) -> Tuple[str, List[Any]]:
+        """
+        Condición de paginación por clave: las filas que van después de la
+        del ID indicado en el orden de la consulta (o antes, hacia_atras).
+        Con otra columna de orden la clave es (columna, id), escrita como
+        rango sobre la columna para que SQLite busque en su índice.
+        """
+        operador = "<" if self.descendente != hacia_atras else ">"
+        if self.orden == 'id':
+            return f"id {operador} ?", [id]
+        expresion = self.expresion_orden
+        valor = f"(SELECT {expresion} FROM datos WHERE id = ?)"
+        return (f"{expresion} {operador}= {valor} AND ({expresion} {operador} {valor} OR id {operador} ?)",
+                [id, id, id])
@@ -1,54 +1,194 @@
 
+import os
 import random
 import string
-from typing import Dict
+import tempfile
+import time
+from array import array
+from typing import Dict, List, Any, Iterable, Optional, Set
+from dato import Dato
 from db_manager import DatabaseManager
+from nombres import normalizar_nombres
+from importar import importar_lineas_tsv
+
+# NumPy es opcional: si no está instalado los lotes se generan en Python puro
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Columnas de montos: (columna decimal, columna entera derivada)
+COLUMNAS_MONTOS = (
+    ("amount_current_any", "amount_current_regular"),
+    ("amount_pas_any", "amount_pas_regular"),
+)
+MONTO_MINIMO, MONTO_MAXIMO = 10.0, 99.99
+
+# Posiciones de las letras en el código (2D 2L 3D 1L 4D 1D); el resto son dígitos
+POSICIONES_LETRAS = (2, 3, 7)
+LARGO_CODIGO = 13
+
+
+def digito_fijo(modo: str) -> Optional[str]:
+    """Último dígito del código para el modo: un dígito fijo ('0' a '9') o None si es 'random'"""
+    return modo if len(modo) == 1 and modo in string.digits else None
+
 
 class DataManager:
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, semilla: Optional[int] = None):
         self.db = db_manager
-        self.direcciones_disponibles = []
-        self.cargar_direcciones()
+        # Con semilla todos los lotes son reproducibles (y se generan en Python puro)
+        self.semilla = semilla
+        self.rng = random.Random(semilla)
+        self._codigos_existentes: Optional[Set[str]] = None
+        # Índice de nombres existentes (claves sin mayúsculas), se carga al primer uso
+        self._nombres: Optional[Set[str]] = None
     
-    def cargar_direcciones(self):
-        """Cargar direcciones disponibles"""
-        try:
-            # Obtener todas las direcciones
-            direcciones = self.db.obtener_direcciones_limpias()
-            # Obtener direcciones ocupadas
-            ocupadas = self.db.obtener_direcciones_ocupadas()
-            # Normalizar ocupadas
-            ocupadas_normalizadas = [d.upper() for d in ocupadas if d]
-            # Filtrar solo las libres
-            self.direcciones_disponibles = [
-                dir_obj for dir_obj in direcciones 
-                if not ocupadas_normalizadas.count((dir_obj["direccion"] or "").upper())
-            ]
-        except Exception as e:
-            print(f"Error al cargar direcciones: {e}")
-            self.direcciones_disponibles = []
-    
-    def obtener_direccion_unica(self) -> Dict[str, str]:
-        """Obtener una dirección única disponible"""
-        if not self.direcciones_disponibles:
-            return {"direccion": self.generar_direccion_aleatoria(), "zip4": ""}
-        return self.direcciones_disponibles.pop(0)
-    
-    def generar_direccion_aleatoria(self) -> str:
-        """Generar una dirección aleatoria"""
-        calles = [
-            "Main Street", "Oak Avenue", "Pine Road", "Elm Street", "Cedar Lane",
-            "Maple Drive", "Washington Blvd", "Lincoln Avenue", "Park Street"
+    def contar_direcciones_disponibles(self) -> int:
+        """Cantidad de direcciones libres en la base de datos"""
+        return self.db.contar_direcciones_libres()
+    
+    @staticmethod
+    def _clave_nombre(nombre: str) -> str:
+        """Clave del índice de nombres (mismas reglas que crear_dato: guiones como espacios)"""
+        return (nombre or "").replace('-', ' ').strip().casefold()
+    
+    def _indice_nombres(self) -> Set[str]:
+        """Claves de los nombres existentes; se cargan de la base una sola vez"""
+        if self._nombres is None:
+            self._nombres = {self._clave_nombre(n) for n in self.db.obtener_nombres()}
+        return self._nombres
+    
+    def invalidar_nombres(self):
+        """Forzar que el índice de nombres se vuelva a leer de la base"""
+        self._nombres = None
+    
+    def validar_nombres(self, nombres: List[str]) -> List[Optional[str]]:
+        """
+        Validar un lote completo de nombres contra el índice en memoria, sin
+        consultar la base. Devuelve el error de cada nombre (None si es válido).
+        """
+        existentes = self._indice_nombres()
+        vistos = set()
+        errores: List[Optional[str]] = []
+        for nombre in nombres:
+            clave = self._clave_nombre(nombre)
+            if not clave:
+                errores.append('El nombre está vacío.')
+            elif clave in existentes:
+                errores.append('El nombre ya existe en la base de datos.')
+            elif clave in vistos:
+                errores.append('El nombre está repetido en el lote.')
+            else:
+                vistos.add(clave)
+                errores.append(None)
+        return errores
+    
+    def eliminar_dato(self, id: int) -> bool:
+        """Eliminar un dato y quitar su nombre del índice (el trigger de usada libera su dirección)"""
+        eliminados = self.db.eliminar_datos([id])
+        for eliminado in eliminados:
+            if self._nombres is not None:
+                self._nombres.discard(self._clave_nombre(eliminado["nombre"]))
+        return bool(eliminados)
+    
+    def eliminar_primer_dato(self) -> Optional[int]:
+        """Eliminar el dato con el ID más bajo; devuelve su ID"""
+        primero = self.db.leer_pagina_datos(limite=1, excluir_q=False)
+        if not primero or not self.eliminar_dato(primero[0].id):
+            return None
+        return primero[0].id
+    
+    def eliminar_todos_datos(self) -> int:
+        """Eliminar todos los datos; todas las direcciones y nombres quedan libres"""
+        eliminados = self.db.eliminar_todos_datos()
+        self._nombres = set()
+        return eliminados
+    
+    def resetear_ids_datos(self, id_inicial: int = 101) -> bool:
+        """Borrar todos los datos y reiniciar los IDs (ver DatabaseManager.resetear_ids_datos)"""
+        resultado = self.db.resetear_ids_datos(id_inicial)
+        self._nombres = set()
+        return resultado
+    
+    def importar_datos_tsv(self, lineas: Iterable[str], clave: str = 'id') -> List[Dict[str, Any]]:
+        """
+        Importar filas TSV con las columnas de la tabla en una sola transacción
+        (ver importar.importar_lineas_tsv). Como puede tocar muchos nombres y
+        códigos, los índices en memoria se recargan enteros.
+        """
+        reporte = importar_lineas_tsv(self.db, lineas, clave)
+        if any(fila["accion"] for fila in reporte):
+            self._nombres = None
+            self._codigos_existentes = None
+        return reporte
+    
+    def importar_archivo_tsv(self, ruta: str, clave: str = 'id', encoding: str = 'utf-8') -> List[Dict[str, Any]]:
+        """Leer e importar un archivo TSV (ver importar_datos_tsv); pensado para el hilo escritor"""
+        with open(ruta, encoding=encoding) as archivo:
+            return self.importar_datos_tsv(archivo, clave)
+    
+    def actualizar_dato(self, dato: Dato, anterior: Dato) -> bool:
+        """Guardar la edición de un dato y aplicar el cambio de nombre al índice de nombres"""
+        actualizado = self.db.actualizar_dato(dato)
+        if actualizado and self._nombres is not None \
+                and self._clave_nombre(anterior.nombre) != self._clave_nombre(dato.nombre):
+            self._nombres.discard(self._clave_nombre(anterior.nombre))
+            self._nombres.add(self._clave_nombre(dato.nombre))
+        return actualizado
+    
+    def crear_lote(self, nombres: List[str], modo: str = 'random') -> List[Dict[str, Any]]:
+        """
+        Generar y guardar un dato por nombre en una sola transacción.
+        Los nombres se normalizan primero (sin acentos ni símbolos, en
+        mayúsculas) y todo el lote se valida contra el índice de nombres; solo los
+        válidos reservan dirección y se insertan. Las direcciones se reservan
+        en la base, así que varias instancias de la aplicación no pueden
+        repetirlas; ver
+        DatabaseManager.crear_datos_con_direcciones. Devuelve un reporte por
+        nombre como el de DatabaseManager.crear_datos_lote.
+        """
+        nombres = normalizar_nombres(nombres)
+        errores = self.validar_nombres(nombres)
+        reporte = [{"nombre": nombre, "id": None, "error": error} for nombre, error in zip(nombres, errores)]
+        posiciones = [i for i, error in enumerate(errores) if error is None]
+        if not posiciones:
+            return reporte
+        
+        codigos = self.generar_codigos_lote(len(posiciones), modo)
+        montos = self.generar_montos_lote(len(posiciones))
+        datos = [
+            Dato(
+                codigo=codigos[i],
+                nombre=nombres[pos],
+                amount_current_any=montos["amount_current_any"][i],
+                amount_current_regular=montos["amount_current_regular"][i],
+                amount_pas_any=montos["amount_pas_any"][i],
+                amount_pas_regular=montos["amount_pas_regular"][i]
+            )
+            for i, pos in enumerate(posiciones)
         ]
-        numeros = random.randint(100, 9999)
-        calle = random.choice(calles)
-        return f"{numeros} {calle}"
+        try:
+            # Reserva de direcciones e inserción en una sola transacción plana
+            reporte_insert = self.db.crear_datos_con_direcciones(datos)
+        except ValueError:
+            # Sin direcciones suficientes no se guardó nada: los códigos quedan libres
+            self._codigos_existentes.difference_update(codigos)
+            raise
+        
+        for pos, resultado in zip(posiciones, reporte_insert):
+            reporte[pos] = resultado
+        creados = [d for d, r in zip(datos, reporte_insert) if r["id"] is not None]
+        indice = self._indice_nombres()
+        indice.update(self._clave_nombre(d.nombre) for d in creados)
+        return reporte
     
     def generar_codigo_aleatorio(self, modo: str = 'random') -> str:
         """
         Genera un código aleatorio en formato compacto.
         Formato: 2D 2L 3D 1L 4D 1D  (D=dígito, L=letra)
-        Ejemplo: '12AB345C67890' o '34XY789Z12345' si modo='5'
+        Ejemplo: '12AB345C67890' o '34XY789Z12345' si modo='5'; cualquier
+        dígito de '0' a '9' como modo fija el último carácter
         """
         def rc(chars, n):  # Función auxiliar más corta
             return ''.join(random.choices(chars, k=n))
@@ -59,10 +199,105 @@ class DataManager:
         p3 = rc(string.digits, 3)     # 3 dígitos
         p4 = rc(string.ascii_uppercase, 1)  # 1 letra
         p5 = rc(string.digits, 4)     # 4 dígitos
-        p6 = '5' if modo == '5' else rc(string.digits, 1)  # 1 dígito o '5'
+        p6 = digito_fijo(modo) or rc(string.digits, 1)  # 1 dígito, o el fijo del modo
         
         return f"{p1}{p2}{p3}{p4}{p5}{p6}"
     
+    def _codigos_python(self, n: int, modo: str, rng: random.Random) -> List[str]:
+        """Generar n códigos con el módulo random"""
+        digitos, letras = string.digits, string.ascii_uppercase
+        fijo = digito_fijo(modo)
+        codigos = []
+        for _ in range(n):
+            d = rng.choices(digitos, k=10)
+            l = rng.choices(letras, k=3)
+            ultimo = fijo or d[9]
+            codigos.append(f"{d[0]}{d[1]}{l[0]}{l[1]}{d[2]}{d[3]}{d[4]}{l[2]}{d[5]}{d[6]}{d[7]}{d[8]}{ultimo}")
+        return codigos
+    
+    def _codigos_numpy(self, n: int, modo: str) -> List[str]:
+        """Generar n códigos de una vez como matriz de bytes ASCII"""
+        rng = np.random.default_rng()
+        matriz = rng.integers(ord('0'), ord('9') + 1, size=(n, LARGO_CODIGO), dtype=np.uint8)
+        matriz[:, POSICIONES_LETRAS] = rng.integers(ord('A'), ord('Z') + 1, size=(n, len(POSICIONES_LETRAS)), dtype=np.uint8)
+        fijo = digito_fijo(modo)
+        if fijo is not None:
+            matriz[:, -1] = ord(fijo)
+        return matriz.view(f'S{LARGO_CODIGO}').ravel().astype(f'U{LARGO_CODIGO}').tolist()
+    
+    def generar_codigos_lote(self, n: int, modo: str = 'random', semilla: Optional[int] = None) -> List[str]:
+        """
+        Generar n códigos únicos con el formato de generar_codigo_aleatorio.
+        Se descartan y regeneran los que ya existen en datos (cargados una vez
+        desde la base) o se repiten dentro del lote. Usa NumPy si está
+        disponible; con semilla (aquí o en el DataManager) el resultado es
+        reproducible y se genera en Python puro.
+        """
+        if self._codigos_existentes is None:
+            self._codigos_existentes = set(self.db.obtener_codigos())
+        existentes = self._codigos_existentes
+        
+        if semilla is not None:
+            rng = random.Random(semilla)
+        else:
+            rng = self.rng
+        usar_numpy = np is not None and semilla is None and self.semilla is None
+        
+        codigos: List[str] = []
+        faltan = n
+        while faltan > 0:
+            candidatos = self._codigos_numpy(faltan, modo) if usar_numpy else self._codigos_python(faltan, modo, rng)
+            for codigo in candidatos:
+                if codigo not in existentes:
+                    existentes.add(codigo)
+                    codigos.append(codigo)
+            faltan = n - len(codigos)
+        return codigos
+    
     def generar_numero_decimal(self) -> str:
         """Generar número decimal entre 10.00 y 99.99, siempre con dos decimales"""
-        return f"{random.uniform(10.0, 99.99):.2f}"
+        return f"{random.uniform(MONTO_MINIMO, MONTO_MAXIMO):.2f}"
+    
+    def generar_montos_lote(self, n: int, semilla: Optional[int] = None) -> Dict[str, array]:
+        """
+        Generar los cuatro montos de n datos como columnas.
+        Las columnas *_any son array('d') redondeadas a 2 decimales entre 10.00
+        y 99.99; las *_regular son array('q') con su parte entera. Los valores
+        se leen como float/int de Python, listos para executemany.
+        """
+        montos: Dict[str, array] = {}
+        usar_numpy = np is not None and semilla is None and self.semilla is None
+        rng = random.Random(semilla) if semilla is not None else self.rng
+        for col_any, col_regular in COLUMNAS_MONTOS:
+            if usar_numpy:
+                valores = np.round(np.random.default_rng().uniform(MONTO_MINIMO, MONTO_MAXIMO, n), 2)
+                col_decimal = array('d', valores.astype(np.float64).tobytes())
+                col_entera = array('q', np.trunc(valores).astype(np.int64).tobytes())
+            else:
+                col_decimal = array('d', [round(rng.uniform(MONTO_MINIMO, MONTO_MAXIMO), 2) for _ in range(n)])
+                col_entera = array('q', map(int, col_decimal))
+            montos[col_any] = col_decimal
+            montos[col_regular] = col_entera
+        return montos
+
+
+def benchmark(lotes: int = 4, tamano_lote: int = 5000) -> List[float]:
+    """Segundos de crear_lote por lote sobre una base temporal; deben mantenerse parejos al crecer la tabla"""
+    with tempfile.TemporaryDirectory() as carpeta:
+        db = DatabaseManager(os.path.join(carpeta, 'benchmark.db'))
+        try:
+            db.importar_direcciones(f'{i} OAK AVE 9{i % 10000:04d}' for i in range(lotes * tamano_lote))
+            manager = DataManager(db)
+            tiempos = []
+            for lote in range(lotes):
+                inicio = time.perf_counter()
+                manager.crear_lote([f'NOMBRE {lote} {i}' for i in range(tamano_lote)])
+                tiempos.append(time.perf_counter() - inicio)
+        finally:
+            db.cerrar()
+    return tiempos
+
+
+if __name__ == "__main__":
+    for lote, segundos in enumerate(benchmark(), 1):
+        print(f"📊 lote {lote}: {segundos:.2f}s")
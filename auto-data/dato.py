@@ -1,8 +1,34 @@
+from array import array
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from exportar import linea_tsv
+
+
+def _a_float(valor) -> float:
+    """Convertir un monto de la base a float (0.0 si es nulo o inválido)"""
+    if valor is None:
+        return 0.0
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _a_int(valor) -> int:
+    """Convertir un monto entero de la base a int (0 si es nulo o inválido)"""
+    if valor is None:
+        return 0
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return 0
 
-from typing import Optional, Dict, Any
 
 class Dato:
-    def __init__(self, id: Optional[int] = None, codigo: str = "", 
+    __slots__ = ('id', 'codigo', 'nombre', 'drireccion', 'zip4',
+                 'amount_current_any', 'amount_current_regular',
+                 'amount_pas_any', 'amount_pas_regular')
+
+    def __init__(self, id: Optional[int] = None, codigo: str = "",
                  nombre: str = "", drireccion: str = "", zip4: Optional[str] = None,
                  amount_current_any: float = 0.0, amount_current_regular: int = 0,
                  amount_pas_any: float = 0.0, amount_pas_regular: int = 0):
@@ -15,7 +41,30 @@ class Dato:
         self.amount_current_regular = amount_current_regular
         self.amount_pas_any = amount_pas_any
         self.amount_pas_regular = amount_pas_regular
-    
+
+    @classmethod
+    def desde_fila(cls, fila: Tuple) -> 'Dato':
+        """
+        Construir un Dato desde una fila (id, codigo, nombre, drireccion, zip4,
+        4 montos) sin pasar por __init__; los montos solo se convierten si no
+        vienen ya con el tipo correcto.
+        """
+        dato = cls.__new__(cls)
+        (dato.id, dato.codigo, dato.nombre, dato.drireccion, zip4,
+         aca, acr, apa, apr) = fila
+        dato.zip4 = zip4 if zip4 is not None else ""
+        dato.amount_current_any = aca if type(aca) is float else _a_float(aca)
+        dato.amount_current_regular = acr if type(acr) is int else _a_int(acr)
+        dato.amount_pas_any = apa if type(apa) is float else _a_float(apa)
+        dato.amount_pas_regular = apr if type(apr) is int else _a_int(apr)
+        return dato
+
+    def a_fila(self) -> Tuple:
+        """Tupla con el mismo orden de columnas que desde_fila"""
+        return (self.id, self.codigo, self.nombre, self.drireccion, self.zip4,
+                self.amount_current_any, self.amount_current_regular,
+                self.amount_pas_any, self.amount_pas_regular)
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
@@ -28,3 +77,92 @@ class Dato:
             'amount_pas_any': self.amount_pas_any,
             'amount_pas_regular': self.amount_pas_regular
         }
+
+
+class DatoBatch:
+    """
+    Muchos datos guardados por columnas: textos en listas y montos en
+    array('d') / array('q'). Evita un objeto (y un dict) por fila en las
+    cargas y exportaciones grandes.
+    """
+
+    def __init__(self):
+        self.ids: List[Optional[int]] = []
+        self.codigos: List[str] = []
+        self.nombres: List[str] = []
+        self.direcciones: List[str] = []
+        self.zip4s: List[str] = []
+        self.amount_current_any = array('d')
+        self.amount_current_regular = array('q')
+        self.amount_pas_any = array('d')
+        self.amount_pas_regular = array('q')
+
+    @classmethod
+    def desde_filas(cls, filas: Iterable[Tuple]) -> 'DatoBatch':
+        """Crear un lote desde filas con el orden de Dato.desde_fila"""
+        lote = cls()
+        lote.extender_filas(filas)
+        return lote
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def __getitem__(self, i: int) -> Dato:
+        return Dato.desde_fila(self.fila(i))
+
+    def __iter__(self) -> Iterator[Dato]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def agregar(self, dato: Dato):
+        """Agregar un Dato al final del lote"""
+        self.agregar_fila(dato.a_fila())
+
+    def agregar_fila(self, fila: Tuple):
+        """Agregar una fila (id, codigo, nombre, drireccion, zip4, 4 montos)"""
+        self.ids.append(fila[0])
+        self.codigos.append(fila[1])
+        self.nombres.append(fila[2])
+        self.direcciones.append(fila[3])
+        self.zip4s.append(fila[4] if fila[4] is not None else "")
+        self.amount_current_any.append(fila[5] if type(fila[5]) is float else _a_float(fila[5]))
+        self.amount_current_regular.append(fila[6] if type(fila[6]) is int else _a_int(fila[6]))
+        self.amount_pas_any.append(fila[7] if type(fila[7]) is float else _a_float(fila[7]))
+        self.amount_pas_regular.append(fila[8] if type(fila[8]) is int else _a_int(fila[8]))
+
+    def extender_filas(self, filas: Iterable[Tuple]):
+        """Agregar muchas filas (por ejemplo un cursor de sqlite3)"""
+        for fila in filas:
+            self.agregar_fila(fila)
+
+    def fila(self, i: int) -> Tuple:
+        """Fila i como tupla, en el orden de Dato.desde_fila"""
+        return (self.ids[i], self.codigos[i], self.nombres[i], self.direcciones[i], self.zip4s[i],
+                self.amount_current_any[i], self.amount_current_regular[i],
+                self.amount_pas_any[i], self.amount_pas_regular[i])
+
+    def filas(self) -> Iterator[Tuple]:
+        """Todas las filas como tuplas, sin crear objetos Dato"""
+        return zip(self.ids, self.codigos, self.nombres, self.direcciones, self.zip4s,
+                   self.amount_current_any, self.amount_current_regular,
+                   self.amount_pas_any, self.amount_pas_regular)
+
+    def parametros_insert(self) -> Iterator[Tuple]:
+        """Parámetros para executemany de INSERT INTO datos (sin id, mismo orden que crear_dato)"""
+        return zip(self.codigos, self.nombres, self.direcciones, self.zip4s,
+                   self.amount_current_any, self.amount_current_regular,
+                   self.amount_pas_any, self.amount_pas_regular)
+
+    def lineas_tsv(self) -> Iterator[str]:
+        """Una línea TSV por dato, con el mismo formato que la copia desde la tabla"""
+        for fila in self.filas():
+            yield linea_tsv(fila)
+
+    def escribir_tsv(self, archivo) -> int:
+        """Escribir el lote en un archivo de texto abierto; devuelve las líneas escritas"""
+        escritas = 0
+        for linea in self.lineas_tsv():
+            archivo.write(linea)
+            archivo.write("\n")
+            escritas += 1
+        return escritas
@@ -1,94 +1,173 @@
 
 import sqlite3
-import re
-from typing import List, Dict
-from dato import Dato
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+from dato import Dato, DatoBatch
+from migraciones import aplicar_migraciones
+from direcciones import normalizar_direccion
+from metricas import MetricasDB, medido
+from consulta import ConsultaDatos
+
+COLUMNAS_DATOS = ('id, codigo, nombre, drireccion, zip4, amount_current_any, '
+                  'amount_current_regular, amount_pas_any, amount_pas_regular')
+
+
+def _fecha_hoy() -> str:
+    """Fecha con el formato de la columna fecha de datosex.db ('July 23, 2025')"""
+    return datetime.now().strftime('%B %d, %Y')
+
+
+def _fila_a_dato(cursor: sqlite3.Cursor, fila: tuple) -> Dato:
+    """row_factory que construye un Dato a partir de una fila de COLUMNAS_DATOS"""
+    return Dato.desde_fila(fila)
+
 
 class DatabaseManager:
-    def __init__(self, db_path: str = "datos.db"):
+    def __init__(self, db_path: str = "datos.db", cached_statements: int = 256,
+                 instrumentar: bool = False, umbral_lento_ms: float = 50.0):
         self.db_path = db_path
+        self.cached_statements = cached_statements
+        # Métricas por método y registro de sentencias lentas (opcional)
+        self._metricas = MetricasDB(umbral_lento_ms) if instrumentar else None
+        # Una conexión persistente por hilo (sqlite3 no comparte conexiones entre hilos)
+        self._local = threading.local()
+        self._conexiones = []
+        self._lock = threading.Lock()
         self.init_database()
     
-    def init_database(self):
-        """Inicializar la base de datos con las tablas necesarias"""
-        conn = sqlite3.connect(self.db_path)
+    def _abrir_conexion(self) -> sqlite3.Connection:
+        """Abrir una conexión nueva en modo WAL con caché de sentencias"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            cached_statements=self.cached_statements,
+            isolation_level=None,  # Las transacciones se manejan con transaccion()
+            check_same_thread=False
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        # En WAL, NORMAL evita un fsync por commit sin arriesgar la integridad
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        # Usada por los INSERT en bases con columna fecha (ver init_database)
+        conn.create_function('fecha_hoy', 0, _fecha_hoy)
+        if self._metricas is not None:
+            self._metricas.registrar_conexion(conn)
+        with self._lock:
+            self._conexiones.append(conn)
+        return conn
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener la conexión persistente del hilo actual (no se debe cerrar)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._abrir_conexion()
+            self._local.conn = conn
+            self._local.nivel = 0
+        return conn
+    
+    @contextmanager
+    def transaccion(self, inmediata: bool = True) -> Iterator[sqlite3.Cursor]:
+        """
+        Abrir una transacción sobre la conexión del hilo actual.
+        Hace commit al salir y rollback si ocurre una excepción. Las transacciones
+        anidadas se convierten en SAVEPOINTs de la transacción exterior.
+        """
+        conn = self.get_connection()
+        nivel = self._local.nivel
+        if nivel == 0:
+            conn.execute('BEGIN IMMEDIATE' if inmediata else 'BEGIN')
+        else:
+            conn.execute(f'SAVEPOINT sp_{nivel}')
+        self._local.nivel = nivel + 1
         cursor = conn.cursor()
-        
-        # Crear tabla datos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS datos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo TEXT NOT NULL,
-                nombre TEXT NOT NULL,
-                drireccion TEXT NOT NULL,
-                zip4 TEXT,
-                amount_current_any REAL,
-                amount_current_regular INTEGER,
-                amount_pas_any REAL,
-                amount_pas_regular INTEGER
-            )
-        ''')
-        
-        # Crear tabla direcciones con columna usada
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS direcciones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                direccion TEXT UNIQUE NOT NULL,
-                zip4 TEXT,
-                usada INTEGER DEFAULT 0
-            )
-        ''')
-        
-        # Si la columna usada no existe, agregarla
-        cursor.execute("PRAGMA table_info(direcciones)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'usada' not in columns:
-            cursor.execute('ALTER TABLE direcciones ADD COLUMN usada INTEGER DEFAULT 0')
-        
-        conn.commit()
+        try:
+            yield cursor
+        except BaseException:
+            if nivel == 0:
+                conn.execute('ROLLBACK')
+            else:
+                conn.execute(f'ROLLBACK TO sp_{nivel}')
+                conn.execute(f'RELEASE sp_{nivel}')
+            raise
+        else:
+            if nivel == 0:
+                conn.execute('COMMIT')
+            else:
+                conn.execute(f'RELEASE sp_{nivel}')
+        finally:
+            cursor.close()
+            self._local.nivel = nivel
+    
+    def cerrar(self):
+        """Cerrar todas las conexiones abiertas por este DatabaseManager"""
+        with self._lock:
+            conexiones, self._conexiones = self._conexiones, []
+        for conn in conexiones:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+    
+    def cerrar_conexion_hilo(self):
+        """Cerrar solo la conexión del hilo actual (p. ej. al terminar un hilo de trabajo)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        with self._lock:
+            if conn in self._conexiones:
+                self._conexiones.remove(conn)
         conn.close()
+        self._local.conn = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Métricas acumuladas por método y sentencias lentas ({} si no hay instrumentación)"""
+        return self._metricas.stats() if self._metricas is not None else {}
     
-    def get_connection(self):
-        return sqlite3.connect(self.db_path)
+    def reporte_stats(self) -> str:
+        """Métricas en texto plano, para mostrar o guardar desde la interfaz"""
+        if self._metricas is None:
+            return "La instrumentación está desactivada."
+        return self._metricas.reporte()
+    
+    def init_database(self):
+        """Inicializar la base de datos aplicando las migraciones pendientes"""
+        aplicar_migraciones(self)
+        # datosex.db tiene además una columna fecha NOT NULL; se llena al insertar
+        columnas = [fila[1] for fila in self.get_connection().execute('PRAGMA table_info(datos)')]
+        fecha = ('fecha', 'fecha_hoy()') if 'fecha' in columnas else ()
+        campos = ('codigo', 'nombre', 'drireccion', 'zip4', 'amount_current_any',
+                  'amount_current_regular', 'amount_pas_any', 'amount_pas_regular')
+        self._sql_insertar_dato = (
+            f'INSERT INTO datos ({", ".join(campos + fecha[:1])}) '
+            f'VALUES ({", ".join(("?",) * len(campos) + fecha[1:])})'
+        )
+        # Igual, pero conservando el ID (importaciones por ID)
+        self._sql_insertar_dato_con_id = (
+            f'INSERT INTO datos ({", ".join(("id",) + campos + fecha[:1])}) '
+            f'VALUES ({", ".join(("?",) * (len(campos) + 1) + fecha[1:])})'
+        )
+        # Índice de búsqueda (migración 7); sin FTS5 el buscador usa LIKE
+        self._fts = self.get_connection().execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'datos_fts'"
+        ).fetchone() is not None
     
+    @medido
     def crear_dato(self, dato: Dato) -> int:
         """Crear un nuevo dato en la base de datos, evitando nombres duplicados (case-insensitive) y reemplazando guiones por espacios en el nombre"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
+        with self.transaccion() as cursor:
             # Reemplazar guiones por espacios en el nombre
             dato.nombre = dato.nombre.replace('-', ' ')
             
             # Verificar nombre duplicado (case-insensitive)
-            cursor.execute('SELECT COUNT(*) FROM datos WHERE UPPER(nombre) = UPPER(?)', (dato.nombre,))
+            cursor.execute('SELECT COUNT(*) FROM datos WHERE nombre = ? COLLATE NOCASE', (dato.nombre,))
             if cursor.fetchone()[0] > 0:
-                conn.close()
                 raise ValueError('El nombre ya existe en la base de datos.')
             
             # Procesar dirección
-            drireccion_original = dato.drireccion
-            sin_numero = re.sub(r"^\d+\.\s*", "", drireccion_original)
-            sin_la = re.sub(r",\s*LOS ANGELES", "", sin_numero, flags=re.IGNORECASE)
-            partes = sin_la.rsplit(",", 1)
-            calle_limpia = partes[0].strip() if len(partes) > 1 else sin_la.strip()
-            
-            # Extraer ZIP+4
-            match_zip = re.search(r"(\d{5})(-(\d{4,5}))?$", sin_la)
-            if match_zip:
-                zip5 = match_zip.group(1)
-                zip4_5 = match_zip.group(3)
-                if zip4_5:
-                    if len(zip4_5) == 4 or len(zip4_5) == 5:
-                        zip4 = f"{zip5}-{zip4_5}"
-                    else:
-                        zip4 = ""
-                else:
-                    zip4 = zip5
-            else:
-                zip4 = ""
-            dato.drireccion = calle_limpia
-            dato.zip4 = zip4
+            dato.drireccion, dato.zip4 = normalizar_direccion(dato.drireccion)
             
             # Buscar ZIP4 en tabla direcciones si no se encontró
             if not dato.zip4:
@@ -102,222 +181,554 @@ class DatabaseManager:
             # Validar que la dirección no esté repetida
             cursor.execute('SELECT COUNT(*) FROM datos WHERE drireccion = ?', (dato.drireccion,))
             if cursor.fetchone()[0] > 0:
-                conn.close()
                 raise ValueError('La dirección ya existe en la base de datos.')
             
             # Insertar dato
-            cursor.execute('''
-                INSERT INTO datos (codigo, nombre, drireccion, zip4, amount_current_any, amount_current_regular, amount_pas_any, amount_pas_regular)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (dato.codigo, dato.nombre, dato.drireccion, dato.zip4, 
+            cursor.execute(self._sql_insertar_dato, (dato.codigo, dato.nombre, dato.drireccion, dato.zip4, 
                   dato.amount_current_any, dato.amount_current_regular, dato.amount_pas_any, dato.amount_pas_regular))
+            id_insertado = cursor.lastrowid
             
             # Insertar en direcciones si es necesario
             if dato.drireccion and dato.zip4:
                 cursor.execute('INSERT OR IGNORE INTO direcciones (direccion, zip4) VALUES (?, ?)', 
                              (dato.drireccion, dato.zip4))
             
-            conn.commit()
-            id_insertado = cursor.lastrowid
-            conn.close()
             return id_insertado
-            
-        except Exception as e:
-            if 'conn' in locals():
-                conn.close()
-            raise e
     
+    @medido
+    def crear_datos_lote(self, datos: List[Dato]) -> List[Dict[str, Any]]:
+        """
+        Crear muchos datos en una sola transacción.
+        Los nombres y direcciones se validan contra la base con consultas por
+        conjunto (tabla temporal + JOIN) en vez de una consulta por dato.
+        Devuelve un reporte por fila: {"nombre", "id", "error"}; "id" es None
+        si la fila no se insertó.
+        """
+        with self.transaccion() as cursor:
+            return self._insertar_datos_lote(cursor, datos)
+    
+    @medido
+    def crear_datos_con_direcciones(self, datos: List[Dato]) -> List[Dict[str, Any]]:
+        """
+        Reservar una dirección libre para cada dato y crearlos, todo en una
+        sola transacción plana (sin SAVEPOINTs: con los triggers de datos el
+        executemany dentro de un SAVEPOINT es mucho más lento). Lanza
+        ValueError, sin guardar nada, si no hay direcciones para todos. Las
+        reservas de las filas rechazadas se devuelven. Reporte como el de
+        crear_datos_lote.
+        """
+        if not datos:
+            return []
+        with self.transaccion() as cursor:
+            direcciones = self._reservar_direcciones(cursor, len(datos))
+            if len(direcciones) < len(datos):
+                # Al salir con la excepción se deshace la reserva
+                raise ValueError(f"No hay suficientes direcciones disponibles. "
+                                 f"Necesitas {len(datos)} pero solo tienes {len(direcciones)}")
+            for dato, dir_obj in zip(datos, direcciones):
+                dato.drireccion, dato.zip4 = dir_obj["direccion"], dir_obj["zip4"]
+            # Tal como están en direcciones: los triggers de usada y la
+            # liberación de fallidas comparan el texto exacto
+            reporte = self._insertar_datos_lote(cursor, datos, normalizar=False)
+            fallidas = [d["direccion"] for d, r in zip(direcciones, reporte) if r["id"] is None]
+            if fallidas:
+                self._liberar_direcciones(cursor, fallidas)
+        return reporte
+    
+    def _insertar_datos_lote(self, cursor: sqlite3.Cursor, datos: List[Dato],
+                             normalizar: bool = True) -> List[Dict[str, Any]]:
+        """
+        Cuerpo de crear_datos_lote, dentro de la transacción del llamador.
+        Con normalizar=False las direcciones (ya reservadas) se guardan sin
+        cambios, con su zip4.
+        """
+        reporte = []
+        filas = []
+        for pos, dato in enumerate(datos):
+            # Mismas reglas que crear_dato
+            dato.nombre = dato.nombre.replace('-', ' ')
+            if normalizar:
+                dato.drireccion, dato.zip4 = normalizar_direccion(dato.drireccion)
+            reporte.append({"nombre": dato.nombre, "id": None, "error": None})
+            filas.append((pos, dato.nombre, dato.drireccion, dato.zip4))
+        
+        if not filas:
+            return reporte
+        
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS lote_datos (
+                pos INTEGER PRIMARY KEY,
+                nombre TEXT COLLATE NOCASE,
+                drireccion TEXT,
+                zip4 TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS temp.idx_lote_nombre ON lote_datos (nombre)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS temp.idx_lote_drireccion ON lote_datos (drireccion)')
+        cursor.execute('DELETE FROM lote_datos')
+        cursor.executemany('INSERT INTO lote_datos (pos, nombre, drireccion, zip4) VALUES (?, ?, ?, ?)', filas)
+        
+        # Nombres que ya existen (case-insensitive)
+        cursor.execute('''
+            SELECT DISTINCT l.pos FROM lote_datos l
+            JOIN datos d ON d.nombre = l.nombre COLLATE NOCASE
+        ''')
+        for (pos,) in cursor.fetchall():
+            reporte[pos]["error"] = 'El nombre ya existe en la base de datos.'
+        
+        # Completar ZIP4 desde la tabla direcciones si no se encontró
+        cursor.execute('''
+            SELECT l.pos, dir.zip4 FROM lote_datos l
+            JOIN direcciones dir ON dir.direccion = l.drireccion
+            WHERE l.zip4 = '' AND dir.zip4 IS NOT NULL AND dir.zip4 != ''
+        ''')
+        for pos, zip4 in cursor.fetchall():
+            datos[pos].zip4 = zip4
+        
+        # Direcciones que ya están en uso
+        cursor.execute('''
+            SELECT DISTINCT l.pos FROM lote_datos l
+            JOIN datos d ON d.drireccion = l.drireccion
+        ''')
+        for (pos,) in cursor.fetchall():
+            if reporte[pos]["error"] is None:
+                reporte[pos]["error"] = 'La dirección ya existe en la base de datos.'
+        cursor.execute('DELETE FROM lote_datos')
+        
+        # Duplicados dentro del mismo lote
+        nombres_vistos = set()
+        direcciones_vistas = set()
+        validos = []
+        for pos, dato in enumerate(datos):
+            if reporte[pos]["error"] is not None:
+                continue
+            clave_nombre = dato.nombre.upper()
+            if clave_nombre in nombres_vistos:
+                reporte[pos]["error"] = 'El nombre está repetido en el lote.'
+                continue
+            if dato.drireccion in direcciones_vistas:
+                reporte[pos]["error"] = 'La dirección está repetida en el lote.'
+                continue
+            nombres_vistos.add(clave_nombre)
+            direcciones_vistas.add(dato.drireccion)
+            validos.append(pos)
+        
+        if not validos:
+            return reporte
+        
+        # AUTOINCREMENT asigna max(seq, MAX(id)) + 1 a cada fila; dentro de la
+        # transacción de escritura los IDs del lote son consecutivos
+        cursor.execute('''
+            SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'datos'), 0),
+                       COALESCE((SELECT MAX(id) FROM datos), 0))
+        ''')
+        siguiente_id = cursor.fetchone()[0] + 1
+        
+        # Los parámetros salen por columnas, sin una tupla por fila en memoria
+        lote = DatoBatch()
+        for pos in validos:
+            lote.agregar(datos[pos])
+        cursor.executemany(self._sql_insertar_dato, lote.parametros_insert())
+        cursor.executemany('INSERT OR IGNORE INTO direcciones (direccion, zip4) VALUES (?, ?)', [
+            (datos[pos].drireccion, datos[pos].zip4)
+            for pos in validos if datos[pos].drireccion and datos[pos].zip4
+        ])
+        
+        for offset, pos in enumerate(validos):
+            datos[pos].id = siguiente_id + offset
+            reporte[pos]["id"] = datos[pos].id
+    
+        return reporte
+    
+    def _upsert_dato(self, cursor: sqlite3.Cursor, dato: Dato, clave: str) -> Dict[str, Any]:
+        """Insertar o actualizar un dato ya parseado (ver upsert_datos)"""
+        # Mismas reglas que crear_dato
+        dato.nombre = dato.nombre.replace('-', ' ').strip()
+        dato.drireccion, zip4 = normalizar_direccion(dato.drireccion)
+        dato.zip4 = dato.zip4 or zip4
+        if not dato.nombre or not dato.drireccion:
+            raise ValueError('Faltan el nombre o la dirección.')
+        
+        if clave == 'id':
+            existente = dato.id if dato.id is not None and cursor.execute(
+                'SELECT 1 FROM datos WHERE id = ?', (dato.id,)).fetchone() else None
+        else:
+            if not dato.codigo:
+                raise ValueError('Falta el código.')
+            fila = cursor.execute('SELECT id FROM datos WHERE codigo = ? ORDER BY id LIMIT 1', (dato.codigo,)).fetchone()
+            existente = fila[0] if fila else None
+        
+        # El nombre y la dirección no pueden pertenecer a otro dato
+        otro_id = existente if existente is not None else -1
+        if cursor.execute('SELECT 1 FROM datos WHERE nombre = ? COLLATE NOCASE AND id != ? LIMIT 1',
+                          (dato.nombre, otro_id)).fetchone():
+            raise ValueError('El nombre ya existe en la base de datos.')
+        if cursor.execute('SELECT 1 FROM datos WHERE drireccion = ? AND id != ? LIMIT 1',
+                          (dato.drireccion, otro_id)).fetchone():
+            raise ValueError('La dirección ya existe en la base de datos.')
+        
+        valores = (dato.codigo, dato.nombre, dato.drireccion, dato.zip4,
+                   dato.amount_current_any, dato.amount_current_regular,
+                   dato.amount_pas_any, dato.amount_pas_regular)
+        if existente is not None:
+            cursor.execute(
+                "UPDATE datos SET codigo=?, nombre=?, drireccion=?, zip4=?, amount_current_any=?, amount_current_regular=?, amount_pas_any=?, amount_pas_regular=? WHERE id=?",
+                valores + (existente,)
+            )
+            dato.id, accion = existente, 'actualizado'
+        else:
+            if clave == 'id' and dato.id is not None:
+                cursor.execute(self._sql_insertar_dato_con_id, (dato.id,) + valores)
+            else:
+                cursor.execute(self._sql_insertar_dato, valores)
+                dato.id = cursor.lastrowid
+            accion = 'insertado'
+        if dato.zip4:
+            cursor.execute('INSERT OR IGNORE INTO direcciones (direccion, zip4) VALUES (?, ?)',
+                           (dato.drireccion, dato.zip4))
+        return {"id": dato.id, "accion": accion, "error": None}
+    
+    @medido
+    def upsert_datos(self, datos: Iterable[Dato], clave: str = 'id') -> List[Dict[str, Any]]:
+        """
+        Insertar o actualizar muchos datos en una sola transacción, buscando
+        cada uno por 'id' o por 'codigo'. Con 'id' los datos nuevos conservan
+        su ID; con 'codigo' reciben uno nuevo. Cada fila va en su propio
+        SAVEPOINT, así que una fila con error no deshace las demás.
+        Devuelve por fila {"id", "accion", "error"}; accion es 'insertado',
+        'actualizado' o None si la fila no se guardó.
+        """
+        if clave not in ('id', 'codigo'):
+            raise ValueError(f"Clave no soportada: {clave}. Use 'id' o 'codigo'")
+        reporte = []
+        with self.transaccion():
+            for dato in datos:
+                try:
+                    with self.transaccion() as cursor:
+                        reporte.append(self._upsert_dato(cursor, dato, clave))
+                except (ValueError, sqlite3.IntegrityError) as e:
+                    reporte.append({"id": dato.id, "accion": None, "error": str(e)})
+        return reporte
+    
+    @medido
+    def actualizar_dato(self, dato: Dato) -> bool:
+        """Actualizar todos los campos de un dato existente por ID"""
+        with self.transaccion() as cursor:
+            cursor.execute(
+                "UPDATE datos SET codigo=?, nombre=?, drireccion=?, zip4=?, amount_current_any=?, amount_current_regular=?, amount_pas_any=?, amount_pas_regular=? WHERE id=?",
+                (dato.codigo, dato.nombre, dato.drireccion, dato.zip4,
+                 dato.amount_current_any, dato.amount_current_regular,
+                 dato.amount_pas_any, dato.amount_pas_regular, int(dato.id))
+            )
+            return cursor.rowcount > 0
+    
+    @medido
     def leer_datos(self) -> List[Dato]:
         """Leer todos los datos de la base de datos"""
+        return list(self.iterar_datos())
+    
+    @medido
+    def leer_pagina_datos(self, despues_de_id: int = 0, limite: int = 1000,
+                          excluir_q: bool = True) -> List[Dato]:
+        """
+        Leer una página de datos ordenada por ID (paginación por clave).
+        La siguiente página se pide con despues_de_id = id del último dato.
+        """
+        filtro = " AND nombre NOT LIKE '%q%'" if excluir_q else ""  # Filtrar nombres con 'q'
+        cursor = self.get_connection().cursor()
+        cursor.row_factory = _fila_a_dato
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, codigo, nombre, drireccion, zip4, amount_current_any, amount_current_regular, amount_pas_any, amount_pas_regular FROM datos')
-            filas = cursor.fetchall()
-            conn.close()
-            
-            datos = []
-            for f in filas:
-                if 'q' not in str(f[2]).lower():  # Filtrar nombres con 'q'
-                    try:
-                        datos.append(Dato(
-                            id=f[0], codigo=f[1], nombre=f[2], drireccion=f[3],
-                            zip4=f[4] if f[4] is not None else "", amount_current_any=float(f[5]) if f[5] is not None else 0.0,
-                            amount_current_regular=int(float(f[6])) if f[6] is not None else 0,
-                            amount_pas_any=float(f[7]) if f[7] is not None else 0.0,
-                            amount_pas_regular=int(float(f[8])) if f[8] is not None else 0
-                        ))
-                    except Exception:
-                        continue
-            return datos
-        except Exception as e:
-            raise e
+            cursor.execute(
+                f'SELECT {COLUMNAS_DATOS} FROM datos WHERE id > ?{filtro} ORDER BY id LIMIT ?',
+                (despues_de_id, limite)
+            )
+            return cursor.fetchall()
+        finally:
+            cursor.close()
     
+    def iterar_datos(self, tamano_pagina: int = 1000, excluir_q: bool = True,
+                     despues_de_id: int = 0) -> Iterator[Dato]:
+        """Recorrer la tabla datos por páginas sin cargarla completa en memoria"""
+        while True:
+            pagina = self.leer_pagina_datos(despues_de_id, tamano_pagina, excluir_q)
+            yield from pagina
+            if len(pagina) < tamano_pagina:
+                return
+            despues_de_id = pagina[-1].id
+    
+    def _filtro_consulta(self, consulta: Optional[ConsultaDatos]) -> tuple:
+        """Condiciones de la consulta como texto ' AND ...' y sus parámetros"""
+        condiciones, parametros = (consulta or ConsultaDatos()).condiciones(self._fts)
+        return "".join(f" AND {condicion}" for condicion in condiciones), parametros
+    
+    @medido
+    def contar_datos(self, consulta: Optional[ConsultaDatos] = None) -> int:
+        """Cantidad de filas que muestra la tabla de la interfaz (sin consulta: todas menos las de 'q')"""
+        filtro, parametros = self._filtro_consulta(consulta)
+        return self.get_connection().execute(
+            f'SELECT COUNT(*) FROM datos WHERE 1{filtro}', parametros
+        ).fetchone()[0]
+    
+    @medido
+    def leer_filas_datos(self, despues_de_id: Optional[int] = None, antes_de_id: Optional[int] = None,
+                         desplazamiento: int = 0, limite: int = 200,
+                         consulta: Optional[ConsultaDatos] = None) -> List[tuple]:
+        """
+        Leer una ventana de filas (tuplas de COLUMNAS_DATOS) en el orden de la
+        consulta (por ID si no se indica). Con despues_de_id / antes_de_id se
+        lee por clave la ventana siguiente o la anterior a una ya cargada; sin
+        ellas se salta `desplazamiento` filas (para saltos de la barra de
+        desplazamiento). El orden y los filtros los resuelve SQLite con índices.
+        """
+        consulta = consulta or ConsultaDatos()
+        filtro, parametros = self._filtro_consulta(consulta)
+        conn = self.get_connection()
+        if antes_de_id is not None:
+            clave, parametros_clave = consulta.clave_sql(antes_de_id, hacia_atras=True)
+            filas = conn.execute(
+                f'SELECT {COLUMNAS_DATOS} FROM datos WHERE {clave}{filtro} {consulta.orden_sql(invertido=True)} LIMIT ?',
+                (*parametros_clave, *parametros, limite)
+            ).fetchall()
+            filas.reverse()
+            return filas
+        if despues_de_id is not None:
+            clave, parametros_clave = consulta.clave_sql(despues_de_id)
+            return conn.execute(
+                f'SELECT {COLUMNAS_DATOS} FROM datos WHERE {clave}{filtro} {consulta.orden_sql()} LIMIT ?',
+                (*parametros_clave, *parametros, limite)
+            ).fetchall()
+        return conn.execute(
+            f'SELECT {COLUMNAS_DATOS} FROM datos WHERE 1{filtro} {consulta.orden_sql()} LIMIT ? OFFSET ?',
+            (*parametros, limite, max(0, desplazamiento))
+        ).fetchall()
+    
+    @medido
+    def leer_ids_datos(self, despues_de_id: Optional[int] = None, limite: int = 20000,
+                       consulta: Optional[ConsultaDatos] = None) -> List[int]:
+        """
+        IDs de la tabla en el orden de la consulta, por páginas de clave desde
+        el ID indicado (o desde el principio). Es el índice de posiciones de la interfaz.
+        """
+        consulta = consulta or ConsultaDatos()
+        filtro, parametros = self._filtro_consulta(consulta)
+        clave, parametros_clave = consulta.clave_sql(despues_de_id) if despues_de_id is not None else ("1", [])
+        return [fila[0] for fila in self.get_connection().execute(
+            f'SELECT id FROM datos WHERE {clave}{filtro} {consulta.orden_sql()} LIMIT ?',
+            (*parametros_clave, *parametros, limite)
+        )]
+    
+    def leer_filas_por_ids(self, ids: Iterable[int], consulta: Optional[ConsultaDatos] = None) -> List[tuple]:
+        """Filas (tuplas de COLUMNAS_DATOS) de los IDs indicados, ordenadas por ID; sin consulta no se filtra"""
+        ids = [int(id) for id in ids]
+        filtro, parametros = self._filtro_consulta(consulta) if consulta is not None else ("", [])
+        filas = []
+        conn = self.get_connection()
+        # En grupos para no pasar el límite de parámetros de SQLite
+        for i in range(0, len(ids), 500):
+            grupo = ids[i:i + 500]
+            filas.extend(conn.execute(
+                f'SELECT {COLUMNAS_DATOS} FROM datos WHERE id IN ({", ".join("?" * len(grupo))}){filtro}',
+                (*grupo, *parametros)
+            ))
+        filas.sort(key=lambda fila: fila[0])
+        return filas
+    
+    def iterar_filas(self, columnas: Iterable[str], desde_id: Optional[int] = None,
+                     hasta_id: Optional[int] = None, tamano_pagina: int = 5000) -> Iterator[tuple]:
+        """
+        Recorrer la tabla datos como tuplas de `columnas`, por páginas de IDs
+        (paginación por clave) y con un rango de IDs opcional (incluido).
+        """
+        columnas = tuple(columnas)
+        validas = {c.strip() for c in COLUMNAS_DATOS.split(',')}
+        invalidas = [c for c in columnas if c not in validas]
+        if invalidas or not columnas:
+            raise ValueError(f"Columnas no válidas: {', '.join(invalidas) or '(ninguna)'}")
+        filtro = " AND id <= ?" if hasta_id is not None else ""
+        tope = (hasta_id,) if hasta_id is not None else ()
+        # El id va primero siempre para poder pedir la página siguiente
+        sql = f'SELECT id, {", ".join(columnas)} FROM datos WHERE id > ?{filtro} ORDER BY id LIMIT ?'
+        despues_de_id = desde_id - 1 if desde_id is not None else 0
+        conn = self.get_connection()
+        while True:
+            filas = conn.execute(sql, (despues_de_id, *tope, tamano_pagina)).fetchall()
+            for fila in filas:
+                yield fila[1:]
+            if len(filas) < tamano_pagina:
+                return
+            despues_de_id = filas[-1][0]
+    
+    @medido
     def eliminar_dato(self, id: int) -> bool:
         """Eliminar un dato por ID"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+        with self.transaccion() as cursor:
             cursor.execute('DELETE FROM datos WHERE id = ?', (int(id),))
-            conn.commit()
-            eliminado = cursor.rowcount > 0
-            conn.close()
-            return eliminado
-        except Exception as e:
-            raise e
+            return cursor.rowcount > 0
+    
+    @medido
+    def eliminar_datos(self, ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Eliminar varios datos por ID; devuelve {"id", "nombre", "drireccion"} de cada dato eliminado"""
+        eliminados = []
+        with self.transaccion() as cursor:
+            for id in ids:
+                cursor.execute('DELETE FROM datos WHERE id = ? RETURNING id, nombre, drireccion', (int(id),))
+                eliminados.extend({"id": f[0], "nombre": f[1], "drireccion": f[2]} for f in cursor.fetchall())
+        return eliminados
     
+    @medido
     def eliminar_todos_datos(self) -> int:
         """Eliminar todos los datos de la tabla datos"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+        with self.transaccion() as cursor:
             cursor.execute('DELETE FROM datos')
-            eliminados = cursor.rowcount
-            conn.commit()
-            conn.close()
-            return eliminados
-        except Exception as e:
-            raise e
+            return cursor.rowcount
     
+    @medido
     def eliminar_primer_dato(self) -> bool:
         """Eliminar el primer dato (ID más bajo) de la tabla datos"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
+        with self.transaccion() as cursor:
             # Obtener el ID más bajo (primer dato)
             cursor.execute('SELECT MIN(id) FROM datos')
             resultado = cursor.fetchone()
             
             if resultado and resultado[0] is not None:
-                primer_id = resultado[0]
-                cursor.execute('DELETE FROM datos WHERE id = ?', (primer_id,))
-                eliminado = cursor.rowcount > 0
-                conn.commit()
-                conn.close()
-                return eliminado
-            else:
-                conn.close()
-                return False
-                
-        except Exception as e:
-            raise e
+                cursor.execute('DELETE FROM datos WHERE id = ?', (resultado[0],))
+                return cursor.rowcount > 0
+            return False
     
+    @medido
     def obtener_direcciones_ocupadas(self) -> List[str]:
         """Obtener direcciones que ya están en uso"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT drireccion FROM datos')
-            filas = cursor.fetchall()
-            conn.close()
-            return [f[0] for f in filas if f[0]]
-        except Exception as e:
-            raise e
+        filas = self.get_connection().execute('SELECT drireccion FROM datos').fetchall()
+        return [f[0] for f in filas if f[0]]
+    
+    @medido
+    def obtener_nombres(self) -> List[str]:
+        """Obtener los nombres de todos los datos"""
+        return [f[0] for f in self.get_connection().execute('SELECT nombre FROM datos')]
     
+    @medido
+    def obtener_codigos(self) -> List[str]:
+        """Obtener los códigos de todos los datos"""
+        return [f[0] for f in self.get_connection().execute('SELECT codigo FROM datos')]
+    
+    @medido
     def obtener_direcciones_limpias(self) -> List[Dict[str, str]]:
         """Obtener todas las direcciones que no están siendo usadas actualmente"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT d.direccion, d.zip4 
-                FROM direcciones d 
-                WHERE d.direccion NOT IN (SELECT drireccion FROM datos)
-            ''')
-            filas = cursor.fetchall()
-            conn.close()
-            # zip4 nunca será None, si lo es, se pone ""
-            return [{"direccion": fila[0], "zip4": fila[1] if fila[1] is not None else ""} for fila in filas]
-        except Exception as e:
-            raise e
+        # usada se mantiene por triggers sobre datos (ver migraciones)
+        filas = self.get_connection().execute(
+            'SELECT direccion, zip4 FROM direcciones WHERE usada = 0 ORDER BY id'
+        ).fetchall()
+        # zip4 nunca será None, si lo es, se pone ""
+        return [{"direccion": fila[0], "zip4": fila[1] if fila[1] is not None else ""} for fila in filas]
+    
+    @medido
+    def contar_direcciones_libres(self) -> int:
+        """Contar las direcciones que no están siendo usadas actualmente"""
+        return self.get_connection().execute('SELECT COUNT(*) FROM direcciones WHERE usada = 0').fetchone()[0]
 
+    @medido
+    def reservar_direcciones(self, n: int) -> List[Dict[str, str]]:
+        """
+        Reservar atómicamente hasta n direcciones libres (usada = 0 -> 1) con
+        UPDATE ... RETURNING. Dos instancias sobre la misma base nunca reciben
+        la misma dirección. Las reservas que no terminen en un dato se
+        devuelven con liberar_direcciones.
+        """
+        if n <= 0:
+            return []
+        with self.transaccion() as cursor:
+            return self._reservar_direcciones(cursor, n)
+    
+    def _reservar_direcciones(self, cursor: sqlite3.Cursor, n: int) -> List[Dict[str, str]]:
+        cursor.execute('''
+            UPDATE direcciones SET usada = 1
+            WHERE id IN (SELECT id FROM direcciones WHERE usada = 0 ORDER BY id LIMIT ?)
+            RETURNING id, direccion, zip4
+        ''', (n,))
+        filas = sorted(cursor.fetchall())
+        return [{"direccion": fila[1], "zip4": fila[2] if fila[2] is not None else ""} for fila in filas]
+    
+    @medido
+    def liberar_direcciones(self, direcciones: List[str]) -> int:
+        """Devolver al grupo libre direcciones reservadas que no llegaron a usarse en datos"""
+        with self.transaccion() as cursor:
+            return self._liberar_direcciones(cursor, direcciones)
+    
+    def _liberar_direcciones(self, cursor: sqlite3.Cursor, direcciones: List[str]) -> int:
+        cursor.executemany('''
+            UPDATE direcciones SET usada = 0
+            WHERE direccion = ? AND NOT EXISTS (SELECT 1 FROM datos WHERE drireccion = direcciones.direccion)
+        ''', [(d,) for d in direcciones])
+        return cursor.rowcount
+    
+    @medido
     def agregar_direcciones(self, direcciones: List[str]) -> int:
         """Agregar nuevas direcciones a la base de datos"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            agregadas = 0
-            direcciones_invalidas = []
-            
-            for linea in direcciones:
+        return self.importar_direcciones(direcciones)["insertadas"]
+    
+    @medido
+    def importar_direcciones(self, lineas: Iterable[str], tamano_lote: int = 5000) -> Dict[str, int]:
+        """
+        Importar direcciones desde cualquier iterable de líneas (lista, archivo, stdin).
+        Las líneas se consumen de forma perezosa y se insertan por bloques con
+        executemany dentro de una sola transacción. Devuelve los contadores
+        insertadas, duplicadas, invalidas (línea sin calle reconocible) y vacias.
+        """
+        stats = {"insertadas": 0, "duplicadas": 0, "invalidas": 0, "vacias": 0}
+        bloque = []
+        
+        def insertar_bloque(cursor):
+            cursor.executemany('INSERT OR IGNORE INTO direcciones (direccion, zip4, usada) VALUES (?, ?, 0)', bloque)
+            stats["insertadas"] += cursor.rowcount
+            stats["duplicadas"] += len(bloque) - cursor.rowcount
+            bloque.clear()
+        
+        with self.transaccion() as cursor:
+            for linea in lineas:
                 linea = str(linea).strip()
                 if not linea:
+                    stats["vacias"] += 1
                     continue
-                # Eliminar numeración inicial si existe
-                sin_numero = re.sub(r"^\d+\.\s*", "", linea)
-                zip4 = ""
-                direccion = sin_numero
-                # Buscar ZIP+4 al final
-                match_zip4 = re.search(r"(\d{5}-\d{4})$", sin_numero)
-                if match_zip4:
-                    zip4 = match_zip4.group(1)
-                    # Quitar el ZIP+4 y la coma final si existe
-                    direccion = sin_numero[:match_zip4.start()].rstrip(',').strip()
-                    # Quitar la ciudad y estado si existen (asumimos formato ...ST, LOS ANGELES, CA ...)
-                    partes = direccion.split(',')
-                    if len(partes) >= 3:
-                        direccion = partes[0].strip()
-                else:
-                    # Buscar ZIP5 al final
-                    match_zip5 = re.search(r"(\d{5})$", sin_numero)
-                    if match_zip5:
-                        zip4 = match_zip5.group(1)
-                        direccion = sin_numero[:match_zip5.start()].rstrip(',').strip()
-                        partes = direccion.split(',')
-                        if len(partes) >= 3:
-                            direccion = partes[0].strip()
-                    else:
-                        zip4 = ""
-                        direccion = sin_numero.strip()
-                if direccion:
-                    cursor.execute('INSERT OR IGNORE INTO direcciones (direccion, zip4, usada) VALUES (?, ?, 0)', 
-                                 (direccion, zip4))
-                    agregadas += cursor.rowcount
-            
-            conn.commit()
-            conn.close()
-            
-            # Si hay direcciones inválidas, mostrar advertencia
-            if direcciones_invalidas:
-                from tkinter import messagebox
-                messagebox.showwarning("Advertencia", f"Las siguientes direcciones no tienen un ZIP válido y no fueron agregadas:\n\n" + "\n".join(direcciones_invalidas))
-            
-            return int(agregadas)
-        except Exception as e:
-            raise e
+                direccion, zip4 = normalizar_direccion(linea)
+                if not direccion:
+                    stats["invalidas"] += 1
+                    continue
+                bloque.append((direccion, zip4))
+                if len(bloque) >= tamano_lote:
+                    insertar_bloque(cursor)
+            if bloque:
+                insertar_bloque(cursor)
+        
+        return stats
+    
+    @medido
+    def importar_direcciones_archivo(self, ruta: str, tamano_lote: int = 5000,
+                                     encoding: str = "utf-8") -> Dict[str, int]:
+        """Importar direcciones desde un archivo de texto, una por línea"""
+        with open(ruta, "r", encoding=encoding, errors="replace") as archivo:
+            return self.importar_direcciones(archivo, tamano_lote)
 
+    @medido
     def borrar_ultimas_100_direcciones(self) -> int:
         """Borra las últimas 100 direcciones agregadas (por id descendente)"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id FROM direcciones ORDER BY id DESC LIMIT 100')
-            ids = [row[0] for row in cursor.fetchall()]
-            if ids:
-                cursor.executemany('DELETE FROM direcciones WHERE id = ?', [(i,) for i in ids])
-            conn.commit()
-            count = len(ids)
-            conn.close()
-            return count
+            with self.transaccion() as cursor:
+                cursor.execute('SELECT id FROM direcciones ORDER BY id DESC LIMIT 100')
+                ids = [row[0] for row in cursor.fetchall()]
+                if ids:
+                    cursor.executemany('DELETE FROM direcciones WHERE id = ?', [(i,) for i in ids])
+                return len(ids)
         except Exception as e:
             print(f"Error al borrar direcciones: {e}")
             return 0
 
+    @medido
     def resetear_ids_datos(self, id_inicial: int = 101):
         """Borra todos los datos y reinicia el autoincremento de la tabla 'datos' para que el próximo ID sea el indicado."""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+        with self.transaccion() as cursor:
             # Borrar todos los datos
             cursor.execute('DELETE FROM datos')
             # Reiniciar el autoincremento al valor indicado menos 1
             cursor.execute("DELETE FROM sqlite_sequence WHERE name='datos'")
             cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('datos', ?)", (id_inicial - 1,))
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            if 'conn' in locals():
-                conn.close()
-            raise e
+        return True
@@ -0,0 +1,77 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from db_manager import DatabaseManager
+
+
+class DBWorker:
+    """
+    Hilo escritor único para DatabaseManager.
+    Las operaciones se encolan y se ejecutan en orden en un hilo dedicado, que
+    usa su propia conexión (DatabaseManager mantiene una conexión por hilo).
+    Las lecturas hechas desde el hilo de Tk siguen usando la conexión de ese
+    hilo, así que nunca esperan a la cola de escritura.
+    """
+
+    _FIN = object()
+
+    def __init__(self, db_manager: DatabaseManager, nombre: str = "db-writer"):
+        self.db = db_manager
+        self._cola: "queue.Queue" = queue.Queue()
+        self._hilo = threading.Thread(target=self._ejecutar, name=nombre, daemon=True)
+        self._hilo.start()
+
+    def _ejecutar(self):
+        """Bucle del hilo escritor: consume la cola hasta recibir _FIN"""
+        while True:
+            tarea = self._cola.get()
+            if tarea is self._FIN:
+                break
+            future, funcion, args, kwargs = tarea
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(funcion(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+        self.db.cerrar_conexion_hilo()
+
+    def enviar(self, funcion: Callable[..., Any], *args, **kwargs) -> Future:
+        """Encolar una operación; devuelve un Future con su resultado"""
+        if not self._hilo.is_alive():
+            raise RuntimeError("El hilo escritor está detenido")
+        future: Future = Future()
+        self._cola.put((future, funcion, args, kwargs))
+        return future
+
+    def detener(self, esperar: bool = True, timeout: Optional[float] = None):
+        """Terminar el hilo después de las operaciones ya encoladas"""
+        if self._hilo.is_alive():
+            self._cola.put(self._FIN)
+            if esperar:
+                self._hilo.join(timeout)
+
+
+def entregar_en_ui(root, future: Future, al_terminar: Callable[[Any], None],
+                   al_fallar: Optional[Callable[[BaseException], None]] = None,
+                   intervalo_ms: int = 20):
+    """
+    Llamar al_terminar(resultado) o al_fallar(error) en el hilo de Tk cuando
+    el future termine. Se consulta con root.after para no tocar Tk desde el
+    hilo escritor.
+    """
+    def revisar():
+        if not future.done():
+            root.after(intervalo_ms, revisar)
+            return
+        error = future.exception()
+        if error is None:
+            al_terminar(future.result())
+        elif al_fallar is not None:
+            al_fallar(error)
+        else:
+            raise error
+
+    root.after(0, revisar)
@@ -0,0 +1,54 @@
+import re
+import time
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+# Patrones compilados una sola vez para todo el módulo
+PATRON_NUMERACION = re.compile(r"^\d+\.\s*")
+# ZIP5 con extensión opcional de 4 dígitos (se aceptan 5 por datos antiguos)
+PATRON_ZIP = re.compile(r"[\s,]*(\d{5})(?:-(\d{4,5}))?$")
+PATRON_ESPACIOS = re.compile(r"\s+")
+
+TAMANO_CACHE = 65536
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def normalizar_direccion(linea: str) -> Tuple[str, str]:
+    """
+    Separar una dirección en (calle, zip4).
+    Formatos aceptados: '1. 123 MAIN ST, LOS ANGELES, CA 90001-1234',
+    '123 MAIN ST 90001' o solo '123 MAIN ST'. La calle es el primer tramo
+    antes de una coma (sin ciudad ni estado), en mayúsculas y con espacios
+    simples; zip4 queda vacío si no hay ZIP al final.
+    """
+    texto = PATRON_NUMERACION.sub("", str(linea).strip())
+    zip4 = ""
+    match_zip = PATRON_ZIP.search(texto)
+    if match_zip:
+        zip5, extension = match_zip.groups()
+        zip4 = f"{zip5}-{extension}" if extension else zip5
+        texto = texto[:match_zip.start()]
+    calle = texto.split(",", 1)[0]
+    calle = PATRON_ESPACIOS.sub(" ", calle).strip().upper()
+    return calle, zip4
+
+
+def normalizar_direcciones(lineas: Iterable[str]) -> List[Tuple[str, str]]:
+    """Normalizar un lote de direcciones; el resultado conserva el orden de entrada"""
+    return [normalizar_direccion(linea) for linea in lineas]
+
+
+def benchmark(n: int = 100_000, repetidas: float = 0.5) -> float:
+    """Medir direcciones normalizadas por segundo con una fracción de líneas repetidas"""
+    unicas = max(1, int(n * (1 - repetidas)))
+    lineas = [f"{i}. {100 + i} S MAIN ST, LOS ANGELES, CA {90000 + i % 1000:05d}-{i % 10000:04d}"
+              for i in range(unicas)]
+    lineas = (lineas * (n // unicas + 1))[:n]
+    normalizar_direccion.cache_clear()
+    inicio = time.perf_counter()
+    normalizar_direcciones(lineas)
+    return n / (time.perf_counter() - inicio)
+
+
+if __name__ == "__main__":
+    print(f"📊 {benchmark():,.0f} direcciones/s")
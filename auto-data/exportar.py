@@ -0,0 +1,145 @@
+"""
+Exportación de la tabla datos a TSV, CSV o JSON Lines.
+
+Las filas se leen de la base por páginas y se escriben a medida que llegan,
+así que la memoria usada no depende del tamaño de la tabla. El formato de
+cada valor es el mismo que usa la interfaz al copiar al portapapeles.
+
+    python -m exportar --db datos.db --formato csv --columnas id,nombre --desde 100 -o datos.csv
+"""
+import argparse
+import csv
+import json
+import sys
+from typing import Iterable, List, Optional, Sequence, TextIO
+
+# Mismo orden que COLUMNAS_DATOS en db_manager y que las columnas de la tabla
+COLUMNAS = ('id', 'codigo', 'nombre', 'drireccion', 'zip4', 'amount_current_any',
+            'amount_current_regular', 'amount_pas_any', 'amount_pas_regular')
+# Montos que la tabla muestra con 2 decimales
+COLUMNAS_DECIMALES = frozenset(('amount_current_any', 'amount_pas_any'))
+FORMATOS = ('tsv', 'csv', 'jsonl')
+
+
+def formatear_valor(columna: str, valor) -> str:
+    """Texto de un valor como se muestra y se copia desde la tabla"""
+    if valor is None:
+        return ""
+    if columna in COLUMNAS_DECIMALES:
+        try:
+            return f"{float(valor):.2f}"
+        except (TypeError, ValueError):
+            return str(valor)
+    return str(valor)
+
+
+def formatear_fila(fila: Sequence, columnas: Sequence[str] = COLUMNAS) -> List[str]:
+    """Valores de una fila ya formateados; `fila` sigue el orden de `columnas`"""
+    return [formatear_valor(columna, valor) for columna, valor in zip(columnas, fila)]
+
+
+def linea_tsv(fila: Sequence, columnas: Sequence[str] = COLUMNAS) -> str:
+    """Una fila en TSV, el formato de copiar_datos_multiples (tabs y saltos internos pasan a espacio)"""
+    return "\t".join(
+        valor.replace("\t", " ").replace("\n", " ").replace("\r", " ")
+        for valor in formatear_fila(fila, columnas)
+    )
+
+
+def escribir_filas(filas: Iterable[Sequence], archivo: TextIO, formato: str = 'tsv',
+                   columnas: Sequence[str] = COLUMNAS, encabezado: Optional[bool] = None) -> int:
+    """
+    Escribir filas (tuplas en el orden de `columnas`) en un archivo de texto
+    abierto. Por defecto solo CSV lleva encabezado; TSV queda igual que lo
+    copiado desde la tabla. Devuelve la cantidad de filas escritas.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}. Use uno de {', '.join(FORMATOS)}")
+    if encabezado is None:
+        encabezado = formato == 'csv'
+    escritas = 0
+    if formato == 'csv':
+        escritor = csv.writer(archivo, lineterminator="\n")
+        if encabezado:
+            escritor.writerow(columnas)
+        for fila in filas:
+            escritor.writerow(formatear_fila(fila, columnas))
+            escritas += 1
+    elif formato == 'tsv':
+        if encabezado:
+            archivo.write("\t".join(columnas) + "\n")
+        for fila in filas:
+            archivo.write(linea_tsv(fila, columnas))
+            archivo.write("\n")
+            escritas += 1
+    else:
+        for fila in filas:
+            registro = {
+                columna: round(valor, 2) if columna in COLUMNAS_DECIMALES and valor is not None else valor
+                for columna, valor in zip(columnas, fila)
+            }
+            archivo.write(json.dumps(registro, ensure_ascii=False))
+            archivo.write("\n")
+            escritas += 1
+    return escritas
+
+
+def exportar_datos(db_manager, archivo: TextIO, formato: str = 'tsv',
+                   columnas: Optional[Sequence[str]] = None, desde_id: Optional[int] = None,
+                   hasta_id: Optional[int] = None, encabezado: Optional[bool] = None,
+                   tamano_pagina: int = 5000) -> int:
+    """Exportar la tabla datos (o un rango de IDs) a un archivo abierto; devuelve las filas escritas"""
+    columnas = tuple(columnas) if columnas else COLUMNAS
+    filas = db_manager.iterar_filas(columnas, desde_id, hasta_id, tamano_pagina)
+    return escribir_filas(filas, archivo, formato, columnas, encabezado)
+
+
+def exportar_datos_archivo(db_manager, ruta: str, formato: Optional[str] = None, **opciones) -> int:
+    """Exportar a la ruta indicada; sin formato se deduce de la extensión (.tsv por defecto)"""
+    if formato is None:
+        extension = ruta.rsplit(".", 1)[-1].lower() if "." in ruta else ""
+        formato = extension if extension in FORMATOS else 'tsv'
+    with open(ruta, "w", encoding="utf-8", newline="") as archivo:
+        return exportar_datos(db_manager, archivo, formato, **opciones)
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m exportar",
+                                     description="Exportar la tabla datos a TSV, CSV o JSON Lines.")
+    parser.add_argument("--db", default="datos.db", help="base de datos de origen (por defecto: datos.db)")
+    parser.add_argument("--formato", choices=FORMATOS, default=None,
+                        help="formato de salida (por defecto: según la extensión de --salida, o tsv)")
+    parser.add_argument("--columnas", default=None,
+                        help=f"columnas separadas por coma (por defecto todas: {','.join(COLUMNAS)})")
+    parser.add_argument("--desde", type=int, default=None, help="ID mínimo (incluido)")
+    parser.add_argument("--hasta", type=int, default=None, help="ID máximo (incluido)")
+    parser.add_argument("--encabezado", action=argparse.BooleanOptionalAction, default=None,
+                        help="escribir la fila de nombres de columna (por defecto solo en CSV)")
+    parser.add_argument("-o", "--salida", default="-", help="archivo de salida; '-' para la salida estándar")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from db_manager import DatabaseManager
+
+    args = crear_parser().parse_args(argv)
+    columnas = [c.strip() for c in args.columnas.split(",") if c.strip()] if args.columnas else None
+    db = DatabaseManager(args.db)
+    opciones = dict(columnas=columnas, desde_id=args.desde, hasta_id=args.hasta, encabezado=args.encabezado)
+    try:
+        if args.salida == "-":
+            escritas = exportar_datos(db, sys.stdout, args.formato or 'tsv', **opciones)
+            sys.stdout.flush()
+        else:
+            escritas = exportar_datos_archivo(db, args.salida, args.formato, **opciones)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    finally:
+        db.cerrar()
+    print(f"✅ {escritas:,} filas exportadas", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Importación en bloque de datos en TSV, con el mismo orden de columnas que
+copia la tabla (copiar_datos_multiples) y que escribe exportar.py.
+
+Todas las filas se guardan en una sola transacción, actualizando por ID o
+por código las que ya existen. Ejemplo, desde la carpeta auto-data:
+
+    python -m importar datos.tsv --db datosex.db --clave codigo
+"""
+import argparse
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+from dato import Dato
+from exportar import COLUMNAS
+from nombres import normalizar_nombre
+
+
+def _numero(texto: str, columna: str, tipo):
+    """Convertir un monto del TSV; vacío vale 0"""
+    texto = texto.strip()
+    if not texto:
+        return tipo(0)
+    try:
+        return tipo(float(texto)) if tipo is int else float(texto)
+    except ValueError:
+        raise ValueError(f"valor no numérico en {columna}: {texto!r}") from None
+
+
+def parsear_linea_tsv(linea: str) -> Dato:
+    """
+    Convertir una línea TSV en un Dato. Acepta las 9 columnas de la tabla o
+    8 sin el ID. El nombre se normaliza como al crear datos (sin acentos ni
+    símbolos, en mayúsculas). Lanza ValueError si la línea no tiene ese formato.
+    """
+    valores = linea.rstrip("\r\n").split("\t")
+    if len(valores) == len(COLUMNAS) - 1:
+        valores.insert(0, "")
+    if len(valores) != len(COLUMNAS):
+        raise ValueError(f"se esperaban {len(COLUMNAS)} columnas y hay {len(valores)}")
+    id = valores[0].strip()
+    if id and not id.isdigit():
+        raise ValueError(f"ID inválido: {id!r}")
+    return Dato(
+        id=int(id) if id else None,
+        codigo=valores[1].strip(),
+        nombre=normalizar_nombre(valores[2]),
+        drireccion=valores[3].strip(),
+        zip4=valores[4].strip(),
+        amount_current_any=_numero(valores[5], COLUMNAS[5], float),
+        amount_current_regular=_numero(valores[6], COLUMNAS[6], int),
+        amount_pas_any=_numero(valores[7], COLUMNAS[7], float),
+        amount_pas_regular=_numero(valores[8], COLUMNAS[8], int)
+    )
+
+
+def es_linea_tsv(linea: str) -> bool:
+    """Si la línea tiene el número de columnas de la tabla (con o sin ID)"""
+    return linea.count("\t") >= len(COLUMNAS) - 2
+
+
+def importar_lineas_tsv(db_manager, lineas: Iterable[str], clave: str = 'id') -> List[Dict[str, Any]]:
+    """
+    Importar líneas TSV en una sola transacción (ver DatabaseManager.upsert_datos).
+    Se saltan las líneas vacías y el encabezado. Devuelve un reporte por línea:
+    {"linea", "id", "accion", "error"}; accion es 'insertado', 'actualizado' o None.
+    """
+    encabezado = "\t".join(COLUMNAS)
+    reporte: List[Dict[str, Any]] = []
+    datos: List[Dato] = []
+    posiciones: List[int] = []
+    for numero, linea in enumerate(lineas, 1):
+        if not linea.strip() or linea.strip() == encabezado:
+            continue
+        fila = {"linea": numero, "id": None, "accion": None, "error": None}
+        try:
+            datos.append(parsear_linea_tsv(linea))
+            posiciones.append(len(reporte))
+        except ValueError as e:
+            fila["error"] = f"Formato inválido: {e}"
+        reporte.append(fila)
+    if datos:
+        for pos, resultado in zip(posiciones, db_manager.upsert_datos(datos, clave)):
+            reporte[pos].update(resultado)
+    return reporte
+
+
+def importar_archivo_tsv(db_manager, ruta: str, clave: str = 'id', encoding: str = 'utf-8') -> List[Dict[str, Any]]:
+    """Importar un archivo TSV (ver importar_lineas_tsv)"""
+    with open(ruta, encoding=encoding) as archivo:
+        return importar_lineas_tsv(db_manager, archivo, clave)
+
+
+def resumir(reporte: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Cantidad de filas insertadas, actualizadas y con error"""
+    resumen = {"insertados": 0, "actualizados": 0, "errores": 0}
+    for fila in reporte:
+        if fila["accion"] == 'insertado':
+            resumen["insertados"] += 1
+        elif fila["accion"] == 'actualizado':
+            resumen["actualizados"] += 1
+        else:
+            resumen["errores"] += 1
+    return resumen
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m importar",
+                                     description="Importar datos desde un TSV con las columnas de la tabla.")
+    parser.add_argument("archivo", help="archivo TSV; '-' para leer de la entrada estándar")
+    parser.add_argument("--db", default="datos.db", help="base de datos destino (por defecto: datos.db)")
+    parser.add_argument("--clave", choices=("id", "codigo"), default="id",
+                        help="columna para encontrar los datos existentes (por defecto: id)")
+    parser.add_argument("--encoding", default="utf-8", help="codificación del archivo")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from db_manager import DatabaseManager
+
+    args = crear_parser().parse_args(argv)
+    db = DatabaseManager(args.db)
+    try:
+        if args.archivo == "-":
+            reporte = importar_lineas_tsv(db, sys.stdin, args.clave)
+        else:
+            reporte = importar_archivo_tsv(db, args.archivo, args.clave, args.encoding)
+    finally:
+        db.cerrar()
+    for fila in reporte:
+        if fila["error"]:
+            print(f"Línea {fila['linea']}: {fila['error']}", file=sys.stderr)
+    resumen = resumir(reporte)
+    print(f"✅ {resumen['insertados']:,} insertados, {resumen['actualizados']:,} actualizados, "
+          f"{resumen['errores']:,} con error", file=sys.stderr)
+    return 1 if resumen["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
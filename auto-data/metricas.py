@@ -0,0 +1,148 @@
+import math
+import threading
+import time
+from collections import deque
+from functools import wraps
+from typing import Any, Callable, Dict, List
+
+
+def medido(metodo: Callable) -> Callable:
+    """
+    Decorador para métodos públicos de DatabaseManager: si la instrumentación
+    está activa (self._metricas), registra llamadas, latencia y filas.
+    """
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        if self._metricas is None:
+            return metodo(self, *args, **kwargs)
+        return self._metricas.medir(self, metodo.__name__, metodo, args, kwargs)
+    return envoltura
+
+
+class MetricasDB:
+    """
+    Métricas por método (llamadas, tiempo total, p95, filas) y registro de
+    operaciones lentas. Las sentencias se capturan con el trace callback de
+    sqlite3; su duración es aproximada (desde que empieza hasta la siguiente
+    sentencia o el fin del método que la ejecutó). El trace no ve bien
+    executemany ni lo que hacen los triggers, así que los métodos medidos que
+    pasan el umbral también se registran enteros, con tipo "metodo".
+    """
+
+    def __init__(self, umbral_lento_ms: float = 50.0, max_muestras: int = 1000, max_lentas: int = 200):
+        self.umbral_lento_ms = umbral_lento_ms
+        self.max_muestras = max_muestras
+        self._lock = threading.Lock()
+        self._metodos: Dict[str, Dict[str, Any]] = {}
+        self._lentas: deque = deque(maxlen=max_lentas)
+        self._local = threading.local()
+
+    def registrar_conexion(self, conn):
+        """Activar el trace callback en una conexión nueva"""
+        conn.set_trace_callback(self._traza)
+
+    def _pila(self) -> List[str]:
+        pila = getattr(self._local, 'pila', None)
+        if pila is None:
+            pila = self._local.pila = []
+        return pila
+
+    def _traza(self, sql: str):
+        pila = self._pila()
+        if not pila:
+            return  # Sentencias fuera de un método medido (migraciones, etc.)
+        ahora = time.perf_counter()
+        self._cerrar_sentencia(ahora)
+        self._local.sentencia = (sql, ahora, pila[-1])
+        self._local.sentencias = getattr(self._local, 'sentencias', 0) + 1
+
+    def _cerrar_sentencia(self, ahora: float):
+        sentencia = getattr(self._local, 'sentencia', None)
+        if sentencia is None:
+            return
+        self._local.sentencia = None
+        sql, inicio, metodo = sentencia
+        ms = (ahora - inicio) * 1000
+        if ms >= self.umbral_lento_ms:
+            self._anotar_lenta("sentencia", metodo, ms, " ".join(sql.split()))
+
+    def _anotar_lenta(self, tipo: str, metodo: str, ms: float, sql: str):
+        self._lentas.append({
+            "tipo": tipo,
+            "metodo": metodo,
+            "ms": round(ms, 3),
+            "sql": sql,
+            "hora": time.strftime("%H:%M:%S")
+        })
+
+    def medir(self, db, nombre: str, funcion: Callable, args: tuple, kwargs: dict):
+        """Ejecutar funcion(db, *args, **kwargs) registrando sus métricas"""
+        conn = db.get_connection()
+        cambios_antes = conn.total_changes
+        pila = self._pila()
+        pila.append(nombre)
+        sentencias_antes = getattr(self._local, 'sentencias', 0)
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion(db, *args, **kwargs)
+        finally:
+            fin = time.perf_counter()
+            pila.pop()
+            if not pila:
+                self._cerrar_sentencia(fin)
+        filas = conn.total_changes - cambios_antes
+        if isinstance(resultado, list):
+            filas += len(resultado)
+        ms = (fin - inicio) * 1000
+        self._registrar(nombre, ms, filas)
+        # Solo el método exterior: los anidados ya cuentan dentro de él
+        if not pila and ms >= self.umbral_lento_ms:
+            sentencias = getattr(self._local, 'sentencias', 0) - sentencias_antes
+            self._anotar_lenta("metodo", nombre, ms, f"método completo: {sentencias} sentencias, {filas} filas")
+        return resultado
+
+    def _registrar(self, nombre: str, ms: float, filas: int):
+        with self._lock:
+            metrica = self._metodos.get(nombre)
+            if metrica is None:
+                metrica = self._metodos[nombre] = {
+                    "llamadas": 0, "total_ms": 0.0, "filas": 0,
+                    "muestras": deque(maxlen=self.max_muestras)
+                }
+            metrica["llamadas"] += 1
+            metrica["total_ms"] += ms
+            metrica["filas"] += filas
+            metrica["muestras"].append(ms)
+
+    def stats(self) -> Dict[str, Any]:
+        """Copia de las métricas: {"metodos": {...}, "sentencias_lentas": [...]}"""
+        with self._lock:
+            metodos = {}
+            for nombre, metrica in self._metodos.items():
+                muestras = sorted(metrica["muestras"])
+                p95 = muestras[max(0, math.ceil(0.95 * len(muestras)) - 1)] if muestras else 0.0
+                metodos[nombre] = {
+                    "llamadas": metrica["llamadas"],
+                    "total_ms": round(metrica["total_ms"], 3),
+                    "p95_ms": round(p95, 3),
+                    "filas": metrica["filas"]
+                }
+        return {"metodos": metodos, "sentencias_lentas": list(self._lentas)}
+
+    def reiniciar(self):
+        """Borrar todas las métricas acumuladas"""
+        with self._lock:
+            self._metodos.clear()
+            self._lentas.clear()
+
+    def reporte(self) -> str:
+        """Métricas en texto plano, ordenadas por tiempo total"""
+        datos = self.stats()
+        lineas = [f"{'Método':<32}{'Llamadas':>10}{'Total ms':>12}{'p95 ms':>10}{'Filas':>10}"]
+        for nombre, m in sorted(datos["metodos"].items(), key=lambda x: -x[1]["total_ms"]):
+            lineas.append(f"{nombre:<32}{m['llamadas']:>10}{m['total_ms']:>12.1f}{m['p95_ms']:>10.2f}{m['filas']:>10}")
+        lineas.append("")
+        lineas.append(f"Operaciones lentas (>= {self.umbral_lento_ms:g} ms): {len(datos['sentencias_lentas'])}")
+        for lenta in datos["sentencias_lentas"]:
+            lineas.append(f"[{lenta['hora']}] {lenta['ms']:.1f} ms {lenta['metodo']}: {lenta['sql']}")
+        return "\n".join(lineas)
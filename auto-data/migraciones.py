@@ -0,0 +1,230 @@
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+from direcciones import normalizar_direccion
+
+# Cada migración recibe un cursor dentro de una transacción abierta.
+# La versión aplicada se guarda en PRAGMA user_version; las migraciones
+# nuevas se agregan siempre al final de MIGRACIONES.
+
+
+def _esquema_base(cursor: sqlite3.Cursor):
+    """Tablas datos y direcciones (bases creadas antes de las migraciones incluidas)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS datos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo TEXT NOT NULL,
+            nombre TEXT NOT NULL,
+            drireccion TEXT NOT NULL,
+            zip4 TEXT,
+            amount_current_any REAL,
+            amount_current_regular INTEGER,
+            amount_pas_any REAL,
+            amount_pas_regular INTEGER
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS direcciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            direccion TEXT UNIQUE NOT NULL,
+            zip4 TEXT,
+            usada INTEGER DEFAULT 0
+        )
+    ''')
+    # Bases antiguas pueden tener direcciones sin la columna usada
+    cursor.execute("PRAGMA table_info(direcciones)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if 'usada' not in columns:
+        cursor.execute('ALTER TABLE direcciones ADD COLUMN usada INTEGER DEFAULT 0')
+
+
+def _indice_nombre(cursor: sqlite3.Cursor):
+    """Índice NOCASE sobre datos.nombre para la validación de duplicados"""
+    cursor.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM datos GROUP BY nombre COLLATE NOCASE HAVING COUNT(*) > 1
+        )
+    ''')
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_datos_nombre ON datos (nombre COLLATE NOCASE)')
+    else:
+        # Hay nombres repetidos de antes de la validación: indexar sin UNIQUE
+        # para no perder datos; crear_dato sigue impidiendo duplicados nuevos
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_datos_nombre ON datos (nombre COLLATE NOCASE)')
+
+
+def _indice_drireccion(cursor: sqlite3.Cursor):
+    """Índice sobre datos.drireccion para duplicados y direcciones libres"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_datos_drireccion ON datos (drireccion)')
+
+
+def _indice_usada(cursor: sqlite3.Cursor):
+    """Índice sobre direcciones.usada para listar direcciones libres"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_direcciones_usada ON direcciones (usada)')
+
+
+def _triggers_usada(cursor: sqlite3.Cursor):
+    """Mantener direcciones.usada sincronizada con datos mediante triggers"""
+    cursor.execute('''
+        UPDATE direcciones SET usada = EXISTS (
+            SELECT 1 FROM datos WHERE datos.drireccion = direcciones.direccion
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_datos_insert_usada AFTER INSERT ON datos
+        BEGIN
+            UPDATE direcciones SET usada = 1 WHERE direccion = NEW.drireccion;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_datos_delete_usada AFTER DELETE ON datos
+        BEGIN
+            UPDATE direcciones SET usada = 0
+            WHERE direccion = OLD.drireccion
+              AND NOT EXISTS (SELECT 1 FROM datos WHERE drireccion = OLD.drireccion);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_datos_update_usada AFTER UPDATE OF drireccion ON datos
+        WHEN OLD.drireccion IS NOT NEW.drireccion
+        BEGIN
+            UPDATE direcciones SET usada = 0
+            WHERE direccion = OLD.drireccion
+              AND NOT EXISTS (SELECT 1 FROM datos WHERE drireccion = OLD.drireccion);
+            UPDATE direcciones SET usada = 1 WHERE direccion = NEW.drireccion;
+        END
+    ''')
+    # Una dirección agregada después de usarse en datos nace marcada como usada
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_direcciones_insert_usada AFTER INSERT ON direcciones
+        WHEN EXISTS (SELECT 1 FROM datos WHERE drireccion = NEW.direccion)
+        BEGIN
+            UPDATE direcciones SET usada = 1 WHERE id = NEW.id;
+        END
+    ''')
+
+
+def _indice_codigo(cursor: sqlite3.Cursor):
+    """Índice sobre datos.codigo para importar actualizando por código"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_datos_codigo ON datos (codigo)')
+
+
+def _indice_fts(cursor: sqlite3.Cursor):
+    """
+    Índice FTS5 de nombre, código, dirección y ZIP para el buscador, sincronizado
+    con triggers. Si SQLite no tiene FTS5 no se crea y la búsqueda usa LIKE.
+    """
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS datos_fts USING fts5(
+                nombre, codigo, drireccion, zip4,
+                content='datos', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return
+    cursor.execute("INSERT INTO datos_fts (datos_fts) VALUES ('rebuild')")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_datos_fts_insert AFTER INSERT ON datos
+        BEGIN
+            INSERT INTO datos_fts (rowid, nombre, codigo, drireccion, zip4)
+            VALUES (NEW.id, NEW.nombre, NEW.codigo, NEW.drireccion, NEW.zip4);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_datos_fts_delete AFTER DELETE ON datos
+        BEGIN
+            INSERT INTO datos_fts (datos_fts, rowid, nombre, codigo, drireccion, zip4)
+            VALUES ('delete', OLD.id, OLD.nombre, OLD.codigo, OLD.drireccion, OLD.zip4);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_datos_fts_update AFTER UPDATE OF nombre, codigo, drireccion, zip4 ON datos
+        BEGIN
+            INSERT INTO datos_fts (datos_fts, rowid, nombre, codigo, drireccion, zip4)
+            VALUES ('delete', OLD.id, OLD.nombre, OLD.codigo, OLD.drireccion, OLD.zip4);
+            INSERT INTO datos_fts (rowid, nombre, codigo, drireccion, zip4)
+            VALUES (NEW.id, NEW.nombre, NEW.codigo, NEW.drireccion, NEW.zip4);
+        END
+    ''')
+
+
+def _indices_orden(cursor: sqlite3.Cursor):
+    """
+    Índices para ordenar y filtrar la tabla por ZIP y por montos. Usan las
+    mismas expresiones que consulta.EXPRESIONES_ORDEN (los nulos como '' o 0).
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_datos_zip4 ON datos (IFNULL(zip4, ''))")
+    for columna in ('amount_current_any', 'amount_current_regular', 'amount_pas_any', 'amount_pas_regular'):
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_datos_{columna} ON datos (IFNULL({columna}, 0))')
+
+
+def _normalizar_direcciones(cursor: sqlite3.Cursor):
+    """
+    Pasar direcciones.direccion y datos.drireccion a la clave de
+    normalizar_direccion. Las direcciones que quedan iguales se fusionan en la
+    de menor id (conservando el primer ZIP conocido) y usada se recalcula.
+    """
+    conservadas: Dict[str, List] = {}  # calle -> [id, zip4, cambió]
+    borradas = []
+    for id_, direccion, zip4 in cursor.execute('SELECT id, direccion, zip4 FROM direcciones ORDER BY id').fetchall():
+        calle, zip_linea = normalizar_direccion(direccion)
+        if not calle:
+            continue
+        zip4 = zip4 or zip_linea or None
+        if calle in conservadas:
+            conservada = conservadas[calle]
+            if not conservada[1] and zip4:
+                conservada[1:] = [zip4, True]
+            borradas.append((id_,))
+        else:
+            conservadas[calle] = [id_, zip4, calle != direccion or bool(zip_linea)]
+    cursor.executemany('DELETE FROM direcciones WHERE id = ?', borradas)
+    # La clave normalizada es idempotente: ninguna dirección conservada choca
+    # con otra al reescribirla
+    cursor.executemany('UPDATE direcciones SET direccion = ?, zip4 = ? WHERE id = ?',
+                       [(calle, zip4, id_) for calle, (id_, zip4, cambio) in conservadas.items() if cambio])
+    
+    datos = []
+    for id_, drireccion, zip4 in cursor.execute('SELECT id, drireccion, zip4 FROM datos').fetchall():
+        calle, zip_linea = normalizar_direccion(drireccion)
+        if calle and (calle != drireccion or (not zip4 and zip_linea)):
+            datos.append((calle, zip4 or zip_linea or None, id_))
+    cursor.executemany('UPDATE datos SET drireccion = ?, zip4 = ? WHERE id = ?', datos)
+    cursor.execute('''
+        UPDATE direcciones SET usada = EXISTS (
+            SELECT 1 FROM datos WHERE datos.drireccion = direcciones.direccion
+        )
+    ''')
+
+
+MIGRACIONES: List[Tuple[int, Callable[[sqlite3.Cursor], None]]] = [
+    (1, _esquema_base),
+    (2, _indice_nombre),
+    (3, _indice_drireccion),
+    (4, _indice_usada),
+    (5, _triggers_usada),
+    (6, _indice_codigo),
+    (7, _indice_fts),
+    (8, _indices_orden),
+    (9, _normalizar_direcciones),
+]
+
+
+def version_actual(conn: sqlite3.Connection) -> int:
+    """Versión del esquema guardada en la base de datos"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def aplicar_migraciones(db_manager) -> int:
+    """Aplicar en orden las migraciones pendientes, cada una en su propia transacción"""
+    version = version_actual(db_manager.get_connection())
+    for numero, migracion in MIGRACIONES:
+        if numero <= version:
+            continue
+        with db_manager.transaccion() as cursor:
+            migracion(cursor)
+            cursor.execute(f'PRAGMA user_version = {int(numero)}')
+        version = numero
+    return version
@@ -0,0 +1,64 @@
+import re
+import time
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+# Letras que no se descomponen en letra base + acento
+_ESPECIALES = {
+    "ß": "SS", "Æ": "AE", "æ": "AE", "Œ": "OE", "œ": "OE",
+    "Ø": "O", "ø": "O", "Đ": "D", "đ": "D", "Ł": "L", "ł": "L",
+}
+
+
+def _tabla_acentos() -> Dict[int, str]:
+    """Tabla para str.translate: letras latinas acentuadas -> letra sin acento; guiones -> espacio"""
+    tabla = {}
+    for codigo in range(0xC0, 0x250):
+        letra = chr(codigo)
+        base = unicodedata.normalize("NFKD", letra).encode("ascii", "ignore").decode("ascii")
+        if base and base != letra:
+            tabla[codigo] = base
+    tabla.update({ord(letra): base for letra, base in _ESPECIALES.items()})
+    # Mismo criterio que crear_dato: los guiones separan palabras
+    tabla.update({ord(c): " " for c in "-_\t"})
+    return tabla
+
+
+# Se calculan una sola vez para todo el módulo
+TABLA_ACENTOS = _tabla_acentos()
+PATRON_NO_PERMITIDOS = re.compile(r"[^A-Z0-9 ]+")
+
+TAMANO_CACHE = 65536
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def normalizar_nombre(nombre: str) -> str:
+    """
+    Dejar un nombre como lo pide el README: sin acentos, sin caracteres
+    especiales y en mayúsculas. 'José Pérez-Núñez' -> 'JOSE PEREZ NUNEZ'.
+    Los guiones pasan a espacio, el resto de símbolos se quitan y los
+    espacios quedan simples. Devuelve '' si no queda ninguna letra.
+    """
+    texto = str(nombre).translate(TABLA_ACENTOS).upper()
+    return " ".join(PATRON_NO_PERMITIDOS.sub("", texto).split())
+
+
+def normalizar_nombres(nombres: Iterable[str]) -> List[str]:
+    """Normalizar un lote de nombres; el resultado conserva el orden de entrada"""
+    return [normalizar_nombre(nombre) for nombre in nombres]
+
+
+def benchmark(n: int = 1_000_000, repetidas: float = 0.5) -> float:
+    """Medir nombres normalizados por minuto con una fracción de nombres repetidos"""
+    unicas = max(1, int(n * (1 - repetidas)))
+    nombres = [f"José María Pérez-Núñez {i}" for i in range(unicas)]
+    nombres = (nombres * (n // unicas + 1))[:n]
+    normalizar_nombre.cache_clear()
+    inicio = time.perf_counter()
+    normalizar_nombres(nombres)
+    return n / (time.perf_counter() - inicio) * 60
+
+
+if __name__ == "__main__":
+    print(f"📊 {benchmark():,.0f} nombres/min (objetivo: 1,000,000)")
@@ -0,0 +1,538 @@
+"""
+Tabla de datos virtualizada para la interfaz.
+
+VentanaDatos guarda en memoria solo las filas cercanas a la parte visible y
+las lee de la base por ventanas (por clave al desplazarse, por posición al
+saltar). TablaVirtual mantiene en el Treeview únicamente los ítems visibles
+y maneja la barra de desplazamiento sobre el total de filas de la base.
+CargaEnSegundoPlano cuenta las filas y arma el índice de IDs en el hilo
+lector, sin bloquear la interfaz.
+"""
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from consulta import ConsultaDatos
+from db_worker import entregar_en_ui
+from exportar import COLUMNAS, formatear_fila
+
+
+class VentanaDatos:
+    """Filas de la tabla datos alrededor de la parte visible, leídas por ventanas"""
+
+    def __init__(self, db_manager, tamano_bloque: int = 200, max_filas: int = 1000,
+                 consulta: Optional[ConsultaDatos] = None):
+        self.db = db_manager
+        self.tamano_bloque = tamano_bloque
+        # Tope de filas en memoria; al pasarlo se descartan las más lejanas
+        self.max_filas = max_filas
+        # Filtro y búsqueda de lo que se muestra; tras cambiarla hay que recargar
+        self.consulta = consulta or ConsultaDatos()
+        self.total = 0
+        self._inicio = 0
+        self._filas: List[tuple] = []
+        # Índice posición -> ID, llenado por lotes en segundo plano; con él
+        # los saltos se leen por clave en vez de por desplazamiento
+        self._ids = array('q')
+        self.indice_completo = False
+        # Cambia en cada recarga para descartar lotes pedidos antes
+        self.generacion = 0
+        self.al_reiniciar: Optional[Callable[[], None]] = None
+        # Si está, los conteos por cambios puntuales se piden con él (en el
+        # hilo lector, que luego llama a reiniciar) en vez de hacerse aquí
+        self.al_recontar: Optional[Callable[[], None]] = None
+
+    def cambiar_consulta(self, consulta: ConsultaDatos):
+        """
+        Usar otra consulta (orden, filtros o búsqueda); lo cargado se descarta
+        hasta recargar. Si cambian las filas el total vuelve a 0 hasta el
+        próximo conteo, para no pedir ventanas más allá del resultado nuevo.
+        """
+        if not consulta.mismo_filtro(self.consulta):
+            self.total = 0
+        self.consulta = consulta
+        self._descartar()
+
+    def _descartar(self):
+        self._inicio = 0
+        self._filas = []
+        self._ids = array('q')
+        self.indice_completo = False
+        self.generacion += 1
+
+    @property
+    def _fin(self) -> int:
+        return self._inicio + len(self._filas)
+
+    def recargar(self) -> int:
+        """Volver a contar las filas y descartar las cargadas; devuelve el total"""
+        return self.reiniciar(self.db.contar_datos(self.consulta))
+
+    def _recontar(self):
+        """Las filas cargadas ya no valen: descartarlas y pedir otro conteo"""
+        if self.al_recontar is None:
+            self.recargar()
+            return
+        # Hasta que llegue el conteo las filas se leen de nuevo con el total anterior
+        self._descartar()
+        self.al_recontar()
+
+    def reiniciar(self, total: int) -> int:
+        """Descartar filas e índice y empezar de nuevo con un total ya contado"""
+        self.total = total
+        self._descartar()
+        if self.al_reiniciar is not None:
+            self.al_reiniciar()
+        return self.total
+
+    # --- Índice de IDs --------------------------------------------------------
+
+    def agregar_al_indice(self, ids: Iterable[int]):
+        """Agregar al índice el siguiente lote de IDs (en orden)"""
+        self._ids.extend(ids)
+
+    def indice_cargado(self) -> int:
+        return len(self._ids)
+
+    def en_memoria(self) -> int:
+        """Filas cargadas actualmente (no el total de la base)"""
+        return len(self._filas)
+
+    def filas(self, inicio: int, cantidad: int) -> List[tuple]:
+        """Filas desde la posición `inicio` (0 = primera fila de la tabla)"""
+        inicio = max(0, inicio)
+        fin = min(self.total, inicio + cantidad)
+        if fin <= inicio:
+            return []
+        self._asegurar(inicio, fin)
+        return self._filas[inicio - self._inicio:fin - self._inicio]
+
+    def filas_por_ids(self, ids: Iterable[int]) -> List[tuple]:
+        """Filas de los IDs indicados, ordenadas por ID; las que no están cargadas se leen de la base"""
+        ids = set(ids)
+        cargadas = {fila[0]: fila for fila in self._filas if fila[0] in ids}
+        faltantes = ids - cargadas.keys()
+        if faltantes:
+            cargadas.update((fila[0], fila) for fila in self.db.leer_filas_por_ids(faltantes))
+        return [cargadas[id] for id in sorted(cargadas)]
+
+    # --- Cambios puntuales (sin releer la tabla) ------------------------------
+
+    def _posicion(self, id: int) -> Optional[int]:
+        """Posición en la tabla de un ID cargado en memoria"""
+        for i, fila in enumerate(self._filas):
+            if fila[0] == id:
+                return self._inicio + i
+        return None
+
+    def quitar_ids(self, ids: Iterable[int]) -> Optional[List[int]]:
+        """
+        Quitar filas borradas de la base. Devuelve la posición que tenía cada
+        una, o None si alguna no estaba en memoria y hubo que volver a contar.
+        """
+        ids = set(ids)
+        posiciones = [self._posicion(id) for id in ids]
+        if None in posiciones:
+            self._recontar()
+            return None
+        self._filas = [fila for fila in self._filas if fila[0] not in ids]
+        self.total -= len(ids)
+        for id in ids:
+            self._quitar_del_indice(id)
+        return sorted(posiciones)
+
+    def _quitar_del_indice(self, id: int):
+        if self.consulta.por_id:
+            i = bisect_left(self._ids, id)
+            if i < len(self._ids) and self._ids[i] == id:
+                del self._ids[i]
+        elif id in self._ids:
+            # Con otro orden el índice no está ordenado por ID
+            self._ids.remove(id)
+
+    def agregar_ids(self, ids: Iterable[int]) -> bool:
+        """
+        Agregar filas recién creadas. Los IDs nuevos van al final de la tabla;
+        si alguno queda en medio (o la tabla está ordenada por otra columna)
+        se vuelve a contar. Devuelve False en ese caso.
+        """
+        nuevas = self.db.leer_filas_por_ids(ids, self.consulta)
+        if not nuevas:
+            return True
+        if not self.consulta.por_id or (self._filas and nuevas[0][0] < self._filas[-1][0]):
+            self._recontar()
+            return False
+        if self._fin == self.total:
+            # Lo cargado llega hasta el final: las filas nuevas se ven sin releer
+            self._filas.extend(nuevas)
+        if self.indice_completo:
+            # Mientras se carga, los lotes que faltan ya las incluyen
+            self._ids.extend(fila[0] for fila in nuevas)
+        self.total += len(nuevas)
+        return True
+
+    def actualizar_ids(self, ids: Iterable[int]) -> bool:
+        """
+        Releer filas editadas que están en memoria. Si una edición cambia qué
+        filas se muestran (p. ej. un nombre con 'q') o su lugar en el orden
+        de la tabla, se vuelve a contar y se devuelve False.
+        """
+        ids = {id for id in ids if self._posicion(id) is not None}
+        if not ids:
+            return True
+        filas = {fila[0]: fila for fila in self.db.leer_filas_por_ids(ids, self.consulta)}
+        columna = COLUMNAS.index(self.consulta.orden)
+        movidas = any(fila[0] in filas and fila[columna] != filas[fila[0]][columna] for fila in self._filas)
+        if len(filas) != len(ids) or movidas:
+            self._recontar()
+            return False
+        self._filas = [filas.get(fila[0], fila) for fila in self._filas]
+        return True
+
+    def _leer(self, **opciones) -> List[tuple]:
+        return self.db.leer_filas_datos(consulta=self.consulta, **opciones)
+
+    def _asegurar(self, inicio: int, fin: int):
+        if self._filas and self._inicio <= inicio and fin <= self._fin:
+            return
+        if self._filas and self._inicio <= inicio <= self._fin:
+            # Continuación hacia abajo: por clave desde la última fila cargada
+            self._filas.extend(self._leer(despues_de_id=self._filas[-1][0],
+                                          limite=max(self.tamano_bloque, fin - self._fin)))
+        elif self._filas and inicio < self._inicio <= fin:
+            # Continuación hacia arriba: por clave desde la primera fila cargada
+            cantidad = min(self._inicio, max(self.tamano_bloque, self._inicio - inicio))
+            anteriores = self._leer(antes_de_id=self._filas[0][0], limite=cantidad)
+            if len(anteriores) == cantidad:
+                self._filas[:0] = anteriores
+                self._inicio -= cantidad
+            else:
+                # La tabla cambió por arriba: las posiciones ya no coinciden
+                self._saltar(inicio, fin)
+        else:
+            self._saltar(inicio, fin)
+        if fin > self._fin:
+            # Faltan filas: se borraron datos desde el último conteo. La tabla
+            # termina en la última fila leída hasta que llegue el conteo real
+            if self.al_recontar is None:
+                self.total = self.db.contar_datos(self.consulta)
+            else:
+                self.total = self._fin
+                self.al_recontar()
+        self._recortar(inicio, fin)
+
+    def _saltar(self, inicio: int, fin: int):
+        """Leer una ventana nueva alrededor de [inicio, fin) por posición"""
+        desde = max(0, inicio - self.tamano_bloque // 2)
+        limite = (fin - desde) + self.tamano_bloque // 2
+        if 0 < desde <= len(self._ids):
+            # El índice da el ID de la fila anterior: lectura por clave
+            self._filas = self._leer(despues_de_id=self._ids[desde - 1], limite=limite)
+        else:
+            self._filas = self._leer(desplazamiento=desde, limite=limite)
+        self._inicio = desde
+
+    def _recortar(self, inicio: int, fin: int):
+        """Descartar las filas más lejanas a [inicio, fin) si se pasó de max_filas"""
+        tope = max(self.max_filas, fin - inicio)
+        if len(self._filas) <= tope:
+            return
+        desde = max(self._inicio, inicio - (tope - (fin - inicio)) // 2)
+        hasta = min(self._fin, desde + tope)
+        desde = max(self._inicio, hasta - tope)
+        self._filas = self._filas[desde - self._inicio:hasta - self._inicio]
+        self._inicio = desde
+
+
+class TablaVirtual:
+    """
+    Treeview que solo contiene las filas visibles. El iid de cada ítem es el
+    ID del dato: al desplazarse solo se crean o borran los ítems que entran o
+    salen de la vista. La barra de desplazamiento representa el total de filas.
+    """
+
+    def __init__(self, tree, scrollbar, ventana: VentanaDatos):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.ventana = ventana
+        self.primera = 0
+        self._visibles = 20
+        # Valores mostrados por iid, para no reescribir ítems que no cambiaron
+        self._valores: Dict[str, list] = {}
+        # IDs seleccionados, incluidos los que salieron de la vista
+        self._seleccion: Set[int] = set()
+        self._pendiente = None
+
+        self.scrollbar.configure(command=self._desplazar_barra)
+        self.tree.bind('<Configure>', lambda e: self._programar(), add='+')
+        self.tree.bind('<MouseWheel>', lambda e: self._rueda(-1 if e.delta > 0 else 1))
+        self.tree.bind('<Button-4>', lambda e: self._rueda(-1))
+        self.tree.bind('<Button-5>', lambda e: self._rueda(1))
+        self.tree.bind('<Prior>', lambda e: self._pagina(-1))
+        self.tree.bind('<Next>', lambda e: self._pagina(1))
+        self.tree.bind('<Control-Home>', lambda e: self._ir_y_cortar(0))
+        self.tree.bind('<Control-End>', lambda e: self._ir_y_cortar(self.ventana.total))
+        self.tree.bind('<Up>', lambda e: self._tecla_fila(-1))
+        self.tree.bind('<Down>', lambda e: self._tecla_fila(1))
+        self.tree.bind('<Button-1>', self._clic, add='+')
+        self.tree.bind('<<TreeviewSelect>>', self._al_seleccionar, add='+')
+
+    # --- Datos -------------------------------------------------------------
+
+    def recargar(self):
+        """Volver a contar y leer las filas, manteniendo la posición y la selección"""
+        self.ventana.recargar()
+        self._render()
+
+    def redibujar(self):
+        """Dibujar la parte visible con lo que tenga la ventana de datos"""
+        self._render()
+
+    def agregar_ids(self, ids: Iterable[int]):
+        """Mostrar datos recién creados sin releer la tabla (si la vista estaba al final, la sigue)"""
+        al_final = self.primera + self._visibles >= self.ventana.total
+        self.ventana.agregar_ids(ids)
+        if al_final:
+            self.primera = self.ventana.total
+        self._render()
+
+    def actualizar_ids(self, ids: Iterable[int]):
+        """Redibujar datos editados; solo cambian sus ítems"""
+        self.ventana.actualizar_ids(ids)
+        self._render()
+
+    def quitar_ids(self, ids: Iterable[int]):
+        """Quitar datos borrados. Si estaban arriba de la vista, la vista no se mueve"""
+        ids = set(ids)
+        posiciones = self.ventana.quitar_ids(ids)
+        if posiciones is not None:
+            self.primera -= sum(1 for posicion in posiciones if posicion < self.primera)
+        self._seleccion -= ids
+        self._render()
+
+    def cambiar_consulta(self, consulta: ConsultaDatos):
+        """
+        Mostrar otra consulta (p. ej. una búsqueda) desde la primera fila. La
+        selección se descarta porque puede no estar en el resultado; las filas
+        se leen al recargar.
+        """
+        self.ventana.cambiar_consulta(consulta)
+        self.primera = 0
+        self._seleccion.clear()
+
+    def ids_seleccionados(self) -> List[int]:
+        return sorted(self._seleccion)
+
+    def filas_seleccionadas(self) -> List[tuple]:
+        """Filas seleccionadas (también las que no están a la vista), ordenadas por ID"""
+        return self.ventana.filas_por_ids(self._seleccion)
+
+    # --- Desplazamiento -----------------------------------------------------
+
+    def ir_a(self, primera: int):
+        """Mostrar la tabla a partir de la fila `primera`"""
+        self.primera = primera
+        self._programar()
+
+    def desplazar(self, filas: int):
+        self.ir_a(self.primera + filas)
+
+    def _desplazar_barra(self, accion, cantidad, unidad=None):
+        if accion == 'moveto':
+            self.ir_a(int(float(cantidad) * self.ventana.total))
+        elif unidad == 'pages':
+            self.desplazar(int(cantidad) * self._visibles)
+        else:
+            self.desplazar(int(cantidad))
+
+    def _rueda(self, sentido: int):
+        self.desplazar(sentido * 3)
+        return 'break'
+
+    def _pagina(self, sentido: int):
+        self.desplazar(sentido * self._visibles)
+        return 'break'
+
+    def _ir_y_cortar(self, primera: int):
+        self.ir_a(primera)
+        return 'break'
+
+    def _tecla_fila(self, paso: int):
+        """Flechas en el borde de la vista: desplazar y mover el foco a la fila nueva"""
+        hijos = self.tree.get_children()
+        if not hijos or self.tree.focus() != (hijos[0] if paso < 0 else hijos[-1]):
+            return None  # Comportamiento normal del Treeview
+        self.primera += paso
+        self._render()
+        hijos = self.tree.get_children()
+        if hijos:
+            nuevo = hijos[0] if paso < 0 else hijos[-1]
+            self.tree.focus(nuevo)
+            self.tree.selection_set(nuevo)
+        return 'break'
+
+    # --- Selección ----------------------------------------------------------
+
+    def _clic(self, event):
+        # Un clic sin Shift ni Control reemplaza toda la selección, también la oculta
+        if not event.state & 0x0005:
+            self._seleccion = {id for id in self._seleccion if str(id) in self._valores}
+
+    def _al_seleccionar(self, event=None):
+        visibles = {int(iid) for iid in self._valores}
+        self._seleccion = (self._seleccion - visibles) | {int(iid) for iid in self.tree.selection()}
+
+    # --- Dibujo -------------------------------------------------------------
+
+    def _programar(self):
+        """Agrupar varios eventos de desplazamiento en un solo redibujo"""
+        if self._pendiente is None:
+            self._pendiente = self.tree.after_idle(self._render)
+
+    def _calcular_visibles(self) -> int:
+        alto = self.tree.winfo_height()
+        hijos = self.tree.get_children()
+        caja = self.tree.bbox(hijos[0]) if hijos else ''
+        if alto <= 1 or not caja:
+            return self._visibles
+        # caja = (x, y, ancho, alto): y es el alto del encabezado
+        return max(1, (alto - caja[1]) // max(1, caja[3]))
+
+    def _render(self):
+        if self._pendiente is not None:
+            self.tree.after_cancel(self._pendiente)
+            self._pendiente = None
+        self._visibles = self._calcular_visibles()
+        total = self.ventana.total
+        self.primera = max(0, min(self.primera, total - self._visibles))
+        filas = self.ventana.filas(self.primera, self._visibles)
+        if self.ventana.total != total:
+            # ventana.filas volvió a contar porque se borraron filas
+            total = self.ventana.total
+            self.primera = max(0, min(self.primera, total - self._visibles))
+            filas = self.ventana.filas(self.primera, self._visibles)
+
+        nuevos = [str(fila[0]) for fila in filas]
+        conjunto = set(nuevos)
+        salen = [iid for iid in self._valores if iid not in conjunto]
+        if salen:
+            self.tree.delete(*salen)
+            for iid in salen:
+                del self._valores[iid]
+        for indice, (iid, fila) in enumerate(zip(nuevos, filas)):
+            valores = formatear_fila(fila)
+            if iid in self._valores:
+                if self._valores[iid] != valores:
+                    self.tree.item(iid, values=valores)
+                if self.tree.index(iid) != indice:
+                    self.tree.move(iid, '', indice)
+            else:
+                self.tree.insert('', indice, iid=iid, values=valores)
+            self._valores[iid] = valores
+
+        seleccion = [str(id) for id in self._seleccion if str(id) in conjunto]
+        if set(self.tree.selection()) != set(seleccion):
+            self.tree.selection_set(seleccion)
+
+        if total:
+            self.scrollbar.set(self.primera / total, min(1.0, (self.primera + len(filas)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        # Con el alto real de las filas puede caber otra cantidad
+        if self._calcular_visibles() != self._visibles:
+            self._programar()
+
+
+class CargaEnSegundoPlano:
+    """
+    Recarga de la tabla sin bloquear Tk: el conteo y el índice de IDs se leen
+    en el hilo lector (un DBWorker) y llegan a la interfaz por lotes con
+    after(). La tabla se puede usar mientras tanto; sin índice completo los
+    saltos lejanos se leen por desplazamiento.
+    """
+
+    def __init__(self, root, lector, tabla: TablaVirtual, tamano_lote: int = 20000,
+                 al_progresar: Optional[Callable[[int, int], None]] = None,
+                 al_terminar: Optional[Callable[[bool], None]] = None,
+                 al_fallar: Optional[Callable[[BaseException], None]] = None):
+        self.root = root
+        self.lector = lector
+        self.tabla = tabla
+        self.tamano_lote = tamano_lote
+        self.al_progresar = al_progresar
+        self.al_terminar = al_terminar
+        self.al_fallar = al_fallar
+        self.cargando = False
+        self._cancelado = False
+        # Cualquier recarga de la ventana (también las síncronas) rearma el índice
+        tabla.ventana.al_reiniciar = self._cargar_indice
+        # Los conteos por altas, bajas y ediciones también van al hilo lector
+        tabla.ventana.al_recontar = self.recargar
+
+    def recargar(self):
+        """Contar las filas en el hilo lector y luego cargar el índice por lotes"""
+        ventana = self.tabla.ventana
+        self._cancelado = False
+        self.cargando = True
+        consulta = ventana.consulta
+        entregar_en_ui(self.root, self.lector.enviar(ventana.db.contar_datos, consulta),
+                       lambda total: self._contado(consulta, total), self._fallo)
+
+    def cancelar(self):
+        """Dejar de cargar el índice; la tabla sigue funcionando sin él"""
+        if self.cargando:
+            self._cancelado = True
+
+    def _contado(self, consulta: ConsultaDatos, total: int):
+        if consulta is not self.tabla.ventana.consulta:
+            return  # La consulta cambió mientras se contaba; ya hay otro conteo pedido
+        self.tabla.ventana.reiniciar(total)
+        self.tabla.redibujar()
+
+    def _cargar_indice(self):
+        if self._cancelado:
+            # Cancelada antes de llegar el conteo: el total vale, el índice no se pide
+            self._fin(False)
+            return
+        self.cargando = True
+        ventana = self.tabla.ventana
+        self._progresar(0, ventana.total)
+        self._pedir_lote(ventana.generacion, None)
+
+    def _pedir_lote(self, generacion: int, despues_de_id: Optional[int]):
+        ventana = self.tabla.ventana
+        future = self.lector.enviar(ventana.db.leer_ids_datos, despues_de_id, self.tamano_lote, ventana.consulta)
+        entregar_en_ui(self.root, future, lambda ids: self._lote(generacion, ids), self._fallo)
+
+    def _lote(self, generacion: int, ids: List[int]):
+        ventana = self.tabla.ventana
+        if generacion != ventana.generacion:
+            return  # Hubo otra recarga, que ya pidió su propio índice
+        if self._cancelado:
+            self._fin(False)
+            return
+        ventana.agregar_al_indice(ids)
+        self._progresar(ventana.indice_cargado(), ventana.total)
+        if len(ids) < self.tamano_lote:
+            ventana.indice_completo = True
+            self._fin(True)
+        else:
+            self._pedir_lote(generacion, ids[-1])
+
+    def _progresar(self, cargadas: int, total: int):
+        if self.al_progresar is not None:
+            self.al_progresar(cargadas, total)
+
+    def _fin(self, completo: bool):
+        self.cargando = False
+        self._cancelado = False
+        if self.al_terminar is not None:
+            self.al_terminar(completo)
+
+    def _fallo(self, error: BaseException):
+        self.cargando = False
+        self._cancelado = False
+        if self.al_fallar is not None:
+            self.al_fallar(error)
+        else:
+            print(f"Error al cargar datos: {error}")
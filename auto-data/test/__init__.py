@@ -0,0 +1,60 @@
+"""
+Tests para Auto-Data - Gestión de Datos
+=======================================
+
+Este paquete contiene los tests unitarios de la capa de datos
+(DatabaseManager, DataManager y Dato) de Auto-Data.
+"""
+
+# Importar todos los tests para facilitar la ejecución
+from .test_db_manager import TestDatabaseManager
+from .test_migraciones import TestMigraciones
+from .test_direcciones import TestDirecciones
+from .test_db_worker import TestDBWorker
+from .test_data_manager import TestDataManager
+from .test_metricas import TestMetricas
+from .test_dato import TestDato
+from .test_nombres import TestNombres
+from .test_cli import TestCli
+from .test_exportar import TestExportar
+from .test_importar import TestImportar
+from .test_tabla_virtual import TestTablaVirtual
+from .test_consulta import TestConsulta
+
+__all__ = [
+    'TestDatabaseManager',
+    'TestMigraciones',
+    'TestDirecciones',
+    'TestDBWorker',
+    'TestDataManager',
+    'TestMetricas',
+    'TestDato',
+    'TestNombres',
+    'TestCli',
+    'TestExportar',
+    'TestImportar',
+    'TestTablaVirtual',
+    'TestConsulta',
+]
+
+def run_all_tests():
+    """Ejecuta todos los tests del paquete"""
+    import unittest
+    
+    # Crear suite de tests
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    
+    # Agregar todos los tests
+    for test_class in __all__:
+        suite.addTests(loader.loadTestsFromTestCase(globals()[test_class]))
+    
+    # Ejecutar tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+    
+    return result.wasSuccessful()
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
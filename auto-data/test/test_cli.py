@@ -0,0 +1,82 @@
+import unittest
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import redirect_stderr
+from db_manager import DatabaseManager
+from data_manager import DataManager
+import cli
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'test.db')
+        db = DatabaseManager(self.db_path)
+        db.agregar_direcciones([f'{i} MAIN ST, LOS ANGELES, CA 90001-{i:04d}' for i in range(5)])
+        db.cerrar()
+        self.nombres = os.path.join(self.test_dir, 'nombres.txt')
+        with open(self.nombres, 'w', encoding='utf-8') as f:
+            f.write('José\n\nana\nANA\nluis\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_en_lotes(self):
+        self.assertEqual(list(cli.en_lotes(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_generar(self):
+        db = DatabaseManager(self.db_path)
+        manager = DataManager(db)
+        errores = io.StringIO()
+        with open(self.nombres, encoding='utf-8') as archivo:
+            resumen = cli.generar(manager, cli.leer_nombres(archivo), 2, errores=errores)
+        self.assertEqual((resumen['leidos'], resumen['creados'], resumen['rechazados']), (4, 3, 1))
+        self.assertEqual(errores.getvalue(), 'ANA\tEl nombre ya existe en la base de datos.\n')
+        self.assertEqual(sorted(d.nombre for d in db.leer_datos()), ['ANA', 'JOSE', 'LUIS'])
+        db.cerrar()
+
+    def test_main_sin_direcciones_suficientes(self):
+        with open(self.nombres, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(f'NOMBRE {i}' for i in range(10)))
+        with redirect_stderr(io.StringIO()):
+            codigo = cli.main([self.nombres, '--db', self.db_path, '--lote', '3', '--silencioso'])
+        self.assertEqual(codigo, 1)
+        db = DatabaseManager(self.db_path)
+        self.assertEqual(db.contar_direcciones_libres(), 5 - len(db.leer_datos()))
+        db.cerrar()
+
+    def test_main_modo_con_digito_fijo(self):
+        with redirect_stderr(io.StringIO()):
+            self.assertEqual(cli.main([self.nombres, '--db', self.db_path, '--modo', '3', '--silencioso']), 0)
+        db = DatabaseManager(self.db_path)
+        codigos = [d.codigo for d in db.leer_datos()]
+        db.cerrar()
+        self.assertEqual(len(codigos), 3)
+        self.assertTrue(all(c.endswith('3') for c in codigos), codigos)
+
+    def test_base_con_columna_fecha(self):
+        # datosex.db tiene una columna fecha NOT NULL además de las de datos.db
+        ruta = os.path.join(self.test_dir, 'datosex.db')
+        conn = sqlite3.connect(ruta)
+        conn.execute('''CREATE TABLE datos (id INTEGER PRIMARY KEY AUTOINCREMENT, fecha TEXT NOT NULL,
+                        codigo TEXT NOT NULL, nombre TEXT NOT NULL, drireccion TEXT NOT NULL, zip4 TEXT,
+                        amount_current_any REAL, amount_current_regular INTEGER,
+                        amount_pas_any REAL, amount_pas_regular INTEGER)''')
+        conn.close()
+        db = DatabaseManager(ruta)
+        db.agregar_direcciones(['1 MAIN ST 90001'])
+        db.cerrar()
+        with redirect_stderr(io.StringIO()):
+            self.assertEqual(cli.main([self.nombres, '--db', ruta, '--silencioso']), 1)
+            os.remove(self.nombres)
+            with open(self.nombres, 'w', encoding='utf-8') as f:
+                f.write('ANA\n')
+            self.assertEqual(cli.main([self.nombres, '--db', ruta, '--silencioso']), 0)
+        conn = sqlite3.connect(ruta)
+        self.assertEqual(conn.execute("SELECT nombre, fecha != '' FROM datos").fetchall(), [('ANA', 1)])
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import os
+import shutil
+import tempfile
+from db_manager import DatabaseManager
+from consulta import ConsultaDatos, consulta_fts
+from dato import Dato
+
+class TestConsulta(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.test_dir, 'test.db'))
+        self.db.crear_datos_lote([
+            Dato(codigo='11AB111C11111', nombre='ANA LOPEZ', drireccion='100 MAIN ST 90001'),
+            Dato(codigo='22CD222D22222', nombre='JOSE PEREZ', drireccion='200 OAK AVE 90002'),
+            Dato(codigo='33EF333E33333', nombre='ANAIS QUINTERO', drireccion='300 MAIN ST 90003'),
+        ])
+
+    def tearDown(self):
+        self.db.cerrar()
+        shutil.rmtree(self.test_dir)
+
+    def _ids(self, busqueda, excluir_q=True):
+        return [fila[0] for fila in self.db.leer_filas_datos(consulta=ConsultaDatos(excluir_q, busqueda))]
+
+    def test_consulta_fts(self):
+        self.assertEqual(consulta_fts('  ana  "main" '), '"ana"* "main"*')
+        self.assertEqual(consulta_fts('90001-12'), '"90001"* "12"*')
+        self.assertEqual(consulta_fts('*'), '')
+
+    def test_busca_por_prefijo_en_cada_columna(self):
+        self.assertTrue(self.db._fts)
+        self.assertEqual(self._ids('ana', excluir_q=False), [1, 3])
+        self.assertEqual(self._ids('22cd'), [2])
+        self.assertEqual(self._ids('main st'), [1])
+        self.assertEqual(self._ids('90002'), [2])
+        self.assertEqual(self._ids('ana main', excluir_q=False), [1, 3])
+        self.assertEqual(self._ids('nadie'), [])
+        self.assertEqual(self._ids(''), [1, 2])
+
+    def test_conteo_ids_y_ventanas_con_busqueda(self):
+        consulta = ConsultaDatos(False, 'main')
+        self.assertEqual(self.db.contar_datos(consulta), 2)
+        self.assertEqual(self.db.leer_ids_datos(consulta=consulta), [1, 3])
+        self.assertEqual([f[0] for f in self.db.leer_filas_datos(despues_de_id=1, consulta=consulta)], [3])
+        self.assertEqual([f[0] for f in self.db.leer_filas_datos(antes_de_id=3, consulta=consulta)], [1])
+        self.assertEqual([f[0] for f in self.db.leer_filas_por_ids([1, 2, 3], consulta)], [1, 3])
+
+    def test_triggers_mantienen_el_indice(self):
+        self.db.actualizar_dato(Dato(id=2, codigo='22CD222D22222', nombre='JOSE MAINARDI',
+                                     drireccion='200 OAK AVE', zip4='90002'))
+        self.assertEqual(self._ids('mainardi'), [2])
+        self.assertEqual(self._ids('perez'), [])
+        self.db.eliminar_datos([1])
+        self.assertEqual(self._ids('ana'), [])
+        self.db.crear_dato(Dato(codigo='44GH444F44444', nombre='ANA MARIA', drireccion='400 ELM ST'))
+        self.assertEqual(self._ids('ana'), [4])
+        # Falla si el índice no coincide con la tabla
+        self.db.get_connection().execute("INSERT INTO datos_fts (datos_fts, rank) VALUES ('integrity-check', 1)")
+
+    def test_sin_fts_usa_like(self):
+        self.db._fts = False
+        self.assertEqual(self._ids('main st'), [1])
+        self.assertEqual(self._ids('90002'), [2])
+        self.assertEqual(self.db.contar_datos(ConsultaDatos(False, 'ana')), 2)
+
+    def _montos(self):
+        conn = self.db.get_connection()
+        conn.executemany('UPDATE datos SET amount_current_any = ?, amount_pas_regular = ? WHERE id = ?',
+                         [(50.5, 7, 1), (10.0, 7, 2), (None, 3, 3)])
+
+    def test_orden_por_columna_y_clave(self):
+        self._montos()
+        consulta = ConsultaDatos(False, orden='amount_pas_regular', descendente=True)
+        self.assertEqual([f[0] for f in self.db.leer_filas_datos(consulta=consulta)], [2, 1, 3])
+        # Empate en la columna: la clave (columna, id) sigue el orden sin saltar filas
+        self.assertEqual([f[0] for f in self.db.leer_filas_datos(despues_de_id=2, consulta=consulta)], [1, 3])
+        self.assertEqual([f[0] for f in self.db.leer_filas_datos(antes_de_id=3, consulta=consulta)], [2, 1])
+        self.assertEqual(self.db.leer_ids_datos(despues_de_id=1, consulta=consulta), [3])
+        self.assertEqual([f[0] for f in self.db.leer_filas_datos(desplazamiento=1, consulta=consulta)], [1, 3])
+        # Los nulos se ordenan como 0
+        consulta = ConsultaDatos(False, orden='amount_current_any')
+        self.assertEqual(self.db.leer_ids_datos(consulta=consulta), [3, 2, 1])
+        self.assertEqual(self.db.leer_ids_datos(consulta=consulta.ordenada_por('amount_current_any')), [1, 2, 3])
+
+    def test_filtros_de_montos_y_zip(self):
+        self._montos()
+        self.assertEqual(self.db.leer_ids_datos(consulta=ConsultaDatos(False, rangos={'amount_current_any': (10, 50)})), [2])
+        self.assertEqual(self.db.leer_ids_datos(consulta=ConsultaDatos(False, rangos={'amount_current_any': (None, 10)})), [2, 3])
+        self.assertEqual(self.db.leer_ids_datos(consulta=ConsultaDatos(False, zip_prefijo='9000')), [1, 2, 3])
+        self.assertEqual(self.db.leer_ids_datos(consulta=ConsultaDatos(False, zip_prefijo='90002')), [2])
+        consulta = ConsultaDatos(False, 'main', zip_prefijo='9000', rangos={'amount_pas_regular': (5, None)})
+        self.assertEqual(self.db.contar_datos(consulta), 1)
+
+    def test_consultas_usan_indices(self):
+        conn = self.db.get_connection()
+        for columna in ('nombre', 'zip4', 'amount_current_any', 'amount_pas_regular'):
+            consulta = ConsultaDatos(orden=columna, rangos={'amount_current_any': (1, None)} if columna == 'zip4' else None)
+            filtro, parametros = self.db._filtro_consulta(consulta)
+            clave, parametros_clave = consulta.clave_sql(2)
+            plan = ' '.join(f[-1] for f in conn.execute(
+                f'EXPLAIN QUERY PLAN SELECT id FROM datos WHERE {clave}{filtro} {consulta.orden_sql()} LIMIT 10',
+                (*parametros_clave, *parametros)))
+            self.assertIn('USING', plan.split('SCALAR SUBQUERY')[0])
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_columna_no_valida(self):
+        with self.assertRaises(ValueError):
+            ConsultaDatos(orden='nombre; DROP TABLE datos')
+        with self.assertRaises(ValueError):
+            ConsultaDatos(rangos={'nombre': (1, 2)})
+
+if __name__ == '__main__':
+    unittest.main()
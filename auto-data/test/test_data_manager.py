@@ -0,0 +1,165 @@
+import unittest
+import os
+import re
+import shutil
+import tempfile
+from db_manager import DatabaseManager
+from data_manager import DataManager
+import data_manager
+
+PATRON_CODIGO = re.compile(r'^\d{2}[A-Z]{2}\d{3}[A-Z]\d{5}$')
+
+class TestDataManager(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.test_dir, 'test.db'))
+        self.db.agregar_direcciones([f'{i} MAIN ST, LOS ANGELES, CA 90001-{i:04d}' for i in range(10)])
+        self.manager = DataManager(self.db)
+
+    def tearDown(self):
+        self.db.cerrar()
+        shutil.rmtree(self.test_dir)
+
+    def test_crear_lote(self):
+        reporte = self.manager.crear_lote(['ANA', 'LUIS', 'ana'], modo='5')
+        self.assertEqual([r['id'] is not None for r in reporte], [True, True, False])
+        datos = self.db.leer_datos()
+        self.assertEqual(len({d.drireccion for d in datos}), 2)
+        self.assertTrue(all(d.codigo.endswith('5') for d in datos))
+        # La dirección de la fila rechazada vuelve al grupo libre
+        self.assertEqual(self.db.contar_direcciones_libres(), 8)
+
+    def test_crear_lote_sin_direcciones_suficientes(self):
+        with self.assertRaises(ValueError):
+            self.manager.crear_lote([f'NOMBRE {i}' for i in range(11)])
+        self.assertEqual(self.db.contar_direcciones_libres(), 10)
+        self.assertEqual(self.db.leer_datos(), [])
+
+    def test_crear_lote_en_una_transaccion_plana(self):
+        # Con los triggers de datos, el executemany dentro de un SAVEPOINT es mucho más lento
+        sentencias = []
+        self.db.get_connection().set_trace_callback(sentencias.append)
+        try:
+            self.manager.crear_lote(['ANA', 'LUIS'])
+        finally:
+            self.db.get_connection().set_trace_callback(None)
+        self.assertEqual(sum(s.startswith('BEGIN') for s in sentencias), 1)
+        self.assertFalse([s for s in sentencias if s.startswith('SAVEPOINT')])
+
+    def test_validar_nombres(self):
+        self.manager.crear_lote(['ANA MARIA'])
+        errores = self.manager.validar_nombres(['ana-maria', 'LUIS', 'luis', 'PEDRO'])
+        self.assertEqual(errores[0], 'El nombre ya existe en la base de datos.')
+        self.assertEqual(errores[2], 'El nombre está repetido en el lote.')
+        self.assertIsNone(errores[1])
+        self.assertIsNone(errores[3])
+
+    def test_crear_lote_normaliza_nombres(self):
+        reporte = self.manager.crear_lote(['José Núñez', 'jose nunez', '¡!'])
+        self.assertEqual([r['nombre'] for r in reporte], ['JOSE NUNEZ', 'JOSE NUNEZ', ''])
+        self.assertEqual([r['id'] is not None for r in reporte], [True, False, False])
+        self.assertEqual(reporte[2]['error'], 'El nombre está vacío.')
+
+    def test_crear_lote_prevalida_sin_reservar(self):
+        self.manager.crear_lote(['ANA'])
+        reporte = self.manager.crear_lote(['ana', 'ANA'])
+        self.assertTrue(all(r['id'] is None and r['error'] for r in reporte))
+        self.assertEqual(self.db.contar_direcciones_libres(), 9)
+
+    def test_indice_nombres_sigue_escrituras(self):
+        self.manager.crear_lote(['ANA', 'LUIS'])
+        ana = [d for d in self.db.leer_datos() if d.nombre == 'ANA'][0]
+        self.assertTrue(self.manager.eliminar_dato(ana.id))
+        self.assertEqual(self.manager.validar_nombres(['ANA']), [None])
+
+        luis = self.db.leer_datos()[0]
+        renombrado = self.db.leer_datos()[0]
+        renombrado.nombre = 'JOSE'
+        self.assertTrue(self.manager.actualizar_dato(renombrado, luis))
+        self.assertEqual(self.manager.validar_nombres(['LUIS', 'JOSE']),
+                         [None, 'El nombre ya existe en la base de datos.'])
+
+        self.manager.eliminar_todos_datos()
+        self.assertEqual(self.manager.validar_nombres(['JOSE']), [None])
+        self.assertEqual(self.manager.contar_direcciones_disponibles(), 10)
+
+    def test_crear_lote_usa_la_direccion_reservada_tal_cual(self):
+        # Dirección guardada sin normalizar (como lo hacía agregar_direcciones antes)
+        conn = self.db.get_connection()
+        conn.execute('UPDATE direcciones SET usada = 1')
+        conn.execute("INSERT INTO direcciones (direccion, zip4) VALUES ('55 Oak Ave, Los Angeles, CA', '90001-1234')")
+        reporte = self.manager.crear_lote(['ANA'])
+        dato = self.db.leer_filas_por_ids([reporte[0]['id']])[0]
+        self.assertEqual(dato[3:5], ('55 Oak Ave, Los Angeles, CA', '90001-1234'))
+        self.assertEqual(self.db.contar_direcciones_libres(), 0)
+        self.manager.eliminar_todos_datos()
+        libres = conn.execute('SELECT direccion FROM direcciones WHERE usada = 0').fetchall()
+        self.assertIn(('55 Oak Ave, Los Angeles, CA',), libres)
+
+    def test_borrar_libera_la_direccion(self):
+        self.manager.crear_lote(['ANA', 'LUIS'])
+        self.assertEqual(self.manager.contar_direcciones_disponibles(), 8)
+        self.assertTrue(self.manager.eliminar_primer_dato())
+        self.assertEqual(self.manager.contar_direcciones_disponibles(), 9)
+
+    def test_inicio_no_carga_direcciones(self):
+        # Las direcciones se reservan en la base: crear un DataManager no las lee
+        sentencias = []
+        self.db.get_connection().set_trace_callback(sentencias.append)
+        DataManager(self.db)
+        self.db.get_connection().set_trace_callback(None)
+        self.assertEqual([s for s in sentencias if 'direcciones' in s], [])
+
+    def test_generar_codigo_aleatorio(self):
+        codigo = self.manager.generar_codigo_aleatorio()
+        self.assertEqual(len(codigo), 13)
+        self.assertTrue(codigo[2:4].isalpha() and codigo[:2].isdigit())
+
+    def test_modo_con_cualquier_digito(self):
+        self.assertTrue(self.manager.generar_codigo_aleatorio('3').endswith('3'))
+        # Python puro (con semilla) y NumPy respetan el mismo dígito
+        for semilla in (7, None):
+            for modo in ('0', '3', '9'):
+                codigos = self.manager.generar_codigos_lote(200, modo, semilla=semilla)
+                self.assertTrue(all(c.endswith(modo) for c in codigos), (semilla, modo))
+        self.assertEqual(len({c[-1] for c in self.manager.generar_codigos_lote(500, 'random', semilla=7)}), 10)
+
+    def test_generar_codigos_lote_reproducible(self):
+        primeros = self.manager.generar_codigos_lote(50, semilla=7)
+        self.assertEqual(len(set(primeros)), 50)
+        self.assertTrue(all(PATRON_CODIGO.match(c) for c in primeros))
+        # La misma semilla choca con los ya generados y debe regenerarlos
+        otros = DataManager(self.db, semilla=1)
+        otros._codigos_existentes = set(primeros)
+        segundos = otros.generar_codigos_lote(50, semilla=7)
+        self.assertTrue(set(primeros).isdisjoint(segundos))
+
+    def test_generar_codigos_lote_evita_existentes(self):
+        self.manager.crear_lote(['ANA'])
+        existente = self.db.leer_datos()[0].codigo
+        manager = DataManager(self.db, semilla=3)
+        self.assertNotIn(existente, manager.generar_codigos_lote(1000))
+
+    @unittest.skipIf(data_manager.np is None, 'NumPy no está instalado')
+    def test_generar_codigos_lote_numpy(self):
+        codigos = self.manager.generar_codigos_lote(2000, modo='5')
+        self.assertEqual(len(set(codigos)), 2000)
+        self.assertTrue(all(PATRON_CODIGO.match(c) and c.endswith('5') for c in codigos))
+
+    def _verificar_montos(self, montos, n):
+        for col_any, col_regular in data_manager.COLUMNAS_MONTOS:
+            self.assertEqual(len(montos[col_any]), n)
+            self.assertEqual(montos[col_any].typecode, 'd')
+            self.assertEqual(montos[col_regular].typecode, 'q')
+            for decimal, entero in zip(montos[col_any], montos[col_regular]):
+                self.assertTrue(10.0 <= decimal <= 99.99)
+                self.assertEqual(round(decimal, 2), decimal)
+                self.assertEqual(int(decimal), entero)
+
+    def test_generar_montos_lote(self):
+        self._verificar_montos(self.manager.generar_montos_lote(500), 500)
+        self._verificar_montos(self.manager.generar_montos_lote(500, semilla=5), 500)
+        self.assertEqual(self.manager.generar_montos_lote(20, semilla=5), self.manager.generar_montos_lote(20, semilla=5))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import io
+from dato import Dato, DatoBatch
+
+FILA = (7, '12AB345C67890', 'ANA', '123 MAIN ST', '90001-1234', 12.5, 12, 33.25, 33)
+
+class TestDato(unittest.TestCase):
+    def test_sin_dict_por_instancia(self):
+        dato = Dato(nombre='ANA')
+        self.assertFalse(hasattr(dato, '__dict__'))
+        with self.assertRaises(AttributeError):
+            dato.otro = 1
+
+    def test_desde_fila(self):
+        dato = Dato.desde_fila(FILA)
+        self.assertEqual(dato.a_fila(), FILA)
+        self.assertEqual(dato.to_dict()['drireccion'], '123 MAIN ST')
+
+    def test_desde_fila_convierte_montos(self):
+        dato = Dato.desde_fila((1, 'X', 'ANA', 'DIR', None, '12.5', 12.9, None, 'x'))
+        self.assertEqual(dato.zip4, '')
+        self.assertEqual(dato.amount_current_any, 12.5)
+        self.assertEqual(dato.amount_current_regular, 12)
+        self.assertEqual(dato.amount_pas_any, 0.0)
+        self.assertEqual(dato.amount_pas_regular, 0)
+
+    def test_lote_columnar(self):
+        lote = DatoBatch.desde_filas([FILA, (8, 'C2', 'LUIS', '456 OAK AVE', None, 50, 50, 10.0, 10)])
+        self.assertEqual(len(lote), 2)
+        self.assertEqual(lote.amount_current_any.typecode, 'd')
+        self.assertEqual(lote.amount_current_regular.typecode, 'q')
+        self.assertEqual(lote[0].a_fila(), FILA)
+        self.assertEqual(lote[1].amount_current_any, 50.0)
+        self.assertEqual([d.nombre for d in lote], ['ANA', 'LUIS'])
+        self.assertEqual(next(lote.parametros_insert()), FILA[1:])
+
+    def test_lote_tsv(self):
+        lote = DatoBatch()
+        lote.agregar(Dato.desde_fila(FILA))
+        salida = io.StringIO()
+        self.assertEqual(lote.escribir_tsv(salida), 1)
+        self.assertEqual(salida.getvalue(), '7\t12AB345C67890\tANA\t123 MAIN ST\t90001-1234\t12.50\t12\t33.25\t33\n')
+
+if __name__ == '__main__':
+    unittest.main()
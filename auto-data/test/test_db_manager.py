@@ -0,0 +1,162 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from db_manager import DatabaseManager
+from dato import Dato
+
+class TestDatabaseManager(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.test_dir, 'test.db'))
+
+    def tearDown(self):
+        self.db.cerrar()
+        shutil.rmtree(self.test_dir)
+
+    def _dato(self, nombre, direccion, codigo='12AB345C67890'):
+        return Dato(codigo=codigo, nombre=nombre, drireccion=direccion,
+                    amount_current_any=12.5, amount_current_regular=12,
+                    amount_pas_any=33.25, amount_pas_regular=33)
+
+    def test_conexion_persistente_en_wal(self):
+        conn = self.db.get_connection()
+        self.assertIs(conn, self.db.get_connection())
+        modo = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(modo.lower(), 'wal')
+
+    def test_conexion_por_hilo(self):
+        conexiones = []
+        hilo = threading.Thread(target=lambda: conexiones.append(self.db.get_connection()))
+        hilo.start()
+        hilo.join()
+        self.assertIsNot(conexiones[0], self.db.get_connection())
+
+    def test_transaccion_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaccion() as cursor:
+                cursor.execute("INSERT INTO direcciones (direccion, zip4) VALUES ('1 A ST', '90001')")
+                raise RuntimeError('fallo')
+        total = self.db.get_connection().execute('SELECT COUNT(*) FROM direcciones').fetchone()[0]
+        self.assertEqual(total, 0)
+
+    def test_transaccion_anidada(self):
+        with self.db.transaccion() as cursor:
+            cursor.execute("INSERT INTO direcciones (direccion, zip4) VALUES ('1 A ST', '90001')")
+            with self.assertRaises(RuntimeError):
+                with self.db.transaccion() as interno:
+                    interno.execute("INSERT INTO direcciones (direccion, zip4) VALUES ('2 B ST', '90002')")
+                    raise RuntimeError('fallo')
+        filas = self.db.get_connection().execute('SELECT direccion FROM direcciones').fetchall()
+        self.assertEqual(filas, [('1 A ST',)])
+
+    def test_crear_leer_y_eliminar_dato(self):
+        id_dato = self.db.crear_dato(self._dato('JUAN-PEREZ', '1. 123 MAIN ST, LOS ANGELES, CA 90001-1234'))
+        datos = self.db.leer_datos()
+        self.assertEqual(len(datos), 1)
+        self.assertEqual(datos[0].id, id_dato)
+        self.assertEqual(datos[0].nombre, 'JUAN PEREZ')
+        self.assertEqual(datos[0].zip4, '90001-1234')
+        self.assertTrue(self.db.eliminar_dato(id_dato))
+        self.assertEqual(self.db.leer_datos(), [])
+
+    def test_leer_datos_por_paginas(self):
+        nombres = ['ANA', 'QUINTERO', 'LUIS', 'MARIA', 'ENRIQUE', 'PEDRO', 'SOFIA']
+        self.db.crear_datos_lote([self._dato(n, f'{i} MAIN ST, CA 90001') for i, n in enumerate(nombres)])
+        pagina = self.db.leer_pagina_datos(limite=2)
+        self.assertEqual([d.nombre for d in pagina], ['ANA', 'LUIS'])
+        siguiente = self.db.leer_pagina_datos(despues_de_id=pagina[-1].id, limite=2)
+        self.assertEqual([d.nombre for d in siguiente], ['MARIA', 'PEDRO'])
+        self.assertEqual([d.nombre for d in self.db.iterar_datos(tamano_pagina=2)], ['ANA', 'LUIS', 'MARIA', 'PEDRO', 'SOFIA'])
+        self.assertEqual(len(list(self.db.iterar_datos(tamano_pagina=3, excluir_q=False))), 7)
+        self.assertIsInstance(pagina[0].amount_current_regular, int)
+
+    def test_crear_dato_nombre_duplicado(self):
+        self.db.crear_dato(self._dato('ANA', '123 MAIN ST, CA 90001'))
+        with self.assertRaises(ValueError):
+            self.db.crear_dato(self._dato('ana', '456 OAK AVE, CA 90002'))
+
+    def test_crear_datos_lote(self):
+        self.db.crear_dato(self._dato('ANA', '123 MAIN ST, CA 90001'))
+        lote = [
+            self._dato('LUIS', '456 OAK AVE, CA 90002'),
+            self._dato('ana', '789 PINE RD, CA 90003'),
+            self._dato('MARIA', '123 MAIN ST, CA 90001'),
+            self._dato('luis', '321 ELM ST, CA 90004'),
+            self._dato('PEDRO', '654 CEDAR LN, CA 90005'),
+        ]
+        reporte = self.db.crear_datos_lote(lote)
+        self.assertEqual([r['error'] is None for r in reporte], [True, False, False, False, True])
+        ids = [r['id'] for r in reporte if r['id'] is not None]
+        leidos = {d.id: d.nombre for d in self.db.leer_datos()}
+        self.assertEqual([leidos[i] for i in ids], ['LUIS', 'PEDRO'])
+        self.assertEqual(len(leidos), 3)
+
+    def test_crear_datos_lote_vacio(self):
+        self.assertEqual(self.db.crear_datos_lote([]), [])
+
+    def test_usada_sincronizada_por_triggers(self):
+        self.db.agregar_direcciones(['123 MAIN ST, LOS ANGELES, CA 90001-1234', '456 OAK AVE, LOS ANGELES, CA 90002-1234'])
+        self.assertEqual(self.db.contar_direcciones_libres(), 2)
+        id_dato = self.db.crear_dato(self._dato('ANA', '123 MAIN ST, CA 90001-1234'))
+        self.assertEqual(self.db.contar_direcciones_libres(), 1)
+        self.assertEqual(self.db.obtener_direcciones_limpias(), [{'direccion': '456 OAK AVE', 'zip4': '90002-1234'}])
+
+        dato = self.db.leer_datos()[0]
+        dato.drireccion = '456 OAK AVE'
+        self.db.actualizar_dato(dato)
+        self.assertEqual(self.db.obtener_direcciones_limpias(), [{'direccion': '123 MAIN ST', 'zip4': '90001-1234'}])
+
+        self.db.eliminar_dato(id_dato)
+        self.assertEqual(self.db.contar_direcciones_libres(), 2)
+
+    def test_direccion_agregada_despues_de_usarse(self):
+        self.db.crear_dato(self._dato('ANA', '789 PINE RD'))
+        self.db.agregar_direcciones(['789 PINE RD, LOS ANGELES, CA 90003-1234'])
+        self.assertEqual(self.db.contar_direcciones_libres(), 0)
+
+    def test_importar_direcciones(self):
+        self.db.agregar_direcciones(['123 MAIN ST, CA 90001'])
+        lineas = iter(['1. 123 MAIN ST, LOS ANGELES, CA 90001', '', '456 OAK AVE 90002', ', CA 90003',
+                       '456 oak ave 90002', '789 PINE RD'])
+        stats = self.db.importar_direcciones(lineas, tamano_lote=2)
+        self.assertEqual(stats, {'insertadas': 2, 'duplicadas': 2, 'invalidas': 1, 'vacias': 1})
+        self.assertEqual(self.db.contar_direcciones_libres(), 3)
+
+    def test_importar_direcciones_archivo(self):
+        ruta = os.path.join(self.test_dir, 'direcciones.txt')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(f'{i} MAIN ST, LOS ANGELES, CA 90001-{i:04d}' for i in range(250)))
+        stats = self.db.importar_direcciones_archivo(ruta, tamano_lote=100)
+        self.assertEqual(stats['insertadas'], 250)
+
+    def test_reservar_y_liberar_direcciones(self):
+        self.db.agregar_direcciones([f'{i} MAIN ST 90001-{i:04d}' for i in range(5)])
+        primeras = self.db.reservar_direcciones(3)
+        self.assertEqual([d['direccion'] for d in primeras], ['0 MAIN ST', '1 MAIN ST', '2 MAIN ST'])
+        self.assertEqual(primeras[0]['zip4'], '90001-0000')
+        segundas = self.db.reservar_direcciones(3)
+        self.assertEqual([d['direccion'] for d in segundas], ['3 MAIN ST', '4 MAIN ST'])
+        self.assertEqual(self.db.reservar_direcciones(1), [])
+
+        self.db.crear_dato(self._dato('ANA', '0 MAIN ST'))
+        self.assertEqual(self.db.liberar_direcciones(['0 MAIN ST', '1 MAIN ST']), 1)
+        self.assertEqual(self.db.obtener_direcciones_limpias(), [{'direccion': '1 MAIN ST', 'zip4': '90001-0001'}])
+
+    def test_actualizar_dato(self):
+        id_dato = self.db.crear_dato(self._dato('ANA', '123 MAIN ST, CA 90001'))
+        dato = self.db.leer_datos()[0]
+        dato.codigo = '99ZZ999Z99995'
+        self.assertTrue(self.db.actualizar_dato(dato))
+        self.assertEqual(self.db.leer_datos()[0].codigo, '99ZZ999Z99995')
+        self.assertEqual(self.db.leer_datos()[0].id, id_dato)
+
+    def test_resetear_ids_datos(self):
+        self.db.crear_dato(self._dato('ANA', '123 MAIN ST, CA 90001'))
+        self.db.resetear_ids_datos(500)
+        id_dato = self.db.crear_dato(self._dato('LUIS', '456 OAK AVE, CA 90002'))
+        self.assertEqual(id_dato, 500)
+
+if __name__ == '__main__':
+    unittest.main()
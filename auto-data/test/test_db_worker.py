@@ -0,0 +1,68 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from db_manager import DatabaseManager
+from db_worker import DBWorker, entregar_en_ui
+
+
+class RootFalso:
+    """Sustituto mínimo de Tk: guarda los callbacks de after() y los ejecuta en bucle"""
+    def __init__(self):
+        self.pendientes = []
+
+    def after(self, ms, funcion):
+        self.pendientes.append(funcion)
+
+    def procesar(self, maximo=10000):
+        while self.pendientes and maximo:
+            self.pendientes.pop(0)()
+            maximo -= 1
+
+
+class TestDBWorker(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.test_dir, 'test.db'))
+        self.worker = DBWorker(self.db)
+
+    def tearDown(self):
+        self.worker.detener()
+        self.db.cerrar()
+        shutil.rmtree(self.test_dir)
+
+    def test_ejecuta_en_hilo_escritor(self):
+        future = self.worker.enviar(lambda: threading.current_thread().name)
+        self.assertEqual(future.result(timeout=5), 'db-writer')
+
+    def test_escrituras_en_orden(self):
+        futures = [self.worker.enviar(self.db.agregar_direcciones, [f'{i} MAIN ST 90001']) for i in range(20)]
+        self.assertEqual([f.result(timeout=5) for f in futures], [1] * 20)
+        # La lectura usa la conexión del hilo principal
+        self.assertEqual(self.db.contar_direcciones_libres(), 20)
+
+    def test_error_se_propaga(self):
+        future = self.worker.enviar(self.db.eliminar_dato, 'no-es-un-id')
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
+        # El hilo sigue vivo después de un error
+        self.assertEqual(self.worker.enviar(lambda: 1).result(timeout=5), 1)
+
+    def test_entregar_en_ui(self):
+        root = RootFalso()
+        resultados, errores = [], []
+        entregar_en_ui(root, self.worker.enviar(lambda: 42), resultados.append, errores.append)
+        entregar_en_ui(root, self.worker.enviar(int, 'x'), resultados.append, errores.append)
+        self.worker.detener()
+        root.procesar()
+        self.assertEqual(resultados, [42])
+        self.assertIsInstance(errores[0], ValueError)
+
+    def test_detener(self):
+        self.worker.detener()
+        with self.assertRaises(RuntimeError):
+            self.worker.enviar(lambda: None)
+
+if __name__ == '__main__':
+    unittest.main()
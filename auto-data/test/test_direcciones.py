@@ -0,0 +1,30 @@
+import unittest
+from direcciones import normalizar_direccion, normalizar_direcciones, benchmark
+
+class TestDirecciones(unittest.TestCase):
+    def test_formato_completo(self):
+        self.assertEqual(normalizar_direccion('1. 123 MAIN ST, LOS ANGELES, CA 90001-1234'),
+                         ('123 MAIN ST', '90001-1234'))
+
+    def test_estado_sin_ciudad(self):
+        self.assertEqual(normalizar_direccion('123 MAIN ST, CA 90001'), ('123 MAIN ST', '90001'))
+
+    def test_zip_sin_comas(self):
+        self.assertEqual(normalizar_direccion('5865 S HAAS AVE 90047-5912'), ('5865 S HAAS AVE', '90047-5912'))
+
+    def test_sin_zip(self):
+        self.assertEqual(normalizar_direccion('  123  main   st '), ('123 MAIN ST', ''))
+
+    def test_idempotente(self):
+        calle, _ = normalizar_direccion('2. 8410 S BROADWAY, LOS ANGELES, CA 90003-2402')
+        self.assertEqual(normalizar_direccion(calle), (calle, ''))
+
+    def test_lote_conserva_orden(self):
+        resultado = normalizar_direcciones(['1 A ST 90001', '', '2 B ST, CA 90002-0001'])
+        self.assertEqual(resultado, [('1 A ST', '90001'), ('', ''), ('2 B ST', '90002-0001')])
+
+    def test_benchmark(self):
+        self.assertGreater(benchmark(1000), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import io
+import json
+import os
+import shutil
+import tempfile
+from db_manager import DatabaseManager
+from dato import Dato
+import exportar
+
+class TestExportar(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.test_dir, 'test.db'))
+        self.db.crear_datos_lote([
+            Dato(codigo=f'C{i}', nombre=f'NOMBRE {i}', drireccion=f'{i} MAIN ST 90001',
+                 amount_current_any=10.5 + i, amount_current_regular=10 + i,
+                 amount_pas_any=20.0, amount_pas_regular=20)
+            for i in range(5)
+        ])
+
+    def tearDown(self):
+        self.db.cerrar()
+        shutil.rmtree(self.test_dir)
+
+    def exportar(self, formato, **opciones):
+        salida = io.StringIO()
+        escritas = exportar.exportar_datos(self.db, salida, formato, tamano_pagina=2, **opciones)
+        return escritas, salida.getvalue().splitlines()
+
+    def test_tsv_igual_a_copiar(self):
+        escritas, lineas = self.exportar('tsv')
+        self.assertEqual(escritas, 5)
+        self.assertEqual(lineas[0], '1\tC0\tNOMBRE 0\t0 MAIN ST\t90001\t10.50\t10\t20.00\t20')
+        # Mismo texto que al copiar los valores mostrados en la tabla
+        self.assertEqual(exportar.linea_tsv((1, 'C0', 'NOMBRE 0', '0 MAIN ST', '90001', '10.50', 10, '20.00', 20)),
+                         lineas[0])
+
+    def test_csv_columnas_y_rango(self):
+        escritas, lineas = self.exportar('csv', columnas=['id', 'nombre', 'amount_pas_any'], desde_id=2, hasta_id=4)
+        self.assertEqual(escritas, 3)
+        self.assertEqual(lineas, ['id,nombre,amount_pas_any', '2,NOMBRE 1,20.00', '3,NOMBRE 2,20.00', '4,NOMBRE 3,20.00'])
+
+    def test_jsonl(self):
+        _, lineas = self.exportar('jsonl', columnas=['id', 'amount_current_any'], hasta_id=1)
+        self.assertEqual([json.loads(l) for l in lineas], [{'id': 1, 'amount_current_any': 10.5}])
+
+    def test_columna_o_formato_invalido(self):
+        with self.assertRaises(ValueError):
+            self.exportar('tsv', columnas=['id', 'nombre; DROP TABLE datos'])
+        with self.assertRaises(ValueError):
+            self.exportar('xml')
+
+    def test_exportar_archivo_por_extension(self):
+        ruta = os.path.join(self.test_dir, 'datos.jsonl')
+        self.assertEqual(exportar.exportar_datos_archivo(self.db, ruta), 5)
+        with open(ruta, encoding='utf-8') as f:
+            self.assertEqual(json.loads(f.readline())['nombre'], 'NOMBRE 0')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+from db_manager import DatabaseManager
+from data_manager import DataManager
+from dato import Dato
+import exportar
+import importar
+
+class TestImportar(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.test_dir, 'test.db'))
+        self.db.crear_datos_lote([
+            Dato(codigo='C1', nombre='ANA', drireccion='1 MAIN ST 90001', amount_current_any=10.5),
+            Dato(codigo='C2', nombre='LUIS', drireccion='2 MAIN ST 90001'),
+        ])
+
+    def tearDown(self):
+        self.db.cerrar()
+        shutil.rmtree(self.test_dir)
+
+    def test_parsear_linea(self):
+        dato = importar.parsear_linea_tsv('7\tC7\tANA\t1 MAIN ST\t90001\t12.50\t12\t33.25\t33\n')
+        self.assertEqual(dato.a_fila(), (7, 'C7', 'ANA', '1 MAIN ST', '90001', 12.5, 12, 33.25, 33))
+        self.assertIsNone(importar.parsear_linea_tsv('C7\tANA\t1 MAIN ST\t\t\t\t\t').id)
+        # El nombre se normaliza como en el resto de la aplicación
+        self.assertEqual(importar.parsear_linea_tsv('\tC8\tJosé Pérez-Núñez\t\t\t\t\t\t').nombre, 'JOSE PEREZ NUNEZ')
+        with self.assertRaises(ValueError):
+            importar.parsear_linea_tsv('7\tC7\tANA')
+        with self.assertRaises(ValueError):
+            importar.parsear_linea_tsv('7\tC7\tANA\t1 MAIN ST\t90001\tdiez\t12\t33.25\t33')
+
+    def test_upsert_por_id(self):
+        reporte = importar.importar_lineas_tsv(self.db, [
+            '1\tC1\tANA MARIA\t1 MAIN ST\t90001\t11.00\t11\t0.00\t0',
+            '50\tC50\tPEDRO\t50 OAK AVE\t90002\t1.00\t1\t2.00\t2',
+            '51\tC51\tluis\t51 OAK AVE\t\t1.00\t1\t2.00\t2',
+            'basura',
+        ])
+        self.assertEqual([r['accion'] for r in reporte], ['actualizado', 'insertado', None, None])
+        self.assertEqual(reporte[2]['error'], 'El nombre ya existe en la base de datos.')
+        self.assertTrue(reporte[3]['error'].startswith('Formato inválido'))
+        datos = {d.id: d for d in self.db.leer_datos()}
+        self.assertEqual(set(datos), {1, 2, 50})
+        self.assertEqual((datos[1].nombre, datos[1].amount_current_any), ('ANA MARIA', 11.0))
+
+    def test_upsert_por_codigo_entre_bases(self):
+        salida = io.StringIO()
+        exportar.exportar_datos(self.db, salida, 'tsv')
+        otra = DatabaseManager(os.path.join(self.test_dir, 'otra.db'))
+        otra.crear_datos_lote([Dato(codigo='C2', nombre='LUIS VIEJO', drireccion='9 ELM ST')])
+        reporte = importar.importar_lineas_tsv(otra, salida.getvalue().splitlines(), clave='codigo')
+        self.assertEqual(importar.resumir(reporte), {'insertados': 1, 'actualizados': 1, 'errores': 0})
+        self.assertEqual(sorted((d.codigo, d.nombre) for d in otra.leer_datos()), [('C1', 'ANA'), ('C2', 'LUIS')])
+        # La dirección reemplazada vuelve a estar libre
+        otra.agregar_direcciones(['9 ELM ST 90009'])
+        self.assertEqual(otra.contar_direcciones_libres(), 1)
+        otra.cerrar()
+
+    def test_data_manager_recarga_indices(self):
+        manager = DataManager(self.db)
+        self.assertEqual(manager.validar_nombres(['PEDRO']), [None])
+        manager.importar_datos_tsv(['\tC9\tPEDRO\t9 ELM ST\t\t0\t0\t0\t0'])
+        self.assertEqual(manager.validar_nombres(['PEDRO']), ['El nombre ya existe en la base de datos.'])
+        ruta = os.path.join(self.test_dir, 'datos.tsv')
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write('\tC10\tPéña\t10 ELM ST\t\t0\t0\t0\t0\n')
+        self.assertEqual(manager.importar_archivo_tsv(ruta)[0]['accion'], 'insertado')
+        self.assertEqual(manager.validar_nombres(['PENA']), ['El nombre ya existe en la base de datos.'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import os
+import shutil
+import tempfile
+from db_manager import DatabaseManager
+
+class TestMetricas(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'test.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_desactivada_por_defecto(self):
+        db = DatabaseManager(self.db_path)
+        db.agregar_direcciones(['1 MAIN ST 90001'])
+        self.assertEqual(db.stats(), {})
+        db.cerrar()
+
+    def test_cuenta_llamadas_y_filas(self):
+        db = DatabaseManager(self.db_path, instrumentar=True)
+        db.agregar_direcciones(['1 MAIN ST 90001', '2 MAIN ST 90001'])
+        db.obtener_direcciones_limpias()
+        db.obtener_direcciones_limpias()
+        metodos = db.stats()['metodos']
+        self.assertEqual(metodos['agregar_direcciones']['llamadas'], 1)
+        self.assertEqual(metodos['agregar_direcciones']['filas'], 2)
+        self.assertEqual(metodos['obtener_direcciones_limpias']['llamadas'], 2)
+        self.assertEqual(metodos['obtener_direcciones_limpias']['filas'], 4)
+        self.assertGreaterEqual(metodos['obtener_direcciones_limpias']['p95_ms'], 0)
+        self.assertIn('obtener_direcciones_limpias', db.reporte_stats())
+        db.cerrar()
+
+    def test_registro_de_sentencias_lentas(self):
+        db = DatabaseManager(self.db_path, instrumentar=True, umbral_lento_ms=0)
+        db.contar_direcciones_libres()
+        lentas = [l for l in db.stats()['sentencias_lentas'] if l['tipo'] == 'sentencia']
+        self.assertEqual(lentas[-1]['metodo'], 'contar_direcciones_libres')
+        self.assertIn('usada = 0', lentas[-1]['sql'])
+        db.cerrar()
+
+    def test_lotes_se_miden_por_metodo(self):
+        # executemany y los triggers no pasan entero por el trace: el método se registra completo
+        db = DatabaseManager(self.db_path, instrumentar=True, umbral_lento_ms=0)
+        db.agregar_direcciones([f'{i} MAIN ST 90001' for i in range(50)])
+        metodos = [l for l in db.stats()['sentencias_lentas'] if l['tipo'] == 'metodo']
+        self.assertEqual([l['metodo'] for l in metodos], ['agregar_direcciones'])
+        self.assertIn('50 filas', metodos[0]['sql'])
+        self.assertIn('método completo', db.reporte_stats())
+        db.cerrar()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+from db_manager import DatabaseManager
+from migraciones import MIGRACIONES, version_actual
+from consulta import ConsultaDatos
+
+class TestMigraciones(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'test.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _plan(self, db, sql, params=()):
+        filas = db.get_connection().execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+        return ' '.join(f[-1] for f in filas)
+
+    def test_base_nueva_en_ultima_version(self):
+        db = DatabaseManager(self.db_path)
+        self.assertEqual(version_actual(db.get_connection()), MIGRACIONES[-1][0])
+        indices = {f[0] for f in db.get_connection().execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertTrue({'idx_datos_nombre', 'idx_datos_drireccion', 'idx_direcciones_usada', 'idx_datos_codigo',
+                         'idx_datos_zip4', 'idx_datos_amount_current_any'} <= indices)
+        self.assertTrue(db._fts)
+        db.cerrar()
+
+    def test_consultas_usan_indices(self):
+        db = DatabaseManager(self.db_path)
+        self.assertIn('idx_datos_nombre', self._plan(db, 'SELECT COUNT(*) FROM datos WHERE nombre = ? COLLATE NOCASE', ('A',)))
+        self.assertIn('idx_datos_drireccion', self._plan(db, 'SELECT COUNT(*) FROM datos WHERE drireccion = ?', ('A',)))
+        self.assertIn('idx_direcciones_usada', self._plan(db, 'SELECT direccion FROM direcciones WHERE usada = 0'))
+        self.assertIn('idx_datos_codigo', self._plan(db, 'SELECT id FROM datos WHERE codigo = ?', ('A',)))
+        db.cerrar()
+
+    def test_migra_base_antigua(self):
+        # Base creada sin columna usada y con nombres repetidos
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE datos (id INTEGER PRIMARY KEY AUTOINCREMENT, codigo TEXT NOT NULL, nombre TEXT NOT NULL, drireccion TEXT NOT NULL, zip4 TEXT, amount_current_any REAL, amount_current_regular INTEGER, amount_pas_any REAL, amount_pas_regular INTEGER)')
+        conn.execute('CREATE TABLE direcciones (id INTEGER PRIMARY KEY AUTOINCREMENT, direccion TEXT UNIQUE NOT NULL, zip4 TEXT)')
+        conn.executemany("INSERT INTO datos (codigo, nombre, drireccion) VALUES ('X', ?, ?)", [('ANA', '1 A ST'), ('ana', '2 B ST')])
+        conn.commit()
+        conn.close()
+
+        db = DatabaseManager(self.db_path)
+        columnas = [f[1] for f in db.get_connection().execute('PRAGMA table_info(direcciones)')]
+        self.assertIn('usada', columnas)
+        self.assertEqual(len(db.leer_datos()), 2)
+        # El índice de búsqueda se llena con los datos que ya estaban
+        self.assertEqual(db.contar_datos(ConsultaDatos(busqueda='ana')), 2)
+        self.assertEqual(version_actual(db.get_connection()), MIGRACIONES[-1][0])
+        db.cerrar()
+
+    def test_migra_direcciones_a_la_clave_normalizada(self):
+        # Direcciones guardadas antes de normalizar, con mayúsculas distintas
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE datos (id INTEGER PRIMARY KEY AUTOINCREMENT, codigo TEXT NOT NULL, nombre TEXT NOT NULL, drireccion TEXT NOT NULL, zip4 TEXT, amount_current_any REAL, amount_current_regular INTEGER, amount_pas_any REAL, amount_pas_regular INTEGER)')
+        conn.execute('CREATE TABLE direcciones (id INTEGER PRIMARY KEY AUTOINCREMENT, direccion TEXT UNIQUE NOT NULL, zip4 TEXT)')
+        conn.executemany('INSERT INTO direcciones (direccion, zip4) VALUES (?, NULL)',
+                         [('123 Main St',), ('123 MAIN ST, Los Angeles, CA 90001-1234',), ('9 Elm  Rd',)])
+        conn.execute("INSERT INTO datos (codigo, nombre, drireccion) VALUES ('X', 'ANA', '123 main st')")
+        conn.commit()
+        conn.close()
+
+        db = DatabaseManager(self.db_path)
+        filas = db.get_connection().execute('SELECT direccion, zip4, usada FROM direcciones ORDER BY id').fetchall()
+        self.assertEqual(filas, [('123 MAIN ST', '90001-1234', 1), ('9 ELM RD', None, 0)])
+        self.assertEqual(db.leer_datos()[0].drireccion, '123 MAIN ST')
+        # La dirección ya no cuenta como libre ni como distinta de la usada
+        self.assertEqual(db.contar_direcciones_libres(), 1)
+        self.assertEqual(version_actual(db.get_connection()), MIGRACIONES[-1][0])
+        db.cerrar()
+
+    def test_reabrir_no_repite_migraciones(self):
+        DatabaseManager(self.db_path).cerrar()
+        db = DatabaseManager(self.db_path)
+        self.assertEqual(version_actual(db.get_connection()), MIGRACIONES[-1][0])
+        db.cerrar()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from nombres import normalizar_nombre, normalizar_nombres, benchmark
+
+class TestNombres(unittest.TestCase):
+    def test_quita_acentos_y_mayusculas(self):
+        self.assertEqual(normalizar_nombre('José María Núñez'), 'JOSE MARIA NUNEZ')
+
+    def test_guiones_y_simbolos(self):
+        self.assertEqual(normalizar_nombre("  o'brien-smith,  jr. "), 'OBRIEN SMITH JR')
+
+    def test_letras_especiales(self):
+        self.assertEqual(normalizar_nombre('Strauß Ærø'), 'STRAUSS AERO')
+
+    def test_sin_letras(self):
+        self.assertEqual(normalizar_nombre('¡¿?!'), '')
+
+    def test_idempotente(self):
+        nombre = normalizar_nombre('Ángela Gómez-Peña')
+        self.assertEqual(normalizar_nombre(nombre), nombre)
+
+    def test_lote_conserva_orden(self):
+        self.assertEqual(normalizar_nombres(['ana', 'Éva', 'ana']), ['ANA', 'EVA', 'ANA'])
+
+    def test_benchmark(self):
+        self.assertGreater(benchmark(1000), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,362 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from db_manager import DatabaseManager
+from db_worker import DBWorker
+from dato import Dato
+from tabla_virtual import VentanaDatos, TablaVirtual, CargaEnSegundoPlano
+from consulta import ConsultaDatos
+
+
+class RootFalso:
+    """Sustituto mínimo de Tk: ejecuta los callbacks de after() hasta que no quede ninguno"""
+    def __init__(self):
+        self.pendientes = []
+
+    def after(self, ms, funcion):
+        self.pendientes.append(funcion)
+
+    def procesar(self, timeout=5):
+        limite = time.monotonic() + timeout
+        while self.pendientes and time.monotonic() < limite:
+            self.pendientes.pop(0)()
+            time.sleep(0.001)
+
+
+class TreeFalso:
+    """Sustituto mínimo de ttk.Treeview que cuenta las operaciones sobre ítems"""
+    def __init__(self, filas_visibles=10):
+        self.filas_visibles = filas_visibles
+        self.hijos = []
+        self.valores = {}
+        self._seleccion = []
+        self.operaciones = 0
+        self.pendientes = []
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def configure(self, **kwargs):
+        self.comando = kwargs.get('command')
+
+    def after_idle(self, funcion):
+        self.pendientes.append(funcion)
+        return len(self.pendientes)
+
+    def after_cancel(self, identificador):
+        self.pendientes = []
+
+    def procesar(self):
+        while self.pendientes:
+            self.pendientes.pop(0)()
+
+    def winfo_height(self):
+        return 25 + 20 * self.filas_visibles
+
+    def bbox(self, iid):
+        return (0, 25, 100, 20)
+
+    def get_children(self):
+        return tuple(self.hijos)
+
+    def insert(self, padre, indice, iid, values):
+        self.hijos.insert(indice, iid)
+        self.valores[iid] = values
+        self.operaciones += 1
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.hijos.remove(iid)
+            del self.valores[iid]
+            self.operaciones += 1
+
+    def item(self, iid, values):
+        self.valores[iid] = values
+        self.operaciones += 1
+
+    def index(self, iid):
+        return self.hijos.index(iid)
+
+    def move(self, iid, padre, indice):
+        self.hijos.remove(iid)
+        self.hijos.insert(indice, iid)
+        self.operaciones += 1
+
+    def selection(self):
+        return tuple(iid for iid in self._seleccion if iid in self.valores)
+
+    def selection_set(self, iids):
+        self._seleccion = list(iids)
+
+    def focus(self, iid=None):
+        return ''
+
+    def set(self, primero, ultimo):
+        self.barra = (primero, ultimo)
+
+
+class TestTablaVirtual(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.test_dir, 'test.db'))
+        # Cada décimo nombre tiene 'q' y la tabla no lo muestra
+        self.db.crear_datos_lote([
+            Dato(codigo=f'C{i}', nombre=f'NOMBRE {i}' + (' q' if i % 10 == 9 else ''), drireccion=f'{i} MAIN ST')
+            for i in range(1000)
+        ])
+        self.ventana = VentanaDatos(self.db, tamano_bloque=50, max_filas=200)
+        self.ventana.recargar()
+
+    def tearDown(self):
+        self.db.cerrar()
+        shutil.rmtree(self.test_dir)
+
+    def test_total_y_ventanas(self):
+        self.assertEqual(self.ventana.total, 900)
+        todas = [f[0] for f in self.db.leer_filas_datos(limite=1000)]
+        # Hacia abajo por clave, hacia arriba por clave y saltos por posición
+        for inicio in (0, 30, 60, 400, 370, 899, 0):
+            self.assertEqual([f[0] for f in self.ventana.filas(inicio, 40)], todas[inicio:inicio + 40])
+            self.assertLessEqual(self.ventana.en_memoria(), 200)
+
+    def test_corrige_total_si_se_borraron_filas(self):
+        self.db.eliminar_todos_datos()
+        self.assertEqual(self.ventana.filas(850, 40), [])
+        self.assertEqual(self.ventana.total, 0)
+
+    def test_filas_por_ids(self):
+        self.ventana.filas(0, 10)
+        filas = self.ventana.filas_por_ids([5, 949])
+        self.assertEqual([(f[0], f[2]) for f in filas], [(5, 'NOMBRE 4'), (949, 'NOMBRE 948')])
+
+    def test_solo_items_visibles(self):
+        tree = TreeFalso(filas_visibles=10)
+        tabla = TablaVirtual(tree, tree, self.ventana)
+        tabla.recargar()
+        # El primer dibujo mide el alto real de las filas y se corrige
+        tree.procesar()
+        self.assertEqual(len(tree.get_children()), 10)
+        self.assertEqual(tree.barra, (0.0, 10 / 900))
+        self.assertEqual(tree.valores['1'], ['1', 'C0', 'NOMBRE 0', '0 MAIN ST', '', '0.00', '0', '0.00', '0'])
+
+        # Bajar una fila solo borra un ítem y crea otro
+        tree.operaciones = 0
+        tabla.desplazar(1)
+        tree.procesar()
+        self.assertEqual(tree.operaciones, 2)
+        self.assertEqual(tree.get_children()[0], '2')
+
+        # Saltar al final con la barra
+        tree.comando('moveto', '1.0')
+        tree.procesar()
+        self.assertEqual(tree.get_children()[-1], '999')
+        self.assertEqual(tabla.primera, 890)
+
+    def test_seleccion_fuera_de_la_vista(self):
+        tree = TreeFalso(filas_visibles=10)
+        tabla = TablaVirtual(tree, tree, self.ventana)
+        tabla.recargar()
+        tree.procesar()
+        tree.selection_set(['2', '3'])
+        tabla._al_seleccionar()
+        tabla.ir_a(500)
+        tree.procesar()
+        self.assertEqual(tree.selection(), ())
+        self.assertEqual([f[0] for f in tabla.filas_seleccionadas()], [2, 3])
+        tabla.ir_a(0)
+        tree.procesar()
+        self.assertEqual(set(tree.selection()), {'2', '3'})
+
+    def _tabla_en(self, primera):
+        tree = TreeFalso(filas_visibles=10)
+        tabla = TablaVirtual(tree, tree, self.ventana)
+        tabla.recargar()
+        tree.procesar()
+        tabla.ir_a(primera)
+        tree.procesar()
+        tree.operaciones = 0
+        return tree, tabla
+
+    def test_quitar_dato_visible_toca_pocos_items(self):
+        tree, tabla = self._tabla_en(100)
+        visibles = tree.get_children()
+        self.db.eliminar_datos([int(visibles[3])])
+        tabla.quitar_ids([int(visibles[3])])
+        # Se borra un ítem y entra uno por abajo; los demás no se tocan
+        self.assertEqual(tree.operaciones, 2)
+        self.assertEqual(tree.get_children()[:3], visibles[:3])
+        self.assertEqual(tabla.ventana.total, 899)
+
+    def test_quitar_dato_arriba_no_mueve_la_vista(self):
+        tree, tabla = self._tabla_en(100)
+        primera = tree.get_children()[0]
+        self.db.eliminar_datos([50])
+        tabla.quitar_ids([50])
+        self.assertEqual(tree.get_children()[0], primera)
+        self.assertEqual(tree.operaciones, 0)
+
+    def test_agregar_al_final(self):
+        tree, tabla = self._tabla_en(900)
+        reporte = self.db.crear_datos_lote([Dato(codigo='N1', nombre='NUEVO', drireccion='1 NEW ST')])
+        tabla.agregar_ids([reporte[0]['id']])
+        self.assertEqual(tabla.ventana.total, 901)
+        self.assertEqual(tree.get_children()[-1], str(reporte[0]['id']))
+
+    def test_actualizar_dato(self):
+        tree, tabla = self._tabla_en(0)
+        dato = self.db.leer_pagina_datos(limite=1)[0]
+        dato.nombre = 'EDITADO'
+        self.db.actualizar_dato(dato)
+        tabla.actualizar_ids([dato.id])
+        self.assertEqual(tree.operaciones, 1)
+        self.assertEqual(tree.valores[str(dato.id)][2], 'EDITADO')
+        # Un nombre con 'q' deja de mostrarse
+        dato.nombre = 'EDITADO q'
+        self.db.actualizar_dato(dato)
+        tabla.actualizar_ids([dato.id])
+        self.assertNotIn(str(dato.id), tree.get_children())
+        self.assertEqual(tabla.ventana.total, 899)
+
+    def test_carga_en_segundo_plano(self):
+        tree = TreeFalso(filas_visibles=10)
+        tabla = TablaVirtual(tree, tree, VentanaDatos(self.db, tamano_bloque=50, max_filas=200))
+        root = RootFalso()
+        lector = DBWorker(self.db, nombre='db-lector')
+        progreso, fin = [], []
+        carga = CargaEnSegundoPlano(root, lector, tabla, tamano_lote=100,
+                                    al_progresar=lambda c, t: progreso.append((c, t)), al_terminar=fin.append)
+        carga.recargar()
+        # Nada se lee en el hilo de Tk hasta que llega el conteo
+        self.assertEqual(tree.get_children(), ())
+        root.procesar()
+        tree.procesar()
+        lector.detener()
+        self.assertEqual(fin, [True])
+        self.assertEqual(progreso[-1], (900, 900))
+        self.assertEqual(len(progreso), 11)
+        self.assertEqual(len(tree.get_children()), 10)
+        self.assertTrue(tabla.ventana.indice_completo)
+
+        # Con el índice, un salto lee por clave y da las mismas filas
+        todas = [f[0] for f in self.db.leer_filas_datos(limite=1000)]
+        self.db.eliminar_datos([todas[10]])
+        tabla.ventana.filas(0, 20)
+        tabla.ventana.quitar_ids([todas[10]])
+        del todas[10]
+        self.assertEqual([f[0] for f in tabla.ventana.filas(600, 5)], todas[600:605])
+
+    def test_cambios_cuentan_en_el_hilo_lector(self):
+        tree = TreeFalso(filas_visibles=10)
+        tabla = TablaVirtual(tree, tree, VentanaDatos(self.db, tamano_bloque=50, max_filas=200))
+        root = RootFalso()
+        lector = DBWorker(self.db, nombre='db-lector')
+        carga = CargaEnSegundoPlano(root, lector, tabla, tamano_lote=100)
+        carga.recargar()
+        root.procesar()
+        hilos = []
+        contar = self.db.contar_datos
+        self.db.contar_datos = lambda *a: hilos.append(threading.current_thread().name) or contar(*a)
+        # Un dato borrado fuera de memoria y luego filas que faltan al final
+        todas = [f[0] for f in self.db.leer_filas_datos(limite=1000)]
+        self.db.eliminar_datos([todas[500]])
+        tabla.quitar_ids([todas[500]])
+        self.db.eliminar_datos(todas[-5:])
+        tabla.ir_a(900)
+        tree.procesar()
+        self.assertEqual(tabla.ventana.total, 894)
+        root.procesar()
+        tree.procesar()
+        lector.detener()
+        self.assertTrue(hilos)
+        self.assertEqual(set(hilos), {'db-lector'})
+        self.assertEqual(tabla.ventana.total, 894)
+        self.assertEqual(tree.get_children()[-1], str(todas[-6]))
+
+    def test_cancelar_carga(self):
+        tree = TreeFalso(filas_visibles=10)
+        tabla = TablaVirtual(tree, tree, VentanaDatos(self.db))
+        root = RootFalso()
+        lector = DBWorker(self.db, nombre='db-lector')
+        fin = []
+        carga = CargaEnSegundoPlano(root, lector, tabla, tamano_lote=100, al_terminar=fin.append)
+        carga.recargar()
+        carga.al_progresar = lambda c, t: carga.cancelar() if c >= 300 else None
+        root.procesar()
+        lector.detener()
+        self.assertEqual(fin, [False])
+        self.assertFalse(tabla.ventana.indice_completo)
+        self.assertEqual(tabla.ventana.indice_cargado(), 300)
+        # Sin índice completo los saltos siguen funcionando por desplazamiento
+        self.assertEqual(len(tabla.ventana.filas(800, 10)), 10)
+
+    def test_cancelar_antes_del_conteo(self):
+        tree = TreeFalso(filas_visibles=10)
+        tabla = TablaVirtual(tree, tree, VentanaDatos(self.db))
+        root = RootFalso()
+        lector = DBWorker(self.db, nombre='db-lector')
+        fin = []
+        carga = CargaEnSegundoPlano(root, lector, tabla, tamano_lote=100, al_terminar=fin.append)
+        leer_ids = self.db.leer_ids_datos
+        pedidos = []
+        self.db.leer_ids_datos = lambda *a: pedidos.append(a) or leer_ids(*a)
+        carga.recargar()
+        carga.cancelar()
+        root.procesar()
+        lector.detener()
+        self.assertEqual(fin, [False])
+        self.assertEqual(pedidos, [])
+        self.assertFalse(carga.cargando)
+        # El conteo sí se aplica y las filas se leen sin índice
+        self.assertEqual(tabla.ventana.total, 900)
+        self.assertEqual(tabla.ventana.indice_cargado(), 0)
+        self.assertEqual(len(tabla.ventana.filas(800, 10)), 10)
+
+    def test_orden_por_columna_en_segundo_plano(self):
+        tabla = TablaVirtual(TreeFalso(filas_visibles=10), TreeFalso(), VentanaDatos(self.db, tamano_bloque=50, max_filas=200))
+        root = RootFalso()
+        lector = DBWorker(self.db, nombre='db-lector')
+        carga = CargaEnSegundoPlano(root, lector, tabla, tamano_lote=100)
+        # nombre descendente; zip4 es igual en todas las filas y desempata el ID
+        for consulta, clave in ((ConsultaDatos(orden='nombre', descendente=True), lambda f: f[2].casefold()),
+                                (ConsultaDatos(orden='zip4'), lambda f: f[0])):
+            tabla.cambiar_consulta(consulta)
+            carga.recargar()
+            root.procesar()
+            self.assertTrue(tabla.ventana.indice_completo)
+            todas = sorted(self.db.leer_filas_datos(limite=1000), key=clave, reverse=consulta.descendente)
+            todas = [f[0] for f in todas]
+            for inicio in (0, 30, 600, 560, 860, 5):
+                self.assertEqual([f[0] for f in tabla.ventana.filas(inicio, 40)], todas[inicio:inicio + 40])
+        lector.detener()
+
+    def test_cambiar_consulta_no_usa_el_total_anterior(self):
+        self.ventana.filas(850, 10)
+        # Solo otro orden: las mismas filas, el total sigue valiendo
+        self.ventana.cambiar_consulta(ConsultaDatos(orden='nombre'))
+        self.assertEqual(self.ventana.total, 900)
+        # Una búsqueda con 100 resultados: nada se lee hasta el nuevo conteo
+        self.ventana.cambiar_consulta(ConsultaDatos(busqueda='nombre 5'))
+        self.assertEqual(self.ventana.total, 0)
+        self.assertEqual(self.ventana.filas(850, 10), [])
+        self.ventana.recargar()
+        self.assertEqual(self.ventana.total, 100)
+        self.assertEqual(len(self.ventana.filas(95, 10)), 5)
+
+    def test_editar_columna_de_orden_recarga(self):
+        self.ventana.cambiar_consulta(ConsultaDatos(orden='nombre'))
+        self.ventana.recargar()
+        primera = self.ventana.filas(0, 10)[0]
+        dato = self.db.leer_filas_por_ids([primera[0]])[0]
+        self.db.actualizar_dato(Dato(id=dato[0], codigo=dato[1], nombre='ZZZ', drireccion=dato[3]))
+        self.assertFalse(self.ventana.actualizar_ids([dato[0]]))
+        self.assertEqual(self.ventana.filas(899, 1)[0][2], 'ZZZ')
+        # Con otro orden los datos nuevos no se agregan al final sin más
+        reporte = self.db.crear_datos_lote([Dato(codigo='N1', nombre='AAA', drireccion='1 NEW ST')])
+        self.assertFalse(self.ventana.agregar_ids([reporte[0]['id']]))
+        self.assertEqual(self.ventana.filas(0, 1)[0][2], 'AAA')
+
+if __name__ == '__main__':
+    unittest.main()